@@ -0,0 +1,535 @@
+"""
+Banc de performance du Simulateur Usine 4.0
+Débit, percentiles de latence et mémoire crête, comparés à une référence JSON
+"""
+
+import argparse
+import asyncio
+import contextlib
+import csv
+import fnmatch
+import io
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Callable, List, Optional
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from clock import VirtualClock
+from data_reader import read_records
+from data_simulator import DataSimulator
+from fleet_simulator import FleetSimulator
+from outputs.file_output import FileOutput
+from outputs.http_output import HTTPOutput
+from outputs.mqtt_output import MQTTOutput
+from record import Record, encode_json
+from serializers import available_serializers, create_serializer
+
+DEFAULT_BASELINE = Path("benchmarks/baseline.json")
+DEFAULT_THRESHOLD = 0.10
+
+SAMPLE_RECORD = {
+    "timestamp": "2025-06-28T10:15:30Z",
+    "machine_id": "AUTO-01",
+    "temperature": 68.2,
+    "humidity": 50.3,
+    "rpm": 1450,
+    "vibration": 1.1,
+    "energy_kwh": 2.8,
+    "uptime": 157000,
+    "status": "ON"
+}
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Mémoire résidente crête du processus (Mo)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss en octets sous macOS, en kilo-octets sous Linux
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class BenchmarkResult:
+    """Résultat d'un benchmark : débit et distribution des latences"""
+
+    def __init__(self, name: str, operations: int, duration: float,
+                 latencies_ns: Optional[List[int]] = None, records_per_op: int = 1,
+                 bytes_per_record: Optional[int] = None):
+        self.name = name
+        self.operations = operations
+        self.duration = duration
+        self.records_per_op = records_per_op
+        # Taille encodée d'un enregistrement (benchmarks d'encodage)
+        self.bytes_per_record = bytes_per_record
+        self.latencies = np.asarray(latencies_ns, dtype=np.int64) if latencies_ns else None
+        self.peak_rss_mb = peak_rss_mb()
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = {
+            'operations': self.operations,
+            'duration_s': round(self.duration, 6),
+            'ops_per_s': self.operations / self.duration if self.duration else 0.0,
+            'records_per_s': self.operations * self.records_per_op / self.duration if self.duration else 0.0,
+            'peak_rss_mb': self.peak_rss_mb
+        }
+        if self.bytes_per_record is not None:
+            result['bytes_per_record'] = self.bytes_per_record
+        if self.latencies is not None and len(self.latencies):
+            p50, p90, p99 = np.percentile(self.latencies, [50, 90, 99]) / 1e6
+            result.update({
+                'latency_p50_ms': float(p50),
+                'latency_p90_ms': float(p90),
+                'latency_p99_ms': float(p99),
+                'latency_max_ms': float(self.latencies.max() / 1e6)
+            })
+        return result
+
+
+def measure(name: str, func: Callable[[], Any], operations: int,
+            warmup: int = 10, records_per_op: int = 1) -> BenchmarkResult:
+    """Mesurer une opération synchrone"""
+    for _ in range(warmup):
+        func()
+
+    latencies = []
+    clock = time.perf_counter_ns
+    start = clock()
+    for _ in range(operations):
+        begin = clock()
+        func()
+        latencies.append(clock() - begin)
+    duration = (clock() - start) / 1e9
+    return BenchmarkResult(name, operations, duration, latencies, records_per_op)
+
+
+async def measure_async(name: str, func: Callable[[], Any], operations: int,
+                        warmup: int = 10, records_per_op: int = 1) -> BenchmarkResult:
+    """Mesurer une opération asynchrone"""
+    for _ in range(warmup):
+        await func()
+
+    latencies = []
+    clock = time.perf_counter_ns
+    start = clock()
+    for _ in range(operations):
+        begin = clock()
+        await func()
+        latencies.append(clock() - begin)
+    duration = (clock() - start) / 1e9
+    return BenchmarkResult(name, operations, duration, latencies, records_per_op)
+
+
+# --- Génération -----------------------------------------------------------
+
+def bench_generation_single(scale: float) -> BenchmarkResult:
+    simulator = DataSimulator({})
+    return measure('generation.single', simulator.generate_data, int(20000 * scale))
+
+
+def bench_generation_fleet(scale: float) -> BenchmarkResult:
+    fleet = FleetSimulator({'fleet': {'machines': 10000}})
+    return measure('generation.fleet_10k', fleet.step, int(200 * scale), records_per_op=10000)
+
+
+def bench_generation_fleet_records(scale: float) -> BenchmarkResult:
+    fleet = FleetSimulator({'fleet': {'machines': 10000}})
+    return measure('generation.fleet_10k_records', lambda: fleet.step().to_records(),
+                   int(50 * scale), records_per_op=10000)
+
+
+# --- Sérialisation --------------------------------------------------------
+
+def bench_serialize_json_compact(scale: float) -> BenchmarkResult:
+    return measure('serialize.json_compact',
+                   lambda: json.dumps(SAMPLE_RECORD, ensure_ascii=False, separators=(',', ':')),
+                   int(100000 * scale))
+
+
+def bench_serialize_json_indent(scale: float) -> BenchmarkResult:
+    return measure('serialize.json_indent',
+                   lambda: json.dumps(SAMPLE_RECORD, indent=2, ensure_ascii=False),
+                   int(50000 * scale))
+
+
+def bench_serialize_csv(scale: float) -> BenchmarkResult:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=SAMPLE_RECORD.keys())
+
+    def write_row():
+        writer.writerow(SAMPLE_RECORD)
+        buffer.seek(0)
+        buffer.truncate()
+
+    return measure('serialize.csv_row', write_row, int(100000 * scale))
+
+
+def bench_serialize_fanout(scale: float) -> BenchmarkResult:
+    # Quatre sorties encodant chacune l'enregistrement
+    def encode_four():
+        for _ in range(4):
+            json.dumps(SAMPLE_RECORD, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    return measure('serialize.fanout_4', encode_four, int(50000 * scale))
+
+
+def bench_serialize_fanout_shared(scale: float) -> BenchmarkResult:
+    # Quatre sorties partageant l'encodage du Record
+    def encode_four():
+        record = Record(SAMPLE_RECORD)
+        for _ in range(4):
+            encode_json(record)
+
+    return measure('serialize.fanout_4_shared', encode_four, int(50000 * scale))
+
+
+def bench_serialize_encoding(name: str) -> Callable[[float], BenchmarkResult]:
+    """Encodage d'une charge utile réseau (serializers.py), sans le cache du Record"""
+    def bench(scale: float) -> BenchmarkResult:
+        serializer = create_serializer(name)
+        encode = serializer.encode if name == 'json' else serializer._encode
+        result = measure(f'serialize.encoding_{name}', lambda: encode(SAMPLE_RECORD), int(100000 * scale))
+        result.bytes_per_record = len(encode(SAMPLE_RECORD))
+        return result
+    return bench
+
+
+# --- Sorties --------------------------------------------------------------
+
+def _file_output_bench(name: str, file_format: str, operations: int,
+                       writer_thread: bool = False) -> BenchmarkResult:
+    # Sans thread d'écriture, la mesure inclut le coût d'écriture disque
+    async def scenario():
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output = FileOutput({
+                'enabled': True, 'verbose': False, 'format': file_format,
+                'path': f"{temp_dir}/machine_data.{file_format}",
+                'writer_thread': writer_thread
+            })
+            await output.initialize()
+            try:
+                return await measure_async(name, lambda: output.send_data(SAMPLE_RECORD), operations)
+            finally:
+                await output.cleanup()
+
+    return asyncio.run(scenario())
+
+
+def bench_file_json(scale: float) -> BenchmarkResult:
+    # Réécriture complète à chaque enregistrement : coût quadratique
+    return _file_output_bench('output.file_json', 'json', int(500 * scale))
+
+
+def bench_file_jsonl(scale: float) -> BenchmarkResult:
+    return _file_output_bench('output.file_jsonl', 'jsonl', int(20000 * scale))
+
+
+def bench_file_jsonl_threaded(scale: float) -> BenchmarkResult:
+    # Latence vue par la boucle asyncio (mise en file vers le thread d'écriture)
+    return _file_output_bench('output.file_jsonl_threaded', 'jsonl', int(20000 * scale), writer_thread=True)
+
+
+def bench_file_csv(scale: float) -> BenchmarkResult:
+    return _file_output_bench('output.file_csv', 'csv', int(5000 * scale))
+
+
+def bench_file_columnar(scale: float) -> BenchmarkResult:
+    return _file_output_bench('output.file_columnar', 'columnar', int(20000 * scale))
+
+
+def bench_file_timeseries(scale: float) -> BenchmarkResult:
+    return _file_output_bench('output.file_timeseries', 'timeseries', int(20000 * scale))
+
+
+# --- Stockage -------------------------------------------------------------
+
+def _storage_bench(name: str, file_format: str, scale: float) -> BenchmarkResult:
+    # Flotte de 10 machines simulée toutes les 5 s (graine fixe), écrite par FileOutput,
+    # puis relue entièrement : taille par enregistrement et débit de décodage
+    machines, ticks = 10, max(10, int(2000 * scale))
+    clock = VirtualClock(datetime(2025, 6, 28))
+    fleet = FleetSimulator({'fleet': {'machines': machines}, 'simulation': {'seed': 1}}, clock=clock)
+
+    async def write(path: str):
+        # Temps simulé accéléré : blocs complets, sans scellement par ancienneté (horloge réelle)
+        output = FileOutput({'enabled': True, 'verbose': False, 'format': file_format,
+                             'path': path, 'writer_thread': False, 'max_block_age': 3600})
+        await output.initialize()
+        for _ in range(ticks):
+            clock.advance(5)
+            await output.send_batch(fleet.step())
+        await output.cleanup()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = f"{temp_dir}/machine_data.{file_format}"
+        asyncio.run(write(path))
+        count = machines * ticks
+        result = measure(name, lambda: sum(1 for _ in read_records(path)), 5, warmup=1, records_per_op=count)
+        result.bytes_per_record = round(os.path.getsize(path) / count, 1)
+    return result
+
+
+def bench_storage_json(scale: float) -> BenchmarkResult:
+    return _storage_bench('storage.decode_json', 'json', scale)
+
+
+def bench_storage_csv(scale: float) -> BenchmarkResult:
+    return _storage_bench('storage.decode_csv', 'csv', scale)
+
+
+def bench_storage_jsonl(scale: float) -> BenchmarkResult:
+    return _storage_bench('storage.decode_jsonl', 'jsonl', scale)
+
+
+def bench_storage_timeseries(scale: float) -> BenchmarkResult:
+    return _storage_bench('storage.decode_timeseries', 'timeseries', scale)
+
+
+def _http_output_bench(name: str, batch: Dict[str, Any], operations: int) -> BenchmarkResult:
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+
+    async def handler(request):
+        await request.read()
+        return web.Response(status=200)
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_post('/data', handler)
+        server = TestServer(app, host='127.0.0.1')
+        await server.start_server()
+        output = HTTPOutput({'enabled': True, 'url': str(server.make_url('/data')), 'batch': batch})
+        await output.initialize()
+        try:
+            return await measure_async(name, lambda: output.send_data(SAMPLE_RECORD), operations)
+        finally:
+            await output.cleanup()
+            await server.close()
+
+    return asyncio.run(scenario())
+
+
+def bench_http_single(scale: float) -> BenchmarkResult:
+    return _http_output_bench('output.http_single', {'enabled': False}, int(500 * scale))
+
+
+def bench_http_batch(scale: float) -> BenchmarkResult:
+    return _http_output_bench('output.http_batch',
+                              {'enabled': True, 'max_records': 500, 'format': 'ndjson'},
+                              int(20000 * scale))
+
+
+def bench_mqtt(scale: float) -> BenchmarkResult:
+    async def scenario():
+        output = MQTTOutput({'enabled': True, 'client': 'mock'})
+        await output.initialize()
+        try:
+            return await measure_async('output.mqtt', lambda: output.send_data(SAMPLE_RECORD),
+                                       int(200 * scale))
+        finally:
+            await output.cleanup()
+
+    return asyncio.run(scenario())
+
+
+def _mqtt_broker_bench(name: str, qos: int, operations: int) -> BenchmarkResult:
+    # Client asyncio réel vers le broker local ; la mesure s'arrête quand le
+    # broker a reçu (et, en QoS 1, acquitté) tous les messages
+    from mqtt_broker import LocalBroker
+
+    async def scenario():
+        broker = LocalBroker(port=0)
+        await broker.start()
+        output = MQTTOutput({'enabled': True, 'broker_host': broker.host, 'broker_port': broker.port,
+                             'qos': qos, 'max_inflight': 1000})
+        await output.initialize()
+        try:
+            result = await measure_async(name, lambda: output.send_data(SAMPLE_RECORD), operations)
+            start = time.perf_counter()
+            expected = output.client.stats['published']
+            while broker.stats['messages'] < expected or output.client.inflight:
+                await asyncio.sleep(0.001)
+            result.duration += time.perf_counter() - start
+            return result
+        finally:
+            await output.cleanup()
+            await broker.stop()
+
+    return asyncio.run(scenario())
+
+
+def bench_mqtt_qos0(scale: float) -> BenchmarkResult:
+    return _mqtt_broker_bench('output.mqtt_qos0', 0, int(20000 * scale))
+
+
+def bench_mqtt_qos1(scale: float) -> BenchmarkResult:
+    return _mqtt_broker_bench('output.mqtt_qos1', 1, int(20000 * scale))
+
+
+# --- Boucle complète ------------------------------------------------------
+
+def bench_full_loop(scale: float) -> BenchmarkResult:
+    from simulateur import SimulateurUsine
+
+    duration = max(0.5, 2.0 * scale)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config = {
+            'simulation': {'interval': 0.01, 'duration': duration,
+                           'queue': {'spill_dir': f"{temp_dir}/spill"}},
+            'fleet': {'machines': 1000},
+            'outputs': {'file': {'enabled': True, 'verbose': False, 'format': 'columnar',
+                                 'path': f"{temp_dir}/machine_data.col"}}
+        }
+        simulateur = SimulateurUsine(config=config)
+        start = time.perf_counter()
+        asyncio.run(simulateur.run())
+        elapsed = time.perf_counter() - start
+
+    return BenchmarkResult('simulateur.full_loop', simulateur.stats['ticks'], elapsed,
+                           records_per_op=1000)
+
+
+BENCHMARKS = {
+    'generation.single': bench_generation_single,
+    'generation.fleet_10k': bench_generation_fleet,
+    'generation.fleet_10k_records': bench_generation_fleet_records,
+    'serialize.json_compact': bench_serialize_json_compact,
+    'serialize.json_indent': bench_serialize_json_indent,
+    'serialize.csv_row': bench_serialize_csv,
+    'serialize.fanout_4': bench_serialize_fanout,
+    'serialize.fanout_4_shared': bench_serialize_fanout_shared,
+    # Encodages disponibles (msgpack et cbor selon les paquets installés)
+    **{f'serialize.encoding_{name}': bench_serialize_encoding(name) for name in available_serializers()},
+    'output.file_json': bench_file_json,
+    'output.file_jsonl': bench_file_jsonl,
+    'output.file_jsonl_threaded': bench_file_jsonl_threaded,
+    'output.file_csv': bench_file_csv,
+    'output.file_columnar': bench_file_columnar,
+    'output.file_timeseries': bench_file_timeseries,
+    'storage.decode_json': bench_storage_json,
+    'storage.decode_csv': bench_storage_csv,
+    'storage.decode_jsonl': bench_storage_jsonl,
+    'storage.decode_timeseries': bench_storage_timeseries,
+    'output.http_single': bench_http_single,
+    'output.http_batch': bench_http_batch,
+    'output.mqtt': bench_mqtt,
+    'output.mqtt_qos0': bench_mqtt_qos0,
+    'output.mqtt_qos1': bench_mqtt_qos1,
+    'simulateur.full_loop': bench_full_loop,
+}
+
+
+def run_benchmarks(patterns: Optional[List[str]] = None, scale: float = 1.0) -> Dict[str, Dict[str, Any]]:
+    """Exécuter les benchmarks sélectionnés (motifs fnmatch)"""
+    results = {}
+    with open(os.devnull, 'w') as devnull:
+        for name, bench in BENCHMARKS.items():
+            if patterns and not any(fnmatch.fnmatch(name, pattern) for pattern in patterns):
+                continue
+            # Les sorties affichent une ligne par envoi : non mesuré à l'écran
+            with contextlib.redirect_stdout(devnull):
+                results[name] = bench(scale).to_dict()
+    return results
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+            threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """Lister les régressions de débit au-delà du seuil relatif"""
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if not reference or not reference.get('records_per_s'):
+            continue
+        change = result['records_per_s'] / reference['records_per_s'] - 1
+        if change < -threshold:
+            regressions.append(f"{name}: {change:+.1%} ({result['records_per_s']:.0f}/s "
+                               f"vs {reference['records_per_s']:.0f}/s)")
+    return regressions
+
+
+def format_results(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]] = None) -> str:
+    """Tableau lisible des résultats"""
+    baseline = baseline or {}
+    lines = [f"{'Benchmark':<32}{'enr/s':>14}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}{'RSS Mo':>9}{'Δ réf':>9}"
+             f"{'o/enr':>8}"]
+    for name, result in results.items():
+        reference = baseline.get(name, {}).get('records_per_s')
+        delta = f"{result['records_per_s'] / reference - 1:+.1%}" if reference else '-'
+        rss = f"{result['peak_rss_mb']:.0f}" if result['peak_rss_mb'] is not None else '-'
+        latencies = [
+            f"{result[key]:.3f}" if key in result else '-'
+            for key in ('latency_p50_ms', 'latency_p99_ms', 'latency_max_ms')
+        ]
+        lines.append(
+            f"{name:<32}{result['records_per_s']:>14.0f}"
+            f"{latencies[0]:>10}{latencies[1]:>10}{latencies[2]:>10}"
+            f"{rss:>9}{delta:>9}{result.get('bytes_per_record', '-'):>8}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    """Point d'entrée en ligne de commande"""
+    parser = argparse.ArgumentParser(description="Banc de performance du simulateur")
+    parser.add_argument('patterns', nargs='*', help="Benchmarks à exécuter (ex: 'output.*')")
+    parser.add_argument('--quick', action='store_true', help="Tailles réduites (x0.1)")
+    parser.add_argument('--scale', type=float, default=1.0, help="Facteur de taille des benchmarks")
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE, help="Fichier de référence JSON")
+    parser.add_argument('--save-baseline', action='store_true', help="Enregistrer les résultats comme référence")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Baisse de débit tolérée (0.10 = 10%%)")
+    parser.add_argument('--output', type=Path, help="Écrire les résultats en JSON")
+    args = parser.parse_args()
+
+    # Journaux des modules limités aux avertissements pendant les mesures
+    logging.basicConfig(level=logging.WARNING)
+
+    scale = args.scale * (0.1 if args.quick else 1.0)
+    print("🚀 BENCHMARKS - SIMULATEUR USINE 4.0")
+    print("=" * 94)
+
+    results = run_benchmarks(args.patterns, scale)
+
+    baseline = {}
+    if args.baseline.exists():
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f).get('results', {})
+
+    print(format_results(results, baseline))
+
+    report = {'python': sys.version.split()[0], 'scale': scale, 'results': results}
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Référence enregistrée: {args.baseline}")
+        return
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n❌ RÉGRESSIONS (seuil {args.threshold:.0%}):")
+        for regression in regressions:
+            print(f"   {regression}")
+        sys.exit(1)
+    if baseline:
+        print(f"\n✅ Aucune régression au-delà de {args.threshold:.0%}")
+
+
+if __name__ == '__main__':
+    main()
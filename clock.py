@@ -0,0 +1,38 @@
+"""
+Horloges interchangeables pour les générateurs de données
+SystemClock pour le temps réel, VirtualClock pour le remplissage historique
+"""
+
+import time
+from datetime import datetime
+
+
+class SystemClock:
+    """Horloge système (temps réel)"""
+
+    def time(self) -> float:
+        """Temps courant en secondes depuis l'epoch"""
+        return time.time()
+
+    def now(self) -> datetime:
+        """Date et heure courantes"""
+        return datetime.now()
+
+
+class VirtualClock:
+    """Horloge virtuelle avancée explicitement, sans attente réelle"""
+
+    def __init__(self, start: datetime):
+        self._time = start.timestamp()
+
+    def time(self) -> float:
+        """Temps virtuel en secondes depuis l'epoch"""
+        return self._time
+
+    def now(self) -> datetime:
+        """Date et heure virtuelles"""
+        return datetime.fromtimestamp(self._time)
+
+    def advance(self, seconds: float):
+        """Avancer l'horloge virtuelle"""
+        self._time += seconds
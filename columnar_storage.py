@@ -0,0 +1,264 @@
+"""
+Format de stockage binaire columnaire pour les données machine
+Segment à capacité fixe : en-tête + une colonne typée contiguë par champ,
+lisible par projection mémoire (np.memmap) sans copie. Les colonnes des
+canaux suivent le schéma des capteurs et sont décrites dans l'en-tête
+"""
+
+import calendar
+import io
+import json
+import struct
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Any, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from fleet_simulator import STATUSES
+from compression import compression_of, open_segment
+from sensor_schema import SensorSchema
+
+MAGIC = b'USCOL1\x00\x00'
+# magic (8) + nombre d'enregistrements (8) + taille de l'en-tête JSON (4)
+PREFIX = struct.Struct('<8sQI')
+ALIGNMENT = 64
+
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+# Colonnes fixes du segment, encodées à part : (nom, type NumPy)
+HEAD_COLUMNS = [
+    ('timestamp', '<i8'),
+    ('machine_id', None),  # S<n>, largeur fixée à la création du segment
+]
+TAIL_COLUMNS = [
+    ('uptime', '<i8'),
+    ('status', 'u1'),
+]
+CHANNEL_DTYPES = {'float': '<f8', 'int': '<i8'}
+# Largeur par défaut de la colonne machine_id (octets UTF-8)
+MACHINE_ID_WIDTH = 16
+
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def encode_timestamp(timestamp: str) -> int:
+    """Convertir un horodatage du cahier des charges en secondes epoch"""
+    return calendar.timegm(time.strptime(timestamp, TIMESTAMP_FORMAT))
+
+
+def decode_timestamp(seconds: int) -> str:
+    """Convertir des secondes epoch en horodatage du cahier des charges"""
+    return datetime.fromtimestamp(seconds, tz=timezone.utc).strftime(TIMESTAMP_FORMAT)
+
+
+def segment_columns(schema: Optional[SensorSchema] = None) -> List[Tuple[str, Optional[str]]]:
+    """Colonnes d'un segment : (nom, type NumPy), une par canal du schéma"""
+    schema = schema or SensorSchema.from_config(None)
+    channels = [(channel.output, CHANNEL_DTYPES[channel.type]) for channel in schema.channels]
+    return HEAD_COLUMNS + channels + TAIL_COLUMNS
+
+
+def record_size(machine_id_width: int = MACHINE_ID_WIDTH, columns: Optional[List[Tuple[str, Optional[str]]]] = None) -> int:
+    """Taille d'un enregistrement en octets (toutes colonnes confondues)"""
+    columns = columns or segment_columns()
+    return sum(np.dtype(dtype or f'S{machine_id_width}').itemsize for _, dtype in columns)
+
+
+def _read_header(f) -> Dict[str, Any]:
+    magic, count, header_size = PREFIX.unpack(f.read(PREFIX.size))
+    if magic != MAGIC:
+        raise ValueError("Fichier columnaire invalide (signature inconnue)")
+    header = json.loads(f.read(header_size))
+    header['count'] = count
+    return header
+
+
+def is_columnar(path: Union[str, Path]) -> bool:
+    """Vérifier si un fichier (éventuellement compressé) est un segment columnaire"""
+    with open_segment(path) as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+class ColumnarWriter:
+    """Écriture d'un segment columnaire à capacité fixe
+
+    Un identifiant de machine plus long que machine_id_width lève ValueError
+    (il serait tronqué dans la colonne de largeur fixe).
+    """
+
+    def __init__(self, path: Union[str, Path], capacity: int, machine_id_width: int = MACHINE_ID_WIDTH,
+                 columns: Optional[List[Tuple[str, Optional[str]]]] = None):
+        self.path = Path(path)
+
+        if self.path.exists() and self.path.stat().st_size > 0:
+            # Reprendre un segment existant (colonnes de son en-tête)
+            with open(self.path, 'rb') as f:
+                header = _read_header(f)
+            self.count = header['count']
+        else:
+            header = self._create(capacity, machine_id_width, columns or segment_columns())
+            self.count = 0
+
+        self.capacity = header['capacity']
+        self.machine_id_width = header['machine_id_width']
+        self._prefix = np.memmap(self.path, dtype='u1', mode='r+', shape=(PREFIX.size,))
+        self.columns = {
+            column['name']: np.memmap(self.path, dtype=column['dtype'], mode='r+',
+                                      offset=column['offset'], shape=(self.capacity,))
+            for column in header['columns']
+        }
+        # Colonnes copiées telles quelles (canaux et uptime)
+        self._values = [name for name in self.columns if name not in ('timestamp', 'machine_id', 'status')]
+
+    def _create(self, capacity: int, machine_id_width: int,
+                segment: List[Tuple[str, Optional[str]]]) -> Dict[str, Any]:
+        """Créer le fichier du segment avec sa taille finale"""
+        columns = [
+            {'name': name, 'dtype': dtype or f'S{machine_id_width}', 'offset': 10 ** 15}
+            for name, dtype in segment
+        ]
+        header = {'capacity': capacity, 'machine_id_width': machine_id_width, 'columns': columns}
+
+        # Place de l'en-tête réservée avec des décalages de largeur maximale
+        data_start = _align(PREFIX.size + len(json.dumps(header)))
+
+        offset = data_start
+        for column in columns:
+            column['offset'] = offset
+            offset = _align(offset + np.dtype(column['dtype']).itemsize * capacity)
+
+        encoded = json.dumps(header).encode('utf-8')
+        encoded = encoded.ljust(data_start - PREFIX.size, b' ')
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'wb') as f:
+            f.write(PREFIX.pack(MAGIC, 0, len(encoded)))
+            f.write(encoded)
+            f.truncate(offset)
+        return header
+
+    @property
+    def full(self) -> bool:
+        return self.count >= self.capacity
+
+    @property
+    def remaining(self) -> int:
+        return self.capacity - self.count
+
+    def _check_machine_id(self, machine_id: bytes):
+        if len(machine_id) > self.machine_id_width:
+            raise ValueError(f"Identifiant de machine trop long pour le segment "
+                             f"({len(machine_id)} > {self.machine_id_width} octets): {machine_id.decode('utf-8')}")
+
+    def _commit(self, count: int):
+        """Publier le nouveau nombre d'enregistrements dans l'en-tête"""
+        self.count = count
+        self._prefix[8:16] = np.frombuffer(struct.pack('<Q', count), dtype='u1')
+
+    def append(self, data: Dict[str, Any]):
+        """Ajouter un enregistrement"""
+        if self.full:
+            raise ValueError("Segment columnaire plein")
+
+        machine_id = data['machine_id'].encode('utf-8')
+        self._check_machine_id(machine_id)
+        index = self.count
+        columns = self.columns
+        columns['timestamp'][index] = encode_timestamp(data['timestamp'])
+        columns['machine_id'][index] = machine_id
+        for name in self._values:
+            columns[name][index] = data[name]
+        columns['status'][index] = STATUS_CODES[data['status']]
+        self._commit(index + 1)
+
+    def append_batch(self, batch, start: int = 0) -> int:
+        """Ajouter les lignes d'un FleetBatch à partir de start, retourne le nombre écrit"""
+        count = min(len(batch) - start, self.remaining)
+        if count <= 0:
+            return 0
+
+        begin, end = self.count, self.count + count
+        rows = slice(start, start + count)
+        machine_ids = np.asarray(batch.machine_ids[rows], dtype=bytes)
+        if machine_ids.dtype.itemsize > self.machine_id_width:
+            self._check_machine_id(max(machine_ids.tolist(), key=len))
+        columns = self.columns
+        columns['timestamp'][begin:end] = encode_timestamp(batch.timestamp)
+        columns['machine_id'][begin:end] = machine_ids
+        for name in self._values + ['status']:
+            columns[name][begin:end] = batch.columns[name][rows]
+        self._commit(end)
+        return count
+
+    def flush(self):
+        """Forcer l'écriture des pages modifiées"""
+        for column in self.columns.values():
+            column.flush()
+        self._prefix.flush()
+
+    def close(self):
+        """Fermer le segment"""
+        self.flush()
+        self.columns = {}
+        self._prefix = None
+
+
+class ColumnarReader:
+    """Lecture d'un segment columnaire par projection mémoire (sans copie)
+
+    Un segment pivoté compressé est décompressé une fois en mémoire.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._buffer = None
+        if compression_of(self.path):
+            with open_segment(self.path) as f:
+                self._buffer = f.read()
+            header = _read_header(io.BytesIO(self._buffer))
+        else:
+            with open(self.path, 'rb') as f:
+                header = _read_header(f)
+
+        self.count = header['count']
+        self.capacity = header['capacity']
+        self._columns = {column['name']: column for column in header['columns']}
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._columns)
+
+    def column(self, name: str) -> np.ndarray:
+        """Vue NumPy en lecture seule sur une colonne (aucune copie)"""
+        column = self._columns[name]
+        if self.count == 0:
+            return np.empty(0, dtype=column['dtype'])
+        if self._buffer is not None:
+            return np.frombuffer(self._buffer, dtype=column['dtype'],
+                                 count=self.count, offset=column['offset'])
+        return np.memmap(self.path, dtype=column['dtype'], mode='r',
+                         offset=column['offset'], shape=(self.count,))
+
+    def records(self, start: int = 0, stop: int = None) -> Iterator[Dict[str, Any]]:
+        """Reconstituer les enregistrements au format de generate_data()"""
+        stop = self.count if stop is None else min(stop, self.count)
+        if start >= stop:
+            return
+
+        values = {name: self.column(name)[start:stop].tolist() for name in self._columns}
+        values['timestamp'] = [decode_timestamp(seconds) for seconds in values['timestamp']]
+        values['machine_id'] = [machine_id.decode('utf-8') for machine_id in values['machine_id']]
+        values['status'] = [STATUSES[code] for code in values['status']]
+        # Champs dans l'ordre des colonnes du segment (celui de generate_data())
+        names = list(values)
+        for row in zip(*values.values()):
+            yield dict(zip(names, row))
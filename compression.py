@@ -0,0 +1,153 @@
+"""
+Compression et rétention des segments de données pivotés
+gzip et lzma (bibliothèque standard), zstd si le paquet zstandard est installé
+"""
+
+import gzip
+import io
+import lzma
+import os
+import re
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Union
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Méthode de compression -> suffixe ajouté au nom du segment
+SUFFIXES = {'gzip': '.gz', 'lzma': '.xz', 'zstd': '.zst'}
+METHODS = {suffix: method for method, suffix in SUFFIXES.items()}
+
+COPY_CHUNK = 1024 * 1024
+
+
+def available_methods() -> List[str]:
+    """Méthodes de compression utilisables dans cet environnement"""
+    return [method for method in SUFFIXES if method != 'zstd' or zstandard is not None]
+
+
+def compression_of(path: Union[str, Path]) -> Optional[str]:
+    """Méthode de compression d'un segment d'après son suffixe (None si non compressé)"""
+    return METHODS.get(Path(path).suffix.lower())
+
+
+def strip_compression(path: Union[str, Path]) -> Path:
+    """Chemin du segment sans suffixe de compression (x.jsonl.gz -> x.jsonl)"""
+    path = Path(path)
+    return path.with_suffix('') if compression_of(path) else path
+
+
+def open_segment(path: Union[str, Path]):
+    """Ouvrir un segment en lecture binaire, compressé ou non"""
+    method = compression_of(path)
+    if method == 'gzip':
+        return gzip.open(path, 'rb')
+    if method == 'lzma':
+        return lzma.open(path, 'rb')
+    if method == 'zstd':
+        if zstandard is None:
+            raise RuntimeError(f"Le paquet zstandard est requis pour lire {path}")
+        reader = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+        return io.BufferedReader(reader)
+    return open(path, 'rb')
+
+
+def _open_writer(path: Path, method: str, level: Optional[int]):
+    if method == 'gzip':
+        return gzip.open(path, 'wb', compresslevel=6 if level is None else level)
+    if method == 'lzma':
+        return lzma.open(path, 'wb', preset=6 if level is None else level)
+    if method == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("Le paquet zstandard n'est pas installé")
+        compressor = zstandard.ZstdCompressor(level=3 if level is None else level)
+        return compressor.stream_writer(open(path, 'wb'), closefd=True)
+    raise ValueError(f"Méthode de compression inconnue: {method}")
+
+
+def compress_segment(path: Union[str, Path], method: str = 'gzip', level: Optional[int] = None) -> Path:
+    """Compresser un segment pivoté puis supprimer l'original
+
+    Le fichier compressé est écrit sous un nom temporaire puis renommé : un
+    arrêt pendant la compression laisse l'original intact. L'index (.idx),
+    dont les offsets portent sur les données décompressées, suit le segment.
+    """
+    path = Path(path)
+    target = path.with_name(path.name + SUFFIXES[method])
+    temp_path = target.with_name(target.name + '.tmp')
+
+    with open(path, 'rb') as source, _open_writer(temp_path, method, level) as destination:
+        shutil.copyfileobj(source, destination, COPY_CHUNK)
+    os.replace(temp_path, target)
+
+    index = path.with_name(path.name + '.idx')
+    if index.exists():
+        index.rename(target.with_name(target.name + '.idx'))
+    path.unlink()
+    return target
+
+
+def segment_exists(path: Union[str, Path]) -> bool:
+    """Le segment existe-t-il, compressé ou non ?"""
+    path = Path(path)
+    return path.exists() or any(path.with_name(path.name + suffix).exists() for suffix in METHODS)
+
+
+def rotated_segments(base_path: Union[str, Path]) -> List[Path]:
+    """Segments pivotés d'une série (compressés ou non), du plus ancien au plus récent"""
+    base_path = Path(base_path)
+    # Les segments pivotés portent un horodatage : base_AAAAMMJJ_HHMMSS[_N]
+    pattern = f"{base_path.stem}_[0-9]*{base_path.suffix}"
+    segments = list(base_path.parent.glob(pattern))
+    for suffix in METHODS:
+        segments += base_path.parent.glob(pattern + suffix)
+    return sorted(segments, key=_segment_order)
+
+
+def _segment_order(segment: Path) -> list:
+    # Ordre naturel : base_..._9 avant base_..._10
+    name = strip_compression(segment).name
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', name)]
+
+
+def apply_retention(segments: List[Path], max_bytes: int = 0, max_segments: int = 0,
+                    max_age_hours: float = 0) -> List[Path]:
+    """Supprimer les segments les plus anciens au-delà des limites (0 = sans limite)
+
+    Retourne la liste des segments supprimés (index associé compris).
+    """
+    segments = [segment for segment in segments if segment.exists()]
+    sizes = {segment: segment.stat().st_size for segment in segments}
+    removed = []
+
+    now = time.time()
+    total = sum(sizes.values())
+    for position, segment in enumerate(segments):
+        remaining = len(segments) - position
+        expired = max_age_hours and now - segment.stat().st_mtime > max_age_hours * 3600
+        too_many = max_segments and remaining > max_segments
+        too_large = max_bytes and total > max_bytes
+        if not (expired or too_many or too_large):
+            break
+
+        segment.unlink()
+        index = segment.with_name(segment.name + '.idx')
+        if index.exists():
+            index.unlink()
+        total -= sizes[segment]
+        removed.append(segment)
+    return removed
+
+
+def retention_limits(config: Dict[str, Any]) -> Dict[str, Any]:
+    """Limites de rétention d'une configuration de sortie fichier"""
+    config = config or {}
+    return {
+        'max_bytes': int(config.get('max_mb', 0) * 1024 * 1024),
+        'max_segments': config.get('max_segments', 0),
+        'max_age_hours': config.get('max_age_hours', 0)
+    }
@@ -0,0 +1,112 @@
+"""
+Lecture des fichiers de données générés par FileOutput
+Formats supportés : JSON (tableau), JSON Lines, CSV, columnaire binaire et
+séries temporelles, y compris les segments pivotés compressés (gzip, lzma, zstd)
+"""
+
+import csv
+import io
+import json
+import sys
+from pathlib import Path
+from typing import Dict, Any, Iterator, Union
+
+from columnar_storage import ColumnarReader, is_columnar
+from compression import open_segment, strip_compression
+from timeseries_storage import TimeSeriesReader, is_timeseries
+
+
+def convert_value(value: str) -> Any:
+    """Convertir une valeur CSV en nombre si possible"""
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def detect_format(path: Union[str, Path]) -> str:
+    """Détecter le format d'un fichier de données (json, jsonl, csv, columnar ou timeseries)"""
+    path = Path(path)
+    if is_columnar(path):
+        return 'columnar'
+    if is_timeseries(path):
+        return 'timeseries'
+    suffix = strip_compression(path).suffix.lower()
+    if suffix == '.csv':
+        return 'csv'
+    if suffix == '.jsonl':
+        return 'jsonl'
+
+    # Fichier .json : un tableau JSON commence par '['
+    with open_text(path) as f:
+        while True:
+            char = f.read(1)
+            if not char:
+                return 'json'
+            if not char.isspace():
+                return 'json' if char == '[' else 'jsonl'
+
+
+def open_text(path: Union[str, Path]):
+    """Ouvrir un fichier de données en mode texte (décompression transparente)"""
+    return io.TextIOWrapper(open_segment(path), encoding='utf-8', newline='')
+
+
+def read_records(path: Union[str, Path]) -> Iterator[Dict[str, Any]]:
+    """Lire les enregistrements d'un fichier de données, quel que soit son format"""
+    path = Path(path)
+    file_format = detect_format(path)
+
+    if file_format == 'columnar':
+        yield from ColumnarReader(path).records()
+
+    elif file_format == 'timeseries':
+        # Enregistrements groupés par bloc (une machine par bloc)
+        yield from TimeSeriesReader(path).records()
+
+    elif file_format == 'csv':
+        with open_text(path) as f:
+            for row in csv.DictReader(f):
+                yield {key: convert_value(value) for key, value in row.items()}
+
+    elif file_format == 'jsonl':
+        with open_text(path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # Dernière ligne incomplète (écriture en cours)
+                    continue
+
+    else:
+        with open_text(path) as f:
+            data = json.load(f)
+        if not isinstance(data, list):
+            data = [data]
+        yield from data
+
+
+def convert_json_to_jsonl(source: Union[str, Path], destination: Union[str, Path]) -> int:
+    """Migrer un fichier JSON (tableau) vers le format JSON Lines"""
+    count = 0
+    with open(destination, 'w', encoding='utf-8') as f:
+        for record in read_records(source):
+            f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+            count += 1
+    return count
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 4 or sys.argv[1] != 'migrate':
+        print("Usage: python data_reader.py migrate <source.json> <destination.jsonl>")
+        sys.exit(1)
+
+    total = convert_json_to_jsonl(sys.argv[2], sys.argv[3])
+    print(f"✅ {total} enregistrements migrés vers {sys.argv[3]}")
@@ -3,22 +3,33 @@ Générateur de données simulées pour automate industriel
 Conforme au cahier des charges Usine 4.0
 """
 
-import random
-import time
-import json
-from datetime import datetime
 from typing import Dict, Any
 import logging
 
+from clock import SystemClock
+from random_streams import MachineStreams, resolve_seed
+from record import Record
+from sensor_schema import SensorSchema
+
 logger = logging.getLogger(__name__)
 
 class DataSimulator:
     """Générateur de données d'automate industriel"""
     
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(self, config: Dict[str, Any], clock=None, seed: int = None):
         self.config = config
+        # Horloge interchangeable (VirtualClock pour le remplissage historique)
+        self.clock = clock or SystemClock()
         self.machine_config = config.get('machine', {})
-        self.sensors_config = config.get('sensors', {})
+        self.sensors_config = config.get('sensors', {}) or {}
+        # Canaux définis par la section sensors, compilés en tableaux
+        self.schema = SensorSchema.from_config(self.sensors_config)
+        
+        # Flux aléatoire propre à la machine, tiré par blocs (simulation.seed)
+        if seed is None:
+            seed = resolve_seed(config.get('simulation', {}))
+        self.streams = MachineStreams([self.machine_config.get('id', 'AUTO-01')], seed,
+                                      self.schema.draws_per_step)
         
         # États des capteurs
         self.sensor_states = self._init_sensors()
@@ -27,39 +38,11 @@ class DataSimulator:
     
     def _init_sensors(self) -> Dict[str, Any]:
         """Initialiser les états des capteurs"""
+        # Canaux du schéma : un tableau (canaux, 1), avancé en une opération
+        self.current = self.schema.single_state()
         return {
-            'temperature': {
-                'current': self.sensors_config.get('temperature', {}).get('initial', 25.0),
-                'min': self.sensors_config.get('temperature', {}).get('min', 15.0),
-                'max': self.sensors_config.get('temperature', {}).get('max', 85.0),
-                'variation': self.sensors_config.get('temperature', {}).get('variation', 2.0)
-            },
-            'humidity': {
-                'current': self.sensors_config.get('humidity', {}).get('initial', 50.0),
-                'min': self.sensors_config.get('humidity', {}).get('min', 30.0),
-                'max': self.sensors_config.get('humidity', {}).get('max', 90.0),
-                'variation': self.sensors_config.get('humidity', {}).get('variation', 5.0)
-            },
-            'rpm': {
-                'current': self.sensors_config.get('rpm', {}).get('initial', 1450),
-                'min': self.sensors_config.get('rpm', {}).get('min', 0),
-                'max': self.sensors_config.get('rpm', {}).get('max', 3000),
-                'variation': self.sensors_config.get('rpm', {}).get('variation', 50)
-            },
-            'vibration': {
-                'current': self.sensors_config.get('vibration', {}).get('initial', 1.0),
-                'min': self.sensors_config.get('vibration', {}).get('min', 0.5),
-                'max': self.sensors_config.get('vibration', {}).get('max', 5.0),
-                'variation': self.sensors_config.get('vibration', {}).get('variation', 0.2)
-            },
-            'energy': {
-                'current': self.sensors_config.get('energy', {}).get('initial', 2.5),
-                'min': self.sensors_config.get('energy', {}).get('min', 0.5),
-                'max': self.sensors_config.get('energy', {}).get('max', 15.0),
-                'variation': self.sensors_config.get('energy', {}).get('variation', 0.5)
-            },
             'uptime': {
-                'start_time': time.time(),
+                'start_time': self.clock.time(),
                 'total': 0
             },
             'status': {
@@ -68,37 +51,23 @@ class DataSimulator:
             }
         }
     
-    def _update_sensor(self, sensor_name: str) -> float:
-        """Mettre à jour la valeur d'un capteur"""
-        state = self.sensor_states[sensor_name]
-        
-        # Variation aléatoire
-        variation = random.uniform(-state['variation'], state['variation'])
-        new_value = state['current'] + variation
-        
-        # Limiter aux bornes min/max
-        new_value = max(state['min'], min(state['max'], new_value))
-        
-        # Mettre à jour l'état
-        state['current'] = new_value
-        
-        return new_value
-    
-    def _update_status(self) -> str:
+    def _update_status(self, draws) -> str:
         """Mettre à jour le statut de la machine"""
         current = self.sensor_states['status']['current']
+        # Deux tirages par pas, comme FleetSimulator : les flux restent alignés
+        change, offset = draws[0, self.schema.status_change], draws[0, self.schema.status_offset]
         
         # 95% de chance de rester dans l'état actuel
-        if random.random() < 0.95:
+        if change < 0.95:
             return current
         
-        # 5% de chance de changer d'état
+        # 5% de chance de changer d'état (l'un des autres, au hasard)
         states = self.sensor_states['status']['states']
-        return random.choice([s for s in states if s != current])
+        return states[(states.index(current) + 1 + int(offset * (len(states) - 1))) % len(states)]
     
     def _calculate_uptime(self) -> int:
         """Calculer le temps de fonctionnement"""
-        current_time = time.time()
+        current_time = self.clock.time()
         uptime_state = self.sensor_states['uptime']
         
         elapsed = current_time - uptime_state.get('last_update', uptime_state['start_time'])
@@ -111,24 +80,27 @@ class DataSimulator:
         
         return int(uptime_state['total'])
     
-    def generate_data(self) -> Dict[str, Any]:
+    def generate_data(self) -> Record:
         """Générer un échantillon de données complet"""
-        # Format exact du cahier des charges
-        data = {
-            "timestamp": datetime.now().strftime("%Y-%m-%dT%H:%M:%SZ"),
-            "machine_id": self.machine_config.get('id', 'AUTO-01'),
-            "temperature": round(self._update_sensor('temperature'), 1),
-            "humidity": round(self._update_sensor('humidity'), 1),
-            "rpm": int(self._update_sensor('rpm')),
-            "vibration": round(self._update_sensor('vibration'), 1),
-            "energy_kwh": round(self._update_sensor('energy'), 1),
-            "uptime": self._calculate_uptime(),
-            "status": self._update_status()
-        }
+        # Tous les canaux avancés en une opération, puis uptime (statut précédent) et statut
+        draws = self.streams.next_step()
+        self.schema.advance(self.current, draws)
+        uptime = self._calculate_uptime()
+        
+        # Champs dans l'ordre du schéma (timestamp, machine_id, canaux, uptime, status)
+        data = self.schema.record(
+            self.clock.now().strftime("%Y-%m-%dT%H:%M:%SZ"),
+            self.machine_config.get('id', 'AUTO-01'),
+            self.schema.values(self.current),
+            uptime,
+            self._update_status(draws)
+        )
         
         # Mettre à jour le statut pour le prochain calcul d'uptime
         self.sensor_states['status']['current'] = data['status']
         
-        logger.debug(f"Données générées: {json.dumps(data)}")
+        # Encodage réservé au niveau DEBUG (partagé ensuite avec les sorties)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Données générées: {data.json_bytes.decode('utf-8')}")
         
         return data
\ No newline at end of file
@@ -0,0 +1,149 @@
+"""
+Générateur vectorisé pour une flotte de machines
+Conforme au cahier des charges Usine 4.0
+"""
+
+from typing import Dict, Any, List, Optional
+import logging
+
+import numpy as np
+
+from clock import SystemClock
+from random_streams import MachineStreams, resolve_seed
+from record import Record
+from sensor_schema import SensorSchema
+
+logger = logging.getLogger(__name__)
+
+STATUSES = ('ON', 'OFF', 'ERREUR')
+STATUS_ON = 0
+
+# 95% de chance de rester dans l'état actuel
+STATUS_STAY_PROBABILITY = 0.95
+
+
+def build_machine_ids(fleet_config: Dict[str, Any]) -> List[str]:
+    """Construire les identifiants de machines de la flotte"""
+    count = int(fleet_config.get('machines', 1))
+    prefix = fleet_config.get('id_prefix', 'AUTO-')
+    width = max(2, len(str(count)))
+    return [f"{prefix}{i:0{width}d}" for i in range(1, count + 1)]
+
+
+def machine_id_width(config: Dict[str, Any]) -> int:
+    """Longueur en octets (UTF-8) du plus long identifiant de machine configuré"""
+    fleet_config = config.get('fleet', {}) or {}
+    if fleet_config.get('machines', 0) > 0:
+        machine_ids = build_machine_ids(fleet_config)
+    else:
+        machine_ids = [(config.get('machine', {}) or {}).get('id', 'AUTO-01')]
+    return max(len(machine_id.encode('utf-8')) for machine_id in machine_ids)
+
+
+class FleetBatch:
+    """Lot columnaire produit par un pas de simulation de la flotte"""
+
+    def __init__(self, timestamp: str, machine_ids: List[str], columns: Dict[str, np.ndarray],
+                 schema: SensorSchema):
+        self.timestamp = timestamp
+        self.machine_ids = machine_ids
+        # Colonnes déjà arrondies/typées comme generate_data() :
+        # un champ de sortie par canal du schéma, puis uptime et status
+        self.columns = columns
+        self.schema = schema
+        # Enregistrements partagés par toutes les sorties du tick
+        self._records = None
+
+    def __len__(self) -> int:
+        return len(self.machine_ids)
+
+    def to_records(self) -> List[Record]:
+        """Convertir le lot en enregistrements au format de generate_data()
+
+        La conversion est faite une seule fois : les sorties reçoivent les
+        mêmes objets Record et partagent leurs encodages.
+        """
+        if self._records is not None:
+            return self._records
+
+        cols = self.columns
+        statuses = np.asarray(STATUSES, dtype=object)[cols['status']].tolist()
+        self._records = self.schema.records(
+            self.timestamp,
+            self.machine_ids,
+            [cols[output].tolist() for output in self.schema.outputs],
+            cols['uptime'].tolist(),
+            statuses
+        )
+        return self._records
+
+
+class FleetSimulator:
+    """Générateur de données pour des milliers de machines en un seul pas vectorisé"""
+
+    def __init__(self, config: Dict[str, Any], machine_ids: Optional[List[str]] = None, clock=None,
+                 seed: int = None):
+        self.config = config
+        # Horloge interchangeable (VirtualClock pour le remplissage historique)
+        self.clock = clock or SystemClock()
+        self.fleet_config = config.get('fleet', {}) or {}
+        self.sensors_config = config.get('sensors', {}) or {}
+        # Canaux définis par la section sensors, compilés en tableaux
+        self.schema = SensorSchema.from_config(self.sensors_config)
+
+        self.machine_ids = list(machine_ids) if machine_ids is not None else build_machine_ids(self.fleet_config)
+        # Un flux aléatoire indépendant par machine, tiré par blocs (simulation.seed)
+        if seed is None:
+            seed = resolve_seed(config.get('simulation', {}))
+        self.streams = MachineStreams(self.machine_ids, seed, self.schema.draws_per_step)
+
+        # États des capteurs : une ligne par canal, une colonne par machine
+        self._init_sensors()
+
+        logger.info(f"Simulateur de flotte initialisé ({len(self.machine_ids)} machines)")
+
+    def _init_sensors(self):
+        """Initialiser les tableaux d'état des capteurs"""
+        count = len(self.machine_ids)
+        # Une ligne par canal du schéma (contiguë), une colonne par machine
+        self.current = self.schema.initial_state(count)
+
+        self.status = np.full(count, STATUS_ON, dtype=np.int8)
+        self.uptime_total = np.zeros(count)
+        self.last_update = self.clock.time()
+
+    def _update_sensors(self, draws: np.ndarray):
+        """Marche aléatoire bornée de tous les capteurs de toutes les machines"""
+        self.schema.advance(self.current, draws)
+
+    def _update_uptime(self):
+        """Cumuler le temps de fonctionnement des machines à l'état ON"""
+        current_time = self.clock.time()
+        elapsed = current_time - self.last_update
+        self.uptime_total[self.status == STATUS_ON] += elapsed
+        self.last_update = current_time
+
+    def _update_status(self, draws: np.ndarray):
+        """Transitions d'état : 5% de chance de passer à l'un des deux autres états"""
+        change = draws[:, self.schema.status_change] >= STATUS_STAY_PROBABILITY
+        offset = 1 + (draws[:, self.schema.status_offset] * (len(STATUSES) - 1)).astype(np.int64)
+        self.status = np.where(change, (self.status + offset) % len(STATUSES), self.status).astype(np.int8)
+
+    def step(self) -> FleetBatch:
+        """Avancer toutes les machines d'un pas et retourner le lot columnaire"""
+        draws = self.streams.next_step()
+        self._update_sensors(draws)
+        # L'uptime est calculé avec le statut précédent, comme DataSimulator
+        self._update_uptime()
+        self._update_status(draws)
+
+        columns = self.schema.columns(self.current)
+        columns['uptime'] = self.uptime_total.astype(np.int64)
+        columns['status'] = self.status.copy()
+
+        timestamp = self.clock.now().strftime("%Y-%m-%dT%H:%M:%SZ")
+        return FleetBatch(timestamp, self.machine_ids, columns, self.schema)
+
+    def generate_data(self) -> List[Dict[str, Any]]:
+        """Générer un échantillon complet pour chaque machine de la flotte"""
+        return self.step().to_records()
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Générateur de charge en boucle ouverte pour le Simulateur Usine 4.0
+Les enregistrements sont émis au débit cible quel que soit le temps de
+réponse des sorties ; la latence est mesurée depuis l'instant d'envoi prévu
+(pas d'omission coordonnée)
+
+Usage :
+    python loadgen.py config.yaml --rate 5000 --duration 60
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+import logging
+
+from metrics import HdrHistogram
+
+logger = logging.getLogger(__name__)
+
+# Enregistrements émis au plus par passage avant de rendre la main aux envois
+ISSUE_BUDGET = 1000
+
+
+class RateSchedule:
+    """Instants d'envoi prévus pour une suite de paliers de débit
+
+    Chaque palier a un débit (enregistrements/s) et une durée ; avec
+    ramp: true, le débit monte (ou descend) linéairement depuis celui du
+    palier précédent.
+    """
+
+    def __init__(self, stages: List[Dict[str, Any]]):
+        self.stages = []
+        start_time, start_count, previous_rate = 0.0, 0.0, 0.0
+        for stage in stages:
+            rate = float(stage['rate'])
+            duration = float(stage['duration'])
+            initial = previous_rate if stage.get('ramp', False) else rate
+            count = (initial + rate) / 2 * duration
+            self.stages.append((start_time, start_count, initial, rate, duration))
+            start_time += duration
+            start_count += count
+            previous_rate = rate
+        self.duration = start_time
+        self.total = int(start_count)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'RateSchedule':
+        """Paliers de la section loadgen (ou palier unique rate/duration)"""
+        stages = config.get('stages') or [{'rate': config.get('rate', 1000),
+                                           'duration': config.get('duration', 60)}]
+        return cls(stages)
+
+    def time_of(self, index: int) -> Optional[float]:
+        """Instant prévu (secondes depuis le début) du index-ième enregistrement"""
+        if index >= self.total:
+            return None
+        for start_time, start_count, initial, rate, duration in self.stages:
+            count = (initial + rate) / 2 * duration
+            n = index - start_count
+            if n >= count:
+                continue
+            # n(t) = initial.t + (rate - initial).t² / 2D, inversé sous forme stable
+            a = (rate - initial) / (2 * duration)
+            denominator = initial + math.sqrt(max(initial * initial + 4 * a * n, 0.0))
+            return start_time + (2 * n / denominator if denominator > 0 else 0.0)
+        return None
+
+
+class LoadGenerator:
+    """Émission en boucle ouverte vers les outputs d'un simulateur
+
+    Chaque enregistrement est envoyé à chaque output dans une tâche propre :
+    un output lent n'espace pas les émissions, il allonge les latences.
+    La latence court jusqu'à la livraison effective : envoi du lot HTTP,
+    accusé PUBACK en MQTT QoS 1 (outputs dont tracks_delivery est vrai),
+    sinon retour de send_data. Les échecs sont comptés à part.
+    """
+
+    def __init__(self, simulateur, config: Dict[str, Any] = None):
+        self.simulateur = simulateur
+        config = config if config is not None else simulateur.config.get('loadgen', {}) or {}
+        self.schedule = RateSchedule.from_config(config)
+        self.max_outstanding = config.get('max_outstanding', 100000)
+        self.report_path = config.get('report')
+        self.shutdown_timeout = config.get('shutdown_timeout', 30)
+
+        # Latences (µs) des livraisons réussies depuis l'instant prévu, par output
+        self.latency: Dict[str, HdrHistogram] = {}
+        # Échecs d'envoi par output (hors histogrammes)
+        self.failed: Dict[str, int] = {}
+        # Livraisons attendues par output : id(enregistrement) -> (instant prévu, enregistrement)
+        self._outstanding: Dict[str, Dict[int, tuple]] = {}
+        # Retard d'émission (µs) : saturation du générateur lui-même
+        self.issue_lag = HdrHistogram()
+        self._pending = set()
+        self._records = []
+
+        self.stats = {
+            'issued': 0,
+            'completed': 0,
+            'overload': 0,
+            'elapsed': 0.0
+        }
+
+    def _next_record(self) -> Dict[str, Any]:
+        """Enregistrement suivant (flotte : machines à tour de rôle)"""
+        simulateur = self.simulateur
+        if simulateur.fleet_simulator is None:
+            return simulateur.data_simulator.generate_data()
+        if not self._records:
+            self._records = simulateur.fleet_simulator.step().to_records()[::-1]
+        return self._records.pop()
+
+    def _complete(self, name: str, intended: float, ok: bool):
+        if ok:
+            self.latency[name].record((time.monotonic() - intended) * 1e6)
+        else:
+            self.failed[name] += 1
+        self.stats['completed'] += 1
+
+    def _delivery_callback(self, name: str):
+        """Accusé de livraison d'un output (lot envoyé, PUBACK reçu, ou échec)"""
+        outstanding = self._outstanding[name]
+
+        def on_delivery(data: Dict[str, Any], ok: bool):
+            entry = outstanding.pop(id(data), None)
+            # Enregistrements hors génération de charge, ou déjà signalés (échec puis accusé)
+            if entry is not None:
+                self._complete(name, entry[0], ok)
+        return on_delivery
+
+    @property
+    def outstanding(self) -> int:
+        """Envois en cours et livraisons pas encore accusées"""
+        return len(self._pending) + sum(len(entries) for entries in self._outstanding.values())
+
+    async def _send(self, output, name: str, data: Dict[str, Any], intended: float):
+        if output.tracks_delivery:
+            # Instant prévu conservé jusqu'à l'accusé (l'enregistrement reste référencé)
+            self._outstanding[name][id(data)] = (intended, data)
+            try:
+                await output.send_data(data)
+            except Exception as e:
+                logger.error(f"Erreur d'envoi {name}: {e}")
+                if self._outstanding[name].pop(id(data), None) is not None:
+                    self._complete(name, intended, False)
+            return
+
+        failed = output.stats['records_failed']
+        try:
+            await output.send_data(data)
+            ok = output.stats['records_failed'] == failed
+        except Exception as e:
+            logger.error(f"Erreur d'envoi {name}: {e}")
+            ok = False
+        self._complete(name, intended, ok)
+
+    def _issue(self, data: Dict[str, Any], intended: float):
+        for output in self.simulateur.outputs:
+            name = output.__class__.__name__
+            if self.outstanding >= self.max_outstanding:
+                # Mémoire bornée : l'envoi est compté comme perdu, sans attendre
+                self.stats['overload'] += 1
+                continue
+            task = asyncio.ensure_future(self._send(output, name, data, intended))
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+
+    async def run(self) -> Dict[str, Any]:
+        """Dérouler les paliers puis attendre les envois en cours ; retourne le rapport"""
+        simulateur = self.simulateur
+        simulateur.running = True
+        for output in simulateur.outputs:
+            # Pas de ligne par enregistrement : le rapport final les remplace
+            output.verbose = False
+            name = output.__class__.__name__
+            self.latency[name] = HdrHistogram()
+            self.failed[name] = 0
+            self._outstanding[name] = {}
+            output.on_delivery = self._delivery_callback(name)
+            await output.initialize()
+
+        logger.info(f"Génération de charge: {self.schedule.total} enregistrements "
+                    f"en {self.schedule.duration:.0f}s")
+        start = time.monotonic()
+        index = 0
+        try:
+            while simulateur.running:
+                now = time.monotonic()
+                issued = 0
+                offset = self.schedule.time_of(index)
+                while offset is not None and start + offset <= now and issued < ISSUE_BUDGET:
+                    intended = start + offset
+                    self.issue_lag.record((time.monotonic() - intended) * 1e6)
+                    self._issue(self._next_record(), intended)
+                    index += 1
+                    issued += 1
+                    offset = self.schedule.time_of(index)
+                if offset is None:
+                    break
+                await asyncio.sleep(max(0.0, start + offset - time.monotonic()))
+            self.stats['issued'] = index
+            self.stats['elapsed'] = time.monotonic() - start
+
+            # Envois en cours puis accusés (lots en attente, PUBACK) dans la limite du délai
+            deadline = time.monotonic() + self.shutdown_timeout
+            if self._pending:
+                done, pending = await asyncio.wait(set(self._pending), timeout=self.shutdown_timeout)
+                for task in pending:
+                    task.cancel()
+            while self.outstanding and time.monotonic() < deadline:
+                await asyncio.sleep(0.01)
+        finally:
+            # Le nettoyage envoie les derniers lots et attend les derniers accusés
+            for output in simulateur.outputs:
+                await output.cleanup()
+                output.on_delivery = None
+
+        # Livraisons jamais accusées : comptées en échec
+        for name, outstanding in self._outstanding.items():
+            for intended, _ in outstanding.values():
+                self._complete(name, intended, False)
+            outstanding.clear()
+        report = self.report()
+        if self.report_path:
+            Path(self.report_path).parent.mkdir(parents=True, exist_ok=True)
+            with open(self.report_path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+        return report
+
+    def report(self) -> Dict[str, Any]:
+        """Débit obtenu et centiles de latence (ms) des livraisons réussies, par output"""
+        elapsed = self.stats['elapsed']
+        outputs = {}
+        for name, histogram in self.latency.items():
+            outputs[name] = {
+                'completed': histogram.count,
+                'failed': self.failed.get(name, 0),
+                'throughput': histogram.count / elapsed if elapsed else 0.0,
+                'latency_ms': {key: value / 1000 for key, value in histogram.percentiles().items()},
+                'latency_mean_ms': histogram.mean / 1000
+            }
+        return {
+            'target_records': self.schedule.total,
+            'issued': self.stats['issued'],
+            'overload': self.stats['overload'],
+            'elapsed_s': elapsed,
+            'offered_rate': self.stats['issued'] / elapsed if elapsed else 0.0,
+            'issue_lag_ms': {key: value / 1000 for key, value in self.issue_lag.percentiles().items()},
+            'outputs': outputs
+        }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Rapport lisible (tableau des centiles par output)"""
+    lines = [
+        "📈 RAPPORT DE CHARGE (boucle ouverte)",
+        "=" * 100,
+        f"Émis: {report['issued']}/{report['target_records']} en {report['elapsed_s']:.1f}s "
+        f"({report['offered_rate']:.0f}/s) | Surcharge: {report['overload']} | "
+        f"Retard d'émission p99: {report['issue_lag_ms']['p99']:.2f}ms",
+        "-" * 100,
+        f"{'Output':<16}{'terminés':>10}{'échecs':>8}{'débit/s':>10}{'p50 ms':>10}{'p90 ms':>10}"
+        f"{'p99 ms':>10}{'p99.9 ms':>10}{'max ms':>10}"
+    ]
+    for name, stats in report['outputs'].items():
+        latency = stats['latency_ms']
+        lines.append(f"{name:<16}{stats['completed']:>10}{stats['failed']:>8}{stats['throughput']:>10.0f}"
+                     f"{latency['p50']:>10.2f}{latency['p90']:>10.2f}{latency['p99']:>10.2f}"
+                     f"{latency['p99.9']:>10.2f}{latency['max']:>10.2f}")
+    return "\n".join(lines)
+
+
+async def run_loadgen(simulateur, config: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Lancer la génération de charge et afficher le rapport"""
+    report = await LoadGenerator(simulateur, config).run()
+    print(format_report(report))
+    return report
+
+
+def main(argv: Optional[list] = None):
+    from simulateur import SimulateurUsine
+
+    parser = argparse.ArgumentParser(description="Générateur de charge en boucle ouverte")
+    parser.add_argument('config', nargs='?', default='config.yaml')
+    parser.add_argument('--rate', type=float, help="Débit cible (enregistrements/s), palier unique")
+    parser.add_argument('--duration', type=float, help="Durée du palier unique (secondes)")
+    parser.add_argument('--report', help="Rapport JSON")
+    args = parser.parse_args(argv)
+
+    simulateur = SimulateurUsine(args.config)
+    config = dict(simulateur.config.get('loadgen', {}) or {})
+    if args.rate is not None or args.duration is not None:
+        config['stages'] = [{'rate': args.rate if args.rate is not None else config.get('rate', 1000),
+                             'duration': args.duration if args.duration is not None
+                             else config.get('duration', 60)}]
+    if args.report:
+        config['report'] = args.report
+    asyncio.run(run_loadgen(simulateur, config))
+
+
+if __name__ == '__main__':
+    main()
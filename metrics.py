@@ -0,0 +1,290 @@
+"""
+Métriques d'exécution du Simulateur Usine 4.0
+Compteurs, jauges et histogrammes exposés au format texte Prometheus
+"""
+
+import bisect
+import math
+from typing import Dict, Any, Callable, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Bornes des histogrammes de latence (secondes)
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Histogram:
+    """Histogramme à bornes fixes (mémoire constante)"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        # Un compteur par borne plus le dépassement (+Inf)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        """Ajouter une observation"""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, p: float) -> float:
+        """Estimer un quantile par interpolation linéaire dans la classe concernée"""
+        if self.count == 0:
+            return math.nan
+
+        rank = p * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            if count and cumulative + count >= rank:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+
+class HdrHistogram:
+    """Histogramme à plage dynamique (style HdrHistogram) sur des entiers
+
+    Classes log-linéaires : chaque puissance de deux est découpée en classes
+    linéaires, d'où une erreur relative bornée (significant_digits chiffres
+    significatifs) de lowest à highest, en mémoire constante.
+    """
+
+    def __init__(self, highest: int = 3600 * 10 ** 6, significant_digits: int = 2):
+        self.highest = highest
+        # Classes linéaires par puissance de deux : 2 x 10^chiffres arrondi à la puissance de deux
+        self._sub_bucket_count = 1 << math.ceil(math.log2(2 * 10 ** significant_digits))
+        self._half_magnitude = self._sub_bucket_count.bit_length() - 2
+        self._half_count = self._sub_bucket_count // 2
+        self._mask = self._sub_bucket_count - 1
+
+        buckets = 1
+        while (self._sub_bucket_count << (buckets - 1)) <= highest:
+            buckets += 1
+        self.counts = [0] * ((buckets + 1) * self._half_count)
+        self.count = 0
+        self.sum = 0
+        self.min = None
+        self.max = 0
+
+    def _index(self, value: int) -> int:
+        bucket = (value | self._mask).bit_length() - (self._half_magnitude + 1)
+        sub_bucket = value >> bucket
+        return ((bucket + 1) << self._half_magnitude) + sub_bucket - self._half_count
+
+    def _value_at(self, index: int) -> int:
+        # Borne haute de la classe (valeur équivalente la plus grande)
+        bucket = (index >> self._half_magnitude) - 1
+        sub_bucket = (index & (self._half_count - 1)) + self._half_count
+        if bucket < 0:
+            sub_bucket -= self._half_count
+            bucket = 0
+        return ((sub_bucket + 1) << bucket) - 1
+
+    def record(self, value: int):
+        """Ajouter une valeur entière (bornée à [0, highest])"""
+        value = min(max(int(value), 0), self.highest)
+        self.counts[self._index(value)] += 1
+        self.count += 1
+        self.sum += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: 'HdrHistogram'):
+        """Ajouter les valeurs d'un histogramme de même configuration"""
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.count += other.count
+        self.sum += other.sum
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        self.max = max(self.max, other.max)
+
+    def value_at_percentile(self, percentile: float) -> int:
+        """Valeur au centile donné (0-100), à la précision de la classe"""
+        if self.count == 0:
+            return 0
+        rank = max(1, math.ceil(percentile / 100 * self.count))
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return min(self._value_at(index), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def percentiles(self, points=(50, 90, 99, 99.9, 99.99)) -> Dict[str, int]:
+        """Centiles usuels, minimum et maximum"""
+        result = {f"p{point:g}": self.value_at_percentile(point) for point in points}
+        result['min'] = self.min or 0
+        result['max'] = self.max
+        return result
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = (
+        '{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in pairs
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """Registre des métriques, rendu au format d'exposition texte Prometheus"""
+
+    def __init__(self, prefix: str = 'usine'):
+        self.prefix = prefix
+        self._metrics: Dict[str, Dict[str, Any]] = {}
+        self._collectors: List[Callable[[], None]] = []
+
+    def _declare(self, name: str, metric_type: str, help_text: str):
+        name = f"{self.prefix}_{name}"
+        if name not in self._metrics:
+            self._metrics[name] = {'type': metric_type, 'help': help_text, 'samples': {}}
+        return self._metrics[name]
+
+    def counter(self, name: str, help_text: str = ''):
+        """Déclarer un compteur (valeur croissante)"""
+        self._declare(name, 'counter', help_text)
+
+    def gauge(self, name: str, help_text: str = ''):
+        """Déclarer une jauge (valeur instantanée)"""
+        self._declare(name, 'gauge', help_text)
+
+    def histogram(self, name: str, help_text: str = ''):
+        """Déclarer un histogramme"""
+        self._declare(name, 'histogram', help_text)
+
+    def _metric(self, name: str) -> Dict[str, Any]:
+        try:
+            return self._metrics[f"{self.prefix}_{name}"]
+        except KeyError:
+            raise KeyError(f"Métrique non déclarée: {name}")
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Incrémenter un compteur"""
+        samples = self._metric(name)['samples']
+        key = tuple(sorted(labels.items()))
+        samples[key] = samples.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        """Fixer la valeur d'un compteur ou d'une jauge"""
+        self._metric(name)['samples'][tuple(sorted(labels.items()))] = value
+
+    def observe(self, name: str, value: float, **labels):
+        """Ajouter une observation à un histogramme"""
+        samples = self._metric(name)['samples']
+        key = tuple(sorted(labels.items()))
+        histogram = samples.get(key)
+        if histogram is None:
+            histogram = samples[key] = Histogram()
+        histogram.observe(value)
+
+    def attach(self, name: str, histogram: Histogram, **labels):
+        """Exposer un histogramme tenu par un autre composant"""
+        self._metric(name)['samples'][tuple(sorted(labels.items()))] = histogram
+
+    def get(self, name: str, **labels) -> Any:
+        """Valeur courante d'une métrique (None si absente)"""
+        return self._metric(name)['samples'].get(tuple(sorted(labels.items())))
+
+    def add_collector(self, collector: Callable[[], None]):
+        """Fonction appelée avant chaque rendu pour rafraîchir les métriques"""
+        self._collectors.append(collector)
+
+    def collect(self):
+        """Rafraîchir les métriques calculées à la demande"""
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                logger.error(f"Erreur collecte métriques: {e}")
+
+    def render(self) -> str:
+        """Exposition texte au format Prometheus (version 0.0.4)"""
+        self.collect()
+
+        lines = []
+        for name, metric in self._metrics.items():
+            if not metric['samples']:
+                continue
+            if metric['help']:
+                lines.append(f"# HELP {name} {metric['help']}")
+            lines.append(f"# TYPE {name} {metric['type']}")
+
+            for labels, value in metric['samples'].items():
+                if metric['type'] != 'histogram':
+                    if value is not None:
+                        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                    continue
+
+                cumulative = 0
+                for bound, count in zip(value.buckets + (math.inf,), value.counts):
+                    cumulative += count
+                    le = ('le', _format_value(float(bound)))
+                    lines.append(f"{name}_bucket{_format_labels(labels, le)} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(value.sum)}")
+                lines.append(f"{name}_count{_format_labels(labels)} {value.count}")
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsServer:
+    """Point d'accès HTTP local exposant /metrics"""
+
+    def __init__(self, registry: MetricsRegistry, host: str = '127.0.0.1', port: int = 9108):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._runner = None
+
+    async def start(self):
+        """Démarrer le serveur HTTP"""
+        from aiohttp import web
+
+        async def handle_metrics(request):
+            return web.Response(body=self.registry.render().encode('utf-8'),
+                                headers={'Content-Type': CONTENT_TYPE})
+
+        app = web.Application()
+        app.router.add_get('/metrics', handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+
+        # Port effectif (port 0 = choisi par le système)
+        sockets = site._server.sockets if site._server else []
+        if sockets:
+            self.port = sockets[0].getsockname()[1]
+        logger.info(f"Métriques exposées sur http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        """Arrêter le serveur HTTP"""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
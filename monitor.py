@@ -2,14 +2,33 @@
 Script de monitoring du simulateur
 """
 
+import argparse
+import asyncio
+import csv
+import io
 import json
+import os
+import sys
 import time
 from pathlib import Path
 from datetime import datetime
 
-def monitor_data_file():
-    """Surveiller le fichier de données"""
-    data_file = Path("data/machine_data.json")
+import yaml
+
+from columnar_storage import ColumnarReader
+from data_reader import read_records, detect_format, convert_value
+from online_stats import RecordStats, RunningStats
+from timeseries_storage import TimeSeriesReader
+from outputs.mqtt_client import MQTTClient
+from sensor_schema import SensorSchema
+from serializers import PayloadDecoder
+
+# Champs affichés par le tableau de bord --follow
+FOLLOWED_FIELDS = ['temperature', 'humidity', 'rpm', 'vibration', 'energy_kwh', 'uptime']
+
+def monitor_data_file(path: str = "data/machine_data.json"):
+    """Surveiller le fichier de données (JSON, JSON Lines, CSV, columnaire ou séries temporelles)"""
+    data_file = Path(path)
     
     if not data_file.exists():
         print("❌ Fichier de données introuvable")
@@ -19,17 +38,26 @@ def monitor_data_file():
     print("=" * 40)
     
     try:
-        with open(data_file, 'r') as f:
-            data = json.load(f)
+        if detect_format(data_file) == 'columnar':
+            # Projection mémoire : colonnes lues sans copie ni analyse
+            reader = ColumnarReader(data_file)
+            total_records = len(reader)
+            latest_record = next(reader.records(total_records - 1), None)
+            temps = reader.column('temperature')
+        else:
+            # Lecture en flux, statistiques incrémentales à mémoire constante
+            stats = RecordStats(quantiles=())
+            for record in read_records(data_file):
+                stats.add(record)
+            total_records = stats.count
+            latest_record = stats.latest
+            temps = stats.fields.get('temperature')
         
-        if not data:
+        if not total_records:
             print("❌ Aucune donnée trouvée")
             return
         
         # Statistiques
-        total_records = len(data)
-        latest_record = data[-1]
-        
         print(f"📈 Total d'enregistrements: {total_records}")
         print(f"🕐 Dernier timestamp: {latest_record['timestamp']}")
         print(f"🏭 Machine ID: {latest_record['machine_id']}")
@@ -43,10 +71,12 @@ def monitor_data_file():
         
         # Calculs statistiques
         if total_records > 1:
-            temps = [record['temperature'] for record in data]
-            temp_avg = sum(temps) / len(temps)
-            temp_min = min(temps)
-            temp_max = max(temps)
+            if isinstance(temps, RunningStats):
+                temp_avg, temp_min, temp_max = temps.mean, temps.min, temps.max
+            else:
+                temp_avg = float(temps.mean())
+                temp_min = float(temps.min())
+                temp_max = float(temps.max())
             
             print("\n📊 STATISTIQUES TEMPÉRATURE:")
             print(f"   Moyenne: {temp_avg:.1f}°C")
@@ -56,5 +86,214 @@ def monitor_data_file():
     except Exception as e:
         print(f"❌ Erreur: {e}")
 
+class FileTailer:
+    """Lecture incrémentale d'un fichier de données depuis le dernier offset"""
+    
+    def __init__(self, path: Path, chunk_size: int = 1024 * 1024):
+        self.path = Path(path)
+        self.chunk_size = chunk_size
+        self.offset = 0
+        self._inode = None
+        self._partial = b''
+        self._csv_header = None
+        self._format = None
+    
+    def _reset(self):
+        """Repartir du début (fichier pivoté ou tronqué)"""
+        self.offset = 0
+        self._partial = b''
+        self._csv_header = None
+        self._format = None
+    
+    def read_new(self):
+        """Générer les enregistrements ajoutés depuis le dernier appel"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        
+        if self._inode is not None and (st.st_ino != self._inode or st.st_size < self.offset):
+            self._reset()
+        self._inode = st.st_ino
+        
+        if self._format is None:
+            if st.st_size == 0:
+                return
+            self._format = detect_format(self.path)
+        
+        if self._format == 'columnar':
+            # Offset exprimé en nombre d'enregistrements
+            reader = ColumnarReader(self.path)
+            for start in range(self.offset, len(reader), self.chunk_size):
+                yield from reader.records(start, start + self.chunk_size)
+            self.offset = max(self.offset, len(reader))
+            return
+        
+        if self._format == 'timeseries':
+            # Offset en octets : blocs complets écrits depuis le dernier appel
+            reader = TimeSeriesReader(self.path, self.offset)
+            yield from reader.records()
+            self.offset = reader.end
+            return
+        
+        if self._format == 'json':
+            raise ValueError("Le suivi nécessite un format jsonl, csv, columnar ou timeseries")
+        
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            while True:
+                chunk = f.read(self.chunk_size)
+                if not chunk:
+                    break
+                self.offset += len(chunk)
+                lines = (self._partial + chunk).split(b'\n')
+                # La dernière ligne peut être incomplète (écriture en cours)
+                self._partial = lines.pop()
+                for line in lines:
+                    record = self._parse(line)
+                    if record is not None:
+                        yield record
+    
+    def _parse(self, line: bytes):
+        """Décoder une ligne complète"""
+        line = line.strip()
+        if not line:
+            return None
+        text = line.decode('utf-8')
+        
+        if self._format == 'csv':
+            row = next(csv.reader(io.StringIO(text)))
+            if self._csv_header is None:
+                self._csv_header = row
+                return None
+            return {key: convert_value(value) for key, value in zip(self._csv_header, row)}
+        
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            return None
+
+def render_stats(stats: RecordStats, path, rate: float) -> str:
+    """Construire l'affichage du tableau de bord"""
+    lines = [
+        f"📊 MONITORING DU SIMULATEUR - {path}",
+        "=" * 92,
+        f"📈 Enregistrements: {stats.count}  ({rate:.1f}/s)"
+    ]
+    if stats.latest:
+        lines.append(f"🕐 Dernier: {stats.latest.get('timestamp')} | "
+                     f"Machine: {stats.latest.get('machine_id')} | "
+                     f"Statut: {stats.latest.get('status')}")
+    
+    lines.append("")
+    lines.append(f"{'Capteur':<12}{'count':>10}{'moyenne':>10}{'écart-t':>10}"
+                 f"{'min':>10}{'max':>10}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for name in FOLLOWED_FIELDS + sorted(set(stats.fields) - set(FOLLOWED_FIELDS)):
+        field = stats.fields.get(name)
+        if field is None:
+            continue
+        lines.append(f"{name:<12}{field.count:>10}{field.mean:>10.2f}{field.std:>10.2f}"
+                     f"{field.min:>10.1f}{field.max:>10.1f}{field.quantile(0.5):>10.1f}"
+                     f"{field.quantile(0.95):>10.1f}{field.quantile(0.99):>10.1f}")
+    return "\n".join(lines)
+
+def follow_data_file(path: str = "data/machine_data.jsonl", refresh: float = 1.0, poll: float = 0.1):
+    """Suivre le fichier de données et rafraîchir les statistiques à cadence fixe"""
+    data_file = Path(path)
+    tailer = FileTailer(data_file)
+    stats = RecordStats()
+    clear = "\033[H\033[J" if sys.stdout.isatty() else ""
+    
+    last_count = 0
+    next_refresh = time.monotonic()
+    try:
+        while True:
+            for record in tailer.read_new():
+                stats.add(record)
+            
+            now = time.monotonic()
+            if now >= next_refresh:
+                rate = (stats.count - last_count) / refresh
+                last_count = stats.count
+                sys.stdout.write(clear + render_stats(stats, data_file, rate) + "\n")
+                sys.stdout.flush()
+                next_refresh += refresh
+                if next_refresh < now:
+                    next_refresh = now + refresh
+            
+            time.sleep(min(poll, max(0.0, next_refresh - time.monotonic())))
+    except KeyboardInterrupt:
+        print("\n🛑 Monitoring arrêté")
+    except ValueError as e:
+        print(f"❌ {e}")
+
+async def _follow_mqtt(client: MQTTClient, topic: str, decoder: PayloadDecoder, refresh: float):
+    """Décoder les publications reçues (tout encodage) et rafraîchir les statistiques"""
+    await client.connect()
+    await client.subscribe(topic, timeout=client.connect_timeout)
+    source = f"mqtt://{client.broker_host}:{client.broker_port}/{topic}"
+    stats = RecordStats()
+    clear = "\033[H\033[J" if sys.stdout.isatty() else ""
+    invalid = 0
+    
+    last_count = 0
+    next_refresh = time.monotonic() + refresh
+    try:
+        while client.connected:
+            try:
+                _, payload = await asyncio.wait_for(client.messages.get(), max(0.0, next_refresh - time.monotonic()))
+                stats.add(decoder.decode(payload))
+            except asyncio.TimeoutError:
+                pass
+            except ValueError:
+                # Charge utile illisible ou schéma packed inconnu
+                invalid += 1
+            
+            now = time.monotonic()
+            if now >= next_refresh:
+                rate = (stats.count - last_count) / refresh
+                last_count = stats.count
+                text = render_stats(stats, source, rate)
+                if invalid:
+                    text += f"\n⚠️  Charges utiles non décodées: {invalid}"
+                sys.stdout.write(clear + text + "\n")
+                sys.stdout.flush()
+                next_refresh = max(next_refresh + refresh, now)
+        print("❌ Connexion MQTT perdue")
+    finally:
+        await client.disconnect()
+
+def follow_mqtt(broker: str, topic: str = "usine/#", config_path: str = "config.yaml", refresh: float = 1.0):
+    """S'abonner au broker MQTT et suivre les publications du simulateur"""
+    host, _, port = broker.partition(':')
+    # Schéma des capteurs de la configuration : décodage des charges packed
+    sensors_config = None
+    if Path(config_path).exists():
+        with open(config_path, 'r', encoding='utf-8') as f:
+            sensors_config = (yaml.safe_load(f) or {}).get('sensors')
+    decoder = PayloadDecoder([SensorSchema.from_config(sensors_config)])
+    
+    client = MQTTClient(host or 'localhost', int(port or 1883), client_id=f"usine-monitor-{os.getpid()}")
+    try:
+        asyncio.run(_follow_mqtt(client, topic, decoder, refresh))
+    except KeyboardInterrupt:
+        print("\n🛑 Monitoring arrêté")
+    except (ConnectionError, OSError, asyncio.TimeoutError) as e:
+        print(f"❌ MQTT: {e or 'délai dépassé'}")
+
 if __name__ == '__main__':
-    monitor_data_file()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Monitoring du simulateur")
+    parser.add_argument('path', nargs='?', default="data/machine_data.json", help="Fichier de données")
+    parser.add_argument('--follow', '-f', action='store_true', help="Suivre le fichier en continu")
+    parser.add_argument('--refresh', type=float, default=1.0, help="Période de rafraîchissement (secondes)")
+    parser.add_argument('--mqtt', metavar='HOTE:PORT', help="Suivre les publications MQTT au lieu d'un fichier")
+    parser.add_argument('--topic', default="usine/#", help="Filtre de topics MQTT")
+    parser.add_argument('--config', default="config.yaml", help="Configuration (schéma des capteurs, encodage packed)")
+    args = parser.parse_args()
+    
+    if args.mqtt:
+        follow_mqtt(args.mqtt, args.topic, args.config, args.refresh)
+    elif args.follow:
+        follow_data_file(args.path, args.refresh)
+    else:
+        monitor_data_file(args.path)
\ No newline at end of file
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Broker MQTT minimal local (tests et bancs de performance)
+Accepte les connexions MQTT 3.1.1, acquitte les publications QoS 0/1,
+relaie aux abonnés (QoS 0) et compte messages et octets reçus
+
+Usage :
+    python mqtt_broker.py --port 1883
+"""
+
+import argparse
+import asyncio
+import struct
+import time
+from collections import deque
+from typing import Dict, Optional, Set
+import logging
+
+from outputs.mqtt_client import (
+    CONNECT, CONNACK, PUBLISH, PUBACK, SUBSCRIBE, SUBACK, PINGREQ, PINGRESP, DISCONNECT,
+    decode_publish, encode_packet, encode_publish, read_packet
+)
+
+logger = logging.getLogger(__name__)
+
+
+def topic_matches(pattern: str, topic: str) -> bool:
+    """Filtre d'abonnement MQTT avec jokers + (un niveau) et # (fin)"""
+    pattern_levels = pattern.split('/')
+    topic_levels = topic.split('/')
+    for i, level in enumerate(pattern_levels):
+        if level == '#':
+            return True
+        if i >= len(topic_levels) or (level != '+' and level != topic_levels[i]):
+            return False
+    return len(pattern_levels) == len(topic_levels)
+
+
+class LocalBroker:
+    """Broker MQTT en mémoire, sans persistance ni authentification"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 1883, keep_messages: int = 0):
+        self.host = host
+        self.port = port
+        self._server = None
+        self._subscribers: Dict[asyncio.StreamWriter, Set[str]] = {}
+        # Derniers messages reçus (topic, payload), pour les tests
+        self.messages = deque(maxlen=keep_messages) if keep_messages else None
+
+        self.stats = {
+            'connections': 0,
+            'messages': 0,
+            'bytes': 0,
+            'duplicates': 0
+        }
+        self._started = time.monotonic()
+
+    async def start(self):
+        """Démarrer l'écoute TCP (port 0 = choisi par le système)"""
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._started = time.monotonic()
+        logger.info(f"Broker MQTT local sur {self.host}:{self.port}")
+
+    async def stop(self):
+        """Fermer l'écoute et les connexions clientes"""
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._subscribers):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    @property
+    def rate(self) -> float:
+        """Messages reçus par seconde depuis le démarrage"""
+        elapsed = time.monotonic() - self._started
+        return self.stats['messages'] / elapsed if elapsed > 0 else 0.0
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._subscribers[writer] = set()
+        try:
+            while True:
+                packet_type, flags, body = await read_packet(reader)
+                if packet_type == CONNECT:
+                    self.stats['connections'] += 1
+                    writer.write(encode_packet(CONNACK, 0, b'\x00\x00'))
+                elif packet_type == PUBLISH:
+                    topic, payload, qos, packet_id = decode_publish(flags, body)
+                    self.stats['messages'] += 1
+                    self.stats['bytes'] += len(payload)
+                    if flags & 0x08:
+                        self.stats['duplicates'] += 1
+                    if self.messages is not None:
+                        self.messages.append((topic, payload))
+                    if qos:
+                        writer.write(encode_packet(PUBACK, 0, struct.pack('!H', packet_id)))
+                    self._forward(topic, payload)
+                elif packet_type == SUBSCRIBE:
+                    packet_id = struct.unpack_from('!H', body)[0]
+                    position, granted = 2, b''
+                    while position < len(body):
+                        length = struct.unpack_from('!H', body, position)[0]
+                        self._subscribers[writer].add(body[position + 2:position + 2 + length].decode('utf-8'))
+                        position += 3 + length
+                        granted += b'\x00'
+                    writer.write(encode_packet(SUBACK, 0, struct.pack('!H', packet_id) + granted))
+                elif packet_type == PINGREQ:
+                    writer.write(encode_packet(PINGRESP, 0, b''))
+                elif packet_type == DISCONNECT:
+                    break
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            del self._subscribers[writer]
+            writer.close()
+
+    def _forward(self, topic: str, payload: bytes):
+        """Relayer une publication aux abonnés concernés (QoS 0)"""
+        packet = None
+        for writer, patterns in self._subscribers.items():
+            if any(topic_matches(pattern, topic) for pattern in patterns):
+                packet = packet or encode_publish(topic, payload)
+                writer.write(packet)
+
+
+async def _serve(host: str, port: int, interval: float):
+    broker = LocalBroker(host, port)
+    await broker.start()
+    print(f"📡 Broker MQTT local sur {broker.host}:{broker.port} (Ctrl+C pour arrêter)")
+    last = 0
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            received = broker.stats['messages']
+            print(f"📊 {received} messages ({(received - last) / interval:.0f}/s), "
+                  f"{broker.stats['bytes'] / 1024:.1f} Ko, {broker.stats['connections']} connexions")
+            last = received
+    finally:
+        await broker.stop()
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Broker MQTT minimal local")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=1883)
+    parser.add_argument('--interval', type=float, default=5.0, help="Période d'affichage du débit (secondes)")
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(_serve(args.host, args.port, args.interval))
+    except KeyboardInterrupt:
+        print("\n🛑 Broker arrêté")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""
+Statistiques en ligne à mémoire constante
+Moyenne/variance (Welford), min/max et quantiles par l'algorithme P²
+"""
+
+import math
+from typing import Dict, Any, Iterable
+
+
+class P2Quantile:
+    """Estimation d'un quantile en flux (Jain & Chlamtac), cinq marqueurs"""
+
+    def __init__(self, p: float):
+        self.p = p
+        self._initial = []
+        self._heights = None
+        self._positions = [0, 1, 2, 3, 4]
+        self._desired = [0, 2 * p, 4 * p, 2 + 2 * p, 4]
+        self._increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x: float):
+        """Ajouter une observation"""
+        if self._heights is None:
+            self._initial.append(x)
+            if len(self._initial) == 5:
+                self._heights = sorted(self._initial)
+                self._initial = None
+            return
+
+        q = self._heights
+        n = self._positions
+
+        # Cellule contenant x (les extrêmes sont ajustés)
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while k < 3 and x >= q[k + 1]:
+                k += 1
+
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self._desired[i] += self._increments[i]
+
+        # Ajuster les marqueurs centraux
+        for i in range(1, 4):
+            d = self._desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                candidate = self._parabolic(i, d)
+                if q[i - 1] < candidate < q[i + 1]:
+                    q[i] = candidate
+                else:
+                    q[i] = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                n[i] += d
+
+    def _parabolic(self, i: int, d: int) -> float:
+        q = self._heights
+        n = self._positions
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    @property
+    def value(self) -> float:
+        """Estimation courante du quantile"""
+        if self._heights is not None:
+            return self._heights[2]
+        if not self._initial:
+            return math.nan
+        ordered = sorted(self._initial)
+        return ordered[int(round(self.p * (len(ordered) - 1)))]
+
+
+class RunningStats:
+    """Statistiques incrémentales d'une série numérique"""
+
+    def __init__(self, quantiles: Iterable[float] = (0.5, 0.95, 0.99)):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.quantiles = {p: P2Quantile(p) for p in quantiles}
+
+    def add(self, x: float):
+        """Ajouter une observation (algorithme de Welford)"""
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (x - self.mean)
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+        for estimator in self.quantiles.values():
+            estimator.add(x)
+
+    @property
+    def variance(self) -> float:
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+    def quantile(self, p: float) -> float:
+        return self.quantiles[p].value
+
+    def summary(self) -> Dict[str, Any]:
+        """Instantané des statistiques"""
+        result = {
+            'count': self.count,
+            'mean': self.mean,
+            'std': self.std,
+            'min': self.min,
+            'max': self.max
+        }
+        for p, estimator in self.quantiles.items():
+            result[f"p{p * 100:g}"] = estimator.value
+        return result
+
+
+class RecordStats:
+    """Statistiques en ligne de chaque champ numérique des enregistrements"""
+
+    def __init__(self, quantiles: Iterable[float] = (0.5, 0.95, 0.99)):
+        self.quantiles = tuple(quantiles)
+        self.fields: Dict[str, RunningStats] = {}
+        self.count = 0
+        self.latest = None
+
+    def add(self, record: Dict[str, Any]):
+        """Intégrer un enregistrement"""
+        self.count += 1
+        self.latest = record
+        for name, value in record.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                stats = self.fields.get(name)
+                if stats is None:
+                    stats = self.fields[name] = RunningStats(self.quantiles)
+                stats.add(value)
@@ -4,7 +4,7 @@ Cahier des charges Usine 4.0
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from typing import Dict, Any, Callable, Iterable, Optional
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,7 +15,33 @@ class BaseOutput(ABC):
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.enabled = config.get('enabled', False)
+        # Affichage d'une ligne par enregistrement (✅/❌), désactivable globalement
+        self.verbose = config.get('verbose', True)
         self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
+        
+        # Compteurs d'envoi exposés par les métriques
+        self.stats = {
+            'records_sent': 0,
+            'records_failed': 0,
+            'bytes_sent': 0
+        }
+        # File d'envoi persistante (outputs réseau, section "outbox")
+        self.outbox = None
+        # Accusé de livraison par enregistrement : on_delivery(data, réussi)
+        # (générateur de charge ; voir tracks_delivery)
+        self.on_delivery: Optional[Callable[[Dict[str, Any], bool], None]] = None
+    
+    @property
+    def tracks_delivery(self) -> bool:
+        """on_delivery est appelé par le module à la livraison effective (lot envoyé,
+        accusé reçu) ; sinon la livraison est terminée au retour de send_data"""
+        return False
+    
+    def _delivered(self, records: Iterable[Dict[str, Any]], ok: bool):
+        """Signaler la livraison (ou l'échec) d'enregistrements envoyés par send_data"""
+        if self.on_delivery is not None:
+            for data in records:
+                self.on_delivery(data, ok)
     
     @abstractmethod
     async def initialize(self):
@@ -27,6 +53,16 @@ class BaseOutput(ABC):
         """Envoyer les données via ce module"""
         pass
     
+    async def send_batch(self, batch):
+        """Envoyer un lot columnaire (FleetBatch) via ce module
+
+        Par défaut, le lot est converti en enregistrements individuels.
+        Les modules peuvent surcharger cette méthode pour exploiter
+        directement les colonnes.
+        """
+        for record in batch.to_records():
+            await self.send_data(record)
+    
     @abstractmethod
     async def cleanup(self):
         """Nettoyer les ressources"""
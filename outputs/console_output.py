@@ -3,18 +3,59 @@ Module d'affichage console
 Cahier des charges Usine 4.0
 """
 
+import asyncio
 import json
+import sys
+import time
 from typing import Dict, Any
+
+import numpy as np
+
 from .base_output import BaseOutput
+from fleet_simulator import STATUSES
+from sensor_schema import SensorSchema
+
+# Codes ANSI : curseur en haut à gauche puis effacement de l'écran
+CLEAR_SCREEN = "\x1b[H\x1b[2J"
+
+# Canaux affichés par défaut dans le tableau de bord (les premiers du schéma)
+DASHBOARD_CHANNELS = 5
 
 class ConsoleOutput(BaseOutput):
     """Module d'affichage à l'écran pour test"""
     
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self.format_type = config.get('format', 'simple')
+        
+        # Canaux affichés, dérivés du schéma des capteurs (section sensors)
+        self.schema = SensorSchema.from_config(config.get('sensors'))
+        default_channels = self.schema.outputs
+        if self.format_type == 'dashboard':
+            default_channels = default_channels[:DASHBOARD_CHANNELS]
+        self.channels = [self.schema.channel(output) for output in config.get('channels') or default_channels]
+        
+        # Tableau de bord : agrégation des enregistrements, rafraîchi à fréquence fixe
+        self.refresh = config.get('refresh', 1.0)
+        self.max_machines = config.get('max_machines', 20)
+        self.stream = sys.stdout
+        self._latest: Dict[str, Dict[str, Any]] = {}
+        self._last_batch = None
+        self._status_counts = [0] * len(STATUSES)
+        self._total = 0
+        self._frame_total = 0
+        self._frame_time = time.monotonic()
+        self._started = time.monotonic()
+        self._refresh_task = None
+    
     async def initialize(self):
         """Initialiser l'affichage console"""
         if self.enabled:
             self.logger.info("Module console initialisé")
             print("🖥️  Console Output activé")
+            
+            if self.format_type == 'dashboard':
+                self._refresh_task = asyncio.create_task(self._refresh_loop())
     
     async def send_data(self, data: Dict[str, Any]):
         """Afficher les données à l'écran"""
@@ -22,9 +63,13 @@ class ConsoleOutput(BaseOutput):
             return
         
         try:
-            format_type = self.config.get('format', 'simple')
+            if self.format_type == 'dashboard':
+                # Agrégation seulement : l'affichage est fait par _refresh_loop
+                self._latest[data['machine_id']] = data
+                self._status_counts[STATUSES.index(data['status'])] += 1
+                self._total += 1
             
-            if format_type == 'detailed':
+            elif self.format_type == 'detailed':
                 # Format détaillé JSON
                 print("\n" + "="*60)
                 print("📊 DONNÉES MACHINE")
@@ -33,21 +78,121 @@ class ConsoleOutput(BaseOutput):
                 print("="*60)
             else:
                 # Format simple sur une ligne
+                values = " | ".join(f"{channel.label}: {data[channel.output]}{channel.unit}"
+                                    for channel in self.channels)
                 print(f"[{data['timestamp']}] "
                       f"Machine: {data['machine_id']} | "
-                      f"Temp: {data['temperature']}°C | "
-                      f"Humidité: {data['humidity']}% | "
-                      f"RPM: {data['rpm']} | "
-                      f"Vibration: {data['vibration']}mm/s | "
-                      f"Énergie: {data['energy_kwh']}kWh | "
+                      f"{values} | "
                       f"Uptime: {data['uptime']}s | "
                       f"Statut: {data['status']}")
-            
+            self.stats['records_sent'] += 1
+        
         except Exception as e:
+            self.stats['records_failed'] += 1
             self.logger.error(f"Erreur affichage console: {e}")
     
+    async def send_batch(self, batch):
+        """Agréger un lot columnaire sans conversion en enregistrements (tableau de bord)"""
+        if self.format_type != 'dashboard':
+            await super().send_batch(batch)
+            return
+        
+        if not self.enabled:
+            return
+        
+        # Le dernier lot contient la dernière valeur de chaque machine du lot
+        self._last_batch = batch
+        counts = np.bincount(batch.columns['status'], minlength=len(STATUSES))
+        for code, count in enumerate(counts.tolist()):
+            self._status_counts[code] += count
+        self._total += len(batch)
+        self.stats['records_sent'] += len(batch)
+    
+    def _machine_rows(self):
+        """Dernières valeurs des premières machines (max_machines)"""
+        rows = []
+        batch = self._last_batch
+        if batch is not None:
+            count = min(len(batch), self.max_machines)
+            values = [batch.columns[channel.output][:count].tolist() for channel in self.channels]
+            statuses = batch.columns['status'][:count].tolist()
+            for i in range(count):
+                rows.append((batch.machine_ids[i], batch.timestamp, [column[i] for column in values],
+                             STATUSES[statuses[i]]))
+            machines = len(batch)
+        else:
+            machines = len(self._latest)
+        
+        for machine_id in sorted(self._latest)[:self.max_machines - len(rows)]:
+            data = self._latest[machine_id]
+            rows.append((machine_id, data['timestamp'], [data[channel.output] for channel in self.channels],
+                         data['status']))
+        return rows, machines
+    
+    def render(self) -> str:
+        """Construire une image complète du tableau de bord"""
+        now = time.monotonic()
+        elapsed = now - self._frame_time
+        rate = (self._total - self._frame_total) / elapsed if elapsed > 0 else 0.0
+        average = self._total / (now - self._started) if now > self._started else 0.0
+        self._frame_total = self._total
+        self._frame_time = now
+        
+        rows, machines = self._machine_rows()
+        counts = dict(zip(STATUSES, self._status_counts))
+        
+        # Une colonne par canal affiché : libellé et unité, largeur minimale 8
+        headers = [f"{channel.label} {channel.unit}".strip() for channel in self.channels]
+        widths = [max(8, len(header) + 1) for header in headers]
+        width = max(96, 44 + sum(widths))
+        
+        lines = [
+            "🏭 SIMULATEUR USINE 4.0 - TABLEAU DE BORD",
+            "=" * width,
+            f"Enregistrements: {self._total} | Débit: {rate:.0f}/s (moyenne {average:.0f}/s) | "
+            f"Machines: {machines}",
+            f"Statuts cumulés: ON {counts['ON']} | OFF {counts['OFF']} | ERREUR {counts['ERREUR']}",
+            "-" * width,
+            f"{'Machine':<14}{'Horodatage':<22}"
+            + "".join(f"{header:>{w}}" for header, w in zip(headers, widths)) + "  Statut",
+        ]
+        for machine_id, timestamp, values, status in rows:
+            cells = "".join(f"{channel.format(value):>{w}}"
+                            for channel, value, w in zip(self.channels, values, widths))
+            lines.append(f"{machine_id:<14}{timestamp:<22}{cells}  {status}")
+        if machines > len(rows):
+            lines.append(f"... {machines - len(rows)} autres machines")
+        return "\n".join(lines) + "\n"
+    
+    def _draw(self):
+        """Redessiner sur place en une seule écriture"""
+        frame = self.render()
+        if self.stream.isatty():
+            frame = CLEAR_SCREEN + frame
+        self.stream.write(frame)
+        self.stream.flush()
+    
+    async def _refresh_loop(self):
+        """Rafraîchir le tableau de bord à fréquence fixe"""
+        while True:
+            await asyncio.sleep(self.refresh)
+            try:
+                self._draw()
+            except Exception as e:
+                self.logger.error(f"Erreur affichage tableau de bord: {e}")
+    
     async def cleanup(self):
         """Nettoyer l'affichage console"""
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+            # Dernière image avec les totaux définitifs
+            self._draw()
+        
         if self.enabled:
             print("\n🛑 Console Output fermé")
-            self.logger.info("Module console fermé")
\ No newline at end of file
+            self.logger.info("Module console fermé")
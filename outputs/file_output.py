@@ -6,13 +6,30 @@ Cahier des charges Usine 4.0
 import json
 import csv
 import os
+import queue
+import threading
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any
 from .base_output import BaseOutput
+from columnar_storage import MACHINE_ID_WIDTH, ColumnarWriter, record_size, segment_columns
+from timeseries_storage import DEFAULT_BLOCK_RECORDS, TimeSeriesWriter, timeseries_columns
+from segment_index import SegmentIndex, build_index, index_path
+from record import encode_json, encode_csv
+from sensor_schema import SensorSchema
+from compression import (
+    available_methods, compress_segment, segment_exists, rotated_segments,
+    apply_retention, retention_limits
+)
+
+# Politiques de synchronisation disque (fsync)
+FSYNC_POLICIES = ('none', 'batch', 'interval')
 
 class FileOutput(BaseOutput):
-    """Module de sauvegarde dans fichier local (JSON ou CSV)"""
+    """Module de sauvegarde dans fichier local (JSON, JSON Lines, CSV, columnaire ou séries temporelles)"""
     
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
@@ -20,6 +37,68 @@ class FileOutput(BaseOutput):
         self.format = config.get('format', 'json').lower()
         self.rotation = config.get('rotation', False)
         self.max_size_mb = config.get('max_size_mb', 10)
+        self.buffer_size = config.get('buffer_size', 64 * 1024)
+        
+        # Écriture groupée : vidage des tampons tous les N enregistrements ou N secondes
+        self.flush_records = config.get('flush_records', 1000)
+        self.flush_interval = config.get('flush_interval', 1.0)
+        self.fsync = config.get('fsync', 'none')
+        if self.fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Politique fsync inconnue: {self.fsync}")
+        self.fsync_interval = config.get('fsync_interval', 1.0)
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self._last_fsync = time.monotonic()
+        
+        # Segment courant (jsonl, csv) maintenu ouvert en ajout,
+        # taille suivie en mémoire (pas de stat() à chaque tick)
+        self._handle = None
+        self._size = None
+        # Contenu du fichier JSON (tableau), réécrit à chaque vidage groupé
+        self._json_records = None
+        
+        # Thread d'écriture dédié : send_data ne fait que mettre en file,
+        # toutes les E/S disque sont effectuées hors de la boucle asyncio
+        self.writer_thread = config.get('writer_thread', True)
+        self.writer_queue_size = config.get('writer_queue_size', 10000)
+        self._writer_queue = None
+        self._writer = None
+        
+        # Compression et rétention des segments pivotés (pool de threads en arrière-plan)
+        self.compression = config.get('compression', 'none')
+        if self.compression == 'zstd' and 'zstd' not in available_methods():
+            self.logger.warning("zstandard non installé, compression gzip utilisée")
+            self.compression = 'gzip'
+        if self.compression != 'none' and self.compression not in available_methods():
+            raise ValueError(f"Méthode de compression inconnue: {self.compression}")
+        self.compression_level = config.get('compression_level')
+        self.compression_workers = config.get('compression_workers', 1)
+        self.retention = retention_limits(config.get('retention'))
+        self._maintenance = None
+        self._maintenance_lock = threading.Lock()
+        self._compressing = set()
+        # Segment columnaire courant (capacité dérivée de max_size_mb), colonne machine_id
+        # dimensionnée d'après les identifiants configurés (jamais tronqués)
+        self._columnar = None
+        self.machine_id_width = max(MACHINE_ID_WIDTH, config.get('machine_id_width', 0))
+        # Segment de séries temporelles courant : blocs de block_records enregistrements par machine
+        self.block_records = config.get('block_records', DEFAULT_BLOCK_RECORDS)
+        # Âge maximal d'un bloc ouvert : écrit au vidage groupé, données en mémoire bornées
+        self.max_block_age = config.get('max_block_age', self.flush_interval)
+        self._timeseries = None
+        
+        # Schéma des capteurs : en-têtes CSV et colonnes des segments columnaires
+        self.schema = SensorSchema.from_config(config.get('sensors'))
+        self._columnar_columns = segment_columns(self.schema)
+        self._timeseries_columns = timeseries_columns(self.schema)
+        
+        # Index temporel creux du segment courant (jsonl, csv, columnar)
+        self.index_enabled = config.get('index', False) and self.format in ('jsonl', 'csv', 'columnar')
+        self.index_stride = config.get('index_stride', 1000)
+        self.index_machine_stride = config.get('index_machine_stride', 100)
+        self.index_flush_records = config.get('index_flush_records', 10000)
+        self._index = None
+        self._index_pending = 0
         
         # Créer le dossier si nécessaire
         self.file_path.parent.mkdir(parents=True, exist_ok=True)
@@ -32,73 +111,417 @@ class FileOutput(BaseOutput):
             
             # Créer fichier CSV avec en-têtes si nécessaire
             if self.format == 'csv' and not self.file_path.exists():
-                await self._create_csv_headers()
+                self._create_csv_headers()
+            
+            if self.writer_thread:
+                self._start_writer()
+    
+    def _start_writer(self):
+        """Démarrer le thread d'écriture"""
+        if self._writer is None:
+            self._writer_queue = queue.Queue(maxsize=self.writer_queue_size)
+            self._writer = threading.Thread(
+                target=self._writer_loop, name=f"file-writer-{self.file_path.name}", daemon=True
+            )
+            self._writer.start()
+    
+    async def _enqueue(self, item):
+        """Confier un élément au thread d'écriture (attente hors boucle si la file est pleine)"""
+        self._start_writer()
+        try:
+            self._writer_queue.put_nowait(item)
+        except queue.Full:
+            await asyncio.to_thread(self._writer_queue.put, item)
+    
+    def _writer_loop(self):
+        """Thread d'écriture : consomme la file et effectue toutes les E/S disque"""
+        while True:
+            try:
+                item = self._writer_queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                # Vidage groupé même en l'absence de nouvel enregistrement
+                if self._pending or (self._timeseries is not None and self._timeseries.pending):
+                    self._safe_commit()
+                continue
+            
+            if item is None:
+                break
+            kind, data = item
+            if kind == 'batch':
+                self._write_batch(data)
+            else:
+                self._write_record(data)
+        
+        self._close_handle()
+    
+    def _safe_commit(self):
+        try:
+            self._commit()
+        except Exception as e:
+            self.logger.error(f"Erreur vidage fichier: {e}")
     
     async def send_data(self, data: Dict[str, Any]):
-        """Sauvegarder les données dans le fichier"""
+        """Sauvegarder les données dans le fichier (mise en file si thread d'écriture)"""
         if not self.enabled:
             return
         
+        if self.writer_thread:
+            await self._enqueue(('record', data))
+        else:
+            self._write_record(data)
+    
+    def _write_record(self, data: Dict[str, Any]):
+        """Écrire un enregistrement (thread d'écriture ou appel direct)"""
         try:
             # Vérifier rotation si activée
             if self.rotation and self._should_rotate():
                 self._rotate_file()
             
-            # Sauvegarder selon le format
+            # Sauvegarder selon le format (octets écrits)
             if self.format == 'json':
-                await self._save_json(data)
+                written = self._save_json(data)
+            elif self.format == 'jsonl':
+                written = self._save_jsonl(data)
             elif self.format == 'csv':
-                await self._save_csv(data)
+                written = self._save_csv(data)
+            elif self.format == 'columnar':
+                written = self._save_columnar(data)
+            elif self.format == 'timeseries':
+                written = self._save_timeseries(data)
             else:
                 self.logger.error(f"Format non supporté: {self.format}")
                 return
             
-            print(f"✅ File: Sauvegardé ({self.format.upper()})")
+            self.stats['records_sent'] += 1
+            self.stats['bytes_sent'] += written
+            self._records_written(1)
+            
+            if self.verbose:
+                print(f"✅ File: Sauvegardé ({self.format.upper()})")
             
         except Exception as e:
+            self.stats['records_failed'] += 1
             self.logger.error(f"Erreur sauvegarde fichier: {e}")
-            print(f"❌ File: Erreur - {e}")
+            if self.verbose:
+                print(f"❌ File: Erreur - {e}")
     
-    async def _save_json(self, data: Dict[str, Any]):
-        """Sauvegarder en format JSON"""
-        # Lire données existantes
-        if self.file_path.exists():
-            try:
-                with open(self.file_path, 'r', encoding='utf-8') as f:
-                    existing_data = json.load(f)
-                    if not isinstance(existing_data, list):
-                        existing_data = [existing_data]
-            except (json.JSONDecodeError, Exception):
-                existing_data = []
+    def _save_json(self, data: Dict[str, Any]) -> int:
+        """Sauvegarder en format JSON (tableau réécrit atomiquement au vidage groupé)"""
+        if self._json_records is None:
+            self._json_records = self._load_json()
+        self._json_records.append(data)
+        # Octets comptés lors de la réécriture du fichier
+        return 0
+    
+    def _load_json(self) -> list:
+        """Charger le tableau JSON existant sans jamais écraser un fichier illisible"""
+        if not self.file_path.exists() or self.file_path.stat().st_size == 0:
+            return []
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                existing_data = json.load(f)
+        except json.JSONDecodeError as e:
+            # Fichier tronqué par une ancienne écriture non atomique : mis de côté
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            corrupt_path = self.file_path.with_name(f"{self.file_path.name}.corrupt-{timestamp}")
+            self.file_path.rename(corrupt_path)
+            self.logger.error(f"Fichier JSON illisible ({e}), conservé sous {corrupt_path}")
+            return []
+        return existing_data if isinstance(existing_data, list) else [existing_data]
+    
+    def _write_json(self, sync: bool):
+        """Réécrire le tableau JSON via un fichier temporaire puis os.replace"""
+        temp_path = self.file_path.with_name(self.file_path.name + '.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._json_records, f, indent=2, ensure_ascii=False)
+            size = f.tell()
+            if sync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(temp_path, self.file_path)
+        if sync:
+            self._fsync_directory()
+        self._size = size
+        self.stats['bytes_sent'] += size
+    
+    def _fsync_directory(self):
+        """Rendre durable le renommage dans le dossier (POSIX)"""
+        try:
+            fd = os.open(self.file_path.parent, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+    
+    def _open_handle(self):
+        """Segment courant ouvert en ajout, après réparation d'une fin incomplète"""
+        if self._handle is None:
+            if self.format == 'csv' and not self._csv_header_matches():
+                # Segment écrit avec un autre schéma de capteurs : nouveau segment
+                self._rotate_file()
+            self._truncate_torn_record()
+            self._handle = open(self.file_path, 'ab', buffering=self.buffer_size)
+            self._size = self._handle.tell()
+        return self._handle
+    
+    def _csv_header_matches(self) -> bool:
+        """En-tête du segment CSV existant identique aux colonnes du schéma"""
+        if not self.file_path.exists() or self.file_path.stat().st_size == 0:
+            return True
+        with open(self.file_path, 'rb') as f:
+            return f.readline().rstrip(b'\r\n') == ','.join(self.schema.fields).encode('utf-8')
+    
+    def _truncate_torn_record(self):
+        """Tronquer un dernier enregistrement incomplet (arrêt brutal pendant l'écriture)"""
+        if not self.file_path.exists():
+            return
+        size = self.file_path.stat().st_size
+        if size == 0:
+            return
+        
+        with open(self.file_path, 'r+b') as f:
+            f.seek(size - 1)
+            if f.read(1) == b'\n':
+                return
+            
+            # Rechercher la dernière fin de ligne en remontant par blocs
+            end = 0
+            position = size
+            while position > 0:
+                start = max(0, position - 65536)
+                f.seek(start)
+                newline = f.read(position - start).rfind(b'\n')
+                if newline >= 0:
+                    end = start + newline + 1
+                    break
+                position = start
+            f.truncate(end)
+        
+        self.logger.warning(f"Enregistrement incomplet tronqué en fin de {self.file_path} ({size - end} octets)")
+    
+    def _write(self, payload: bytes):
+        """Ajouter des octets au segment courant, retourne (début, fin)"""
+        handle = self._open_handle()
+        offset = self._size
+        handle.write(payload)
+        self._size += len(payload)
+        return offset, self._size
+    
+    def _records_written(self, count: int):
+        """Déclencher le vidage groupé selon le nombre d'enregistrements ou le délai"""
+        self._pending += count
+        if (self._pending >= self.flush_records
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self._commit()
+    
+    def _commit(self):
+        """Vidage groupé des tampons, avec fsync selon la politique configurée"""
+        now = time.monotonic()
+        sync = self.fsync == 'batch' or (
+            self.fsync == 'interval' and now - self._last_fsync >= self.fsync_interval
+        )
+        
+        if self._json_records is not None and self._pending:
+            self._write_json(sync)
+        if self._handle is not None:
+            self._handle.flush()
+            if sync:
+                os.fsync(self._handle.fileno())
+        if self._columnar is not None and sync:
+            self._columnar.flush()
+        if self._timeseries is not None:
+            # Blocs ouverts trop anciens écrits avant le vidage (et le fsync)
+            self.stats['bytes_sent'] += self._timeseries.seal_blocks(self.max_block_age)
+            self._timeseries.flush(sync)
+        
+        if sync:
+            self._last_fsync = now
+        self._last_flush = now
+        self._pending = 0
+    
+    def _save_jsonl(self, data: Dict[str, Any]) -> int:
+        """Sauvegarder en format JSON Lines (une ligne compacte par enregistrement)"""
+        self._open_handle()
+        if self.index_enabled:
+            self._segment_index()
+        offset, end = self._write(encode_json(data) + b'\n')
+        self._index_record(data, offset, end)
+        return end - offset
+    
+    def _segment_index(self) -> SegmentIndex:
+        """Index du segment courant : rechargé, reconstruit ou créé"""
+        if self._index is None:
+            index = None
+            if self._segment_size() > 0:
+                index = SegmentIndex.load(self.file_path)
+                if index is None or index.format != self.format or index.size != self._segment_size():
+                    # Index absent ou partiel (arrêt brutal, activation tardive)
+                    if self._handle is not None:
+                        self._handle.flush()
+                    index = build_index(self.file_path, self.index_stride, self.index_machine_stride)
+            self._index = index or SegmentIndex(self.format, self.index_stride, self.index_machine_stride)
+        return self._index
+    
+    def _segment_size(self) -> int:
+        """Taille du segment courant dans l'unité des offsets de l'index"""
+        if self.format == 'columnar':
+            return self._columnar_writer().count
+        if self._handle is not None:
+            return self._size
+        return self.file_path.stat().st_size if self.file_path.exists() else 0
+    
+    def _index_record(self, data: Dict[str, Any], offset: int, end: int = None):
+        """Indexer un enregistrement écrit"""
+        if not self.index_enabled:
+            return
+        self._segment_index().add(data['timestamp'], data['machine_id'], offset, end)
+        self._index_written(1)
+    
+    def _index_written(self, count: int):
+        """Persister l'index périodiquement"""
+        self._index_pending += count
+        if self._index_pending >= self.index_flush_records:
+            self._save_index()
+    
+    def _save_index(self):
+        """Écrire l'index du segment courant"""
+        if self._index is not None and self._index_pending:
+            if self._handle is not None:
+                self._handle.flush()
+            self._index.save(self.file_path)
+            self._index_pending = 0
+    
+    def _columnar_writer(self) -> ColumnarWriter:
+        """Segment columnaire courant, pivoté lorsqu'il est plein ou d'un autre schéma"""
+        if self._columnar is not None and self._columnar.full:
+            self._rotate_file()
+        if self._columnar is None:
+            capacity = max(1, int(self.max_size_mb * 1024 * 1024)
+                           // record_size(self.machine_id_width, self._columnar_columns))
+            self._columnar = ColumnarWriter(self.file_path, capacity, self.machine_id_width, self._columnar_columns)
+            # Segment plein, écrit avec un autre schéma de capteurs ou des identifiants
+            # plus courts : nouveau segment
+            if (self._columnar.full
+                    or list(self._columnar.columns) != [name for name, _ in self._columnar_columns]
+                    or self._columnar.machine_id_width < self.machine_id_width):
+                self._rotate_file()
+                self._columnar = ColumnarWriter(self.file_path, capacity, self.machine_id_width, self._columnar_columns)
+        return self._columnar
+    
+    def _save_columnar(self, data: Dict[str, Any]) -> int:
+        """Sauvegarder en format binaire columnaire"""
+        writer = self._columnar_writer()
+        if self.index_enabled:
+            self._segment_index()
+        offset = writer.count
+        writer.append(data)
+        self._index_record(data, offset)
+        return record_size(writer.machine_id_width, self._columnar_columns)
+    
+    def _timeseries_writer(self) -> TimeSeriesWriter:
+        """Segment de séries temporelles courant, pivoté s'il a été écrit avec un autre schéma"""
+        if self._timeseries is None:
+            self._timeseries = TimeSeriesWriter(self.file_path, self._timeseries_columns, self.block_records)
+            if self._timeseries.columns != self._timeseries_columns:
+                self._rotate_file()
+                self._timeseries = TimeSeriesWriter(self.file_path, self._timeseries_columns, self.block_records)
+        return self._timeseries
+    
+    def _save_timeseries(self, data: Dict[str, Any]) -> int:
+        """Sauvegarder en format séries temporelles (octets écrits lorsqu'un bloc est complet)"""
+        return self._timeseries_writer().append(data)
+    
+    async def send_batch(self, batch):
+        """Sauvegarder un lot (FleetBatch), en une seule mise en file si thread d'écriture"""
+        if not self.enabled:
+            return
+        
+        if self.writer_thread:
+            await self._enqueue(('batch', batch))
         else:
-            existing_data = []
+            self._write_batch(batch)
+    
+    def _write_batch(self, batch):
+        """Écrire un lot (écriture directe des colonnes en mode columnar ou timeseries)"""
+        if self.format not in ('columnar', 'timeseries'):
+            for record in batch.to_records():
+                self._write_record(record)
+            return
         
-        # Ajouter nouvelles données
-        existing_data.append(data)
+        written = 0
+        try:
+            if self.format == 'timeseries':
+                if self.rotation and self._should_rotate():
+                    self._rotate_file()
+                self.stats['bytes_sent'] += self._timeseries_writer().append_batch(batch)
+                self.stats['records_sent'] += len(batch)
+                written = len(batch)
+            while written < len(batch):
+                writer = self._columnar_writer()
+                if self.index_enabled:
+                    self._segment_index()
+                offset = writer.count
+                count = writer.append_batch(batch, written)
+                if self.index_enabled:
+                    self._index.add_batch(
+                        batch.timestamp, batch.machine_ids[written:written + count], offset
+                    )
+                    self._index_written(count)
+                written += count
+                self.stats['records_sent'] += count
+                self.stats['bytes_sent'] += count * record_size(writer.machine_id_width, self._columnar_columns)
+            self._records_written(len(batch))
+            
+            if self.verbose:
+                print(f"✅ File: Lot sauvegardé ({len(batch)} enregistrements, {self.format.upper()})")
         
-        # Sauvegarder
-        with open(self.file_path, 'w', encoding='utf-8') as f:
-            json.dump(existing_data, f, indent=2, ensure_ascii=False)
+        except Exception as e:
+            self.stats['records_failed'] += len(batch) - written
+            self.logger.error(f"Erreur sauvegarde fichier: {e}")
+            if self.verbose:
+                print(f"❌ File: Erreur - {e}")
     
-    async def _save_csv(self, data: Dict[str, Any]):
+    def _close_handle(self):
+        """Vider les écritures en attente puis fermer le segment courant"""
+        if self._pending:
+            self._commit()
+        self._save_index()
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+        if self._columnar is not None:
+            self._columnar.close()
+            self._columnar = None
+        if self._timeseries is not None:
+            # Blocs ouverts écrits avant la fermeture
+            self.stats['bytes_sent'] += self._timeseries.write_blocks()
+            self._timeseries.close()
+            self._timeseries = None
+        self._json_records = None
+        self._size = None
+    
+    def _save_csv(self, data: Dict[str, Any]) -> int:
         """Sauvegarder en format CSV"""
-        file_exists = self.file_path.exists()
+        self._open_handle()
+        if self.index_enabled:
+            self._segment_index()
         
-        with open(self.file_path, 'a', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=data.keys())
-            
-            # Écrire en-têtes si nouveau fichier
-            if not file_exists:
-                writer.writeheader()
-            
-            writer.writerow(data)
+        # Écrire en-têtes si nouveau fichier (colonnes du schéma des capteurs)
+        if self._size == 0:
+            self._write((','.join(self.schema.fields) + '\r\n').encode('utf-8'))
+        
+        offset, end = self._write(encode_csv(data, self.schema.fields).encode('utf-8'))
+        self._index_record(data, offset, end)
+        return end - offset
     
-    async def _create_csv_headers(self):
+    def _create_csv_headers(self):
         """Créer fichier CSV avec en-têtes"""
-        headers = [
-            'timestamp', 'machine_id', 'temperature', 'humidity', 
-            'rpm', 'vibration', 'energy_kwh', 'uptime', 'status'
-        ]
+        # Colonnes dérivées du schéma des capteurs (section sensors)
+        headers = list(self.schema.fields)
         
         with open(self.file_path, 'w', newline='', encoding='utf-8') as f:
             writer = csv.writer(f)
@@ -106,10 +529,18 @@ class FileOutput(BaseOutput):
     
     def _should_rotate(self) -> bool:
         """Vérifier si rotation nécessaire"""
-        if not self.file_path.exists():
+        if self.format == 'columnar':
+            # Segment à capacité fixe : pivoté lorsqu'il est plein
             return False
+        if self.format == 'timeseries':
+            # Taille des blocs déjà écrits (les blocs ouverts sont en mémoire)
+            return self._timeseries is not None and self._timeseries.size / (1024 * 1024) > self.max_size_mb
+        
+        # Taille suivie en mémoire ; un seul stat() à l'ouverture du segment
+        if self._size is None:
+            self._size = self.file_path.stat().st_size if self.file_path.exists() else 0
         
-        size_mb = self.file_path.stat().st_size / (1024 * 1024)
+        size_mb = self._size / (1024 * 1024)
         return size_mb > self.max_size_mb
     
     def _rotate_file(self):
@@ -118,12 +549,71 @@ class FileOutput(BaseOutput):
         rotated_name = f"{self.file_path.stem}_{timestamp}{self.file_path.suffix}"
         rotated_path = self.file_path.parent / rotated_name
         
+        # Éviter d'écraser un segment pivoté (ou sa version compressée) dans la même seconde
+        index = 1
+        while segment_exists(rotated_path):
+            rotated_name = f"{self.file_path.stem}_{timestamp}_{index}{self.file_path.suffix}"
+            rotated_path = self.file_path.parent / rotated_name
+            index += 1
+        
+        self._close_handle()
         self.file_path.rename(rotated_path)
+        if index_path(self.file_path).exists():
+            index_path(self.file_path).rename(index_path(rotated_path))
+        self._index = None
         self.logger.info(f"Fichier pivoté vers: {rotated_path}")
         print(f"🔄 File: Rotation vers {rotated_name}")
+        self._schedule_maintenance(rotated_path)
+    
+    def _schedule_maintenance(self, rotated_path: Path):
+        """Confier la compression et la rétention du segment pivoté au pool d'arrière-plan"""
+        if self.compression == 'none' and not any(self.retention.values()):
+            return
+        if self._maintenance is None:
+            self._maintenance = ThreadPoolExecutor(
+                max_workers=self.compression_workers, thread_name_prefix='file-maintenance'
+            )
+        with self._maintenance_lock:
+            self._compressing.add(rotated_path)
+        self._maintenance.submit(self._maintain_segment, rotated_path)
+    
+    def _maintain_segment(self, rotated_path: Path):
+        """Compresser un segment pivoté puis appliquer la politique de rétention"""
+        try:
+            if self.compression != 'none':
+                compressed = compress_segment(rotated_path, self.compression, self.compression_level)
+                self.logger.info(f"Segment compressé: {compressed.name}")
+        except Exception as e:
+            self.logger.error(f"Erreur compression {rotated_path}: {e}")
+        
+        with self._maintenance_lock:
+            self._compressing.discard(rotated_path)
+            if not any(self.retention.values()):
+                return
+            try:
+                # Les segments en cours de compression ne sont pas supprimés
+                segments = [segment for segment in rotated_segments(self.file_path)
+                            if segment not in self._compressing]
+                for removed in apply_retention(segments, **self.retention):
+                    self.logger.info(f"Rétention: segment supprimé {removed.name}")
+            except Exception as e:
+                self.logger.error(f"Erreur rétention: {e}")
     
     async def cleanup(self):
-        """Nettoyer le module fichier"""
+        """Nettoyer le module fichier (vidage de la file du thread d'écriture)"""
+        if self._writer is not None:
+            await asyncio.to_thread(self._writer_queue.put, None)
+            await asyncio.to_thread(self._writer.join)
+            self._writer = None
+            self._writer_queue = None
+        else:
+            self._close_handle()
+        
+        # Attendre les compressions en cours
+        if self._maintenance is not None:
+            await asyncio.to_thread(self._maintenance.shutdown, True)
+            self._maintenance = None
+        
         if self.enabled:
             print("💾 File Output fermé")
             self.logger.info("Module fichier fermé")
\ No newline at end of file
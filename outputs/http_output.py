@@ -3,10 +3,24 @@ Module d'envoi HTTP vers API REST
 Cahier des charges Usine 4.0
 """
 
-import json
+import gzip
+import time
+import asyncio
 import aiohttp
-from typing import Dict, Any
+from typing import Dict, Any, List
 from .base_output import BaseOutput
+from .outbox import Outbox
+from .resilience import AdaptiveTimeout, CircuitBreaker, CircuitOpenError
+from metrics import Histogram
+from sensor_schema import SensorSchema
+from serializers import create_serializer
+
+# Statuts 4xx à réessayer (délai, limitation de débit) ; les autres 4xx sont des refus définitifs
+RETRYABLE_CLIENT_STATUSES = (408, 425, 429)
+
+def is_retryable(status: int) -> bool:
+    """Un envoi refusé avec ce statut peut-il réussir plus tard ?"""
+    return status >= 500 or status in RETRYABLE_CLIENT_STATUSES or status < 400
 
 class HTTPOutput(BaseOutput):
     """Module d'envoi vers API REST"""
@@ -17,6 +31,54 @@ class HTTPOutput(BaseOutput):
         self.url = config.get('url', 'http://localhost:8080/api/data')
         self.headers = config.get('headers', {'Content-Type': 'application/json'})
         self.timeout = config.get('timeout', 10)
+        # Encodage des charges utiles : json, msgpack, cbor ou packed
+        self.serializer = create_serializer(config.get('encoding', 'json'),
+                                            SensorSchema.from_config(config.get('sensors')))
+        
+        # Envoi groupé (batching)
+        batch_config = config.get('batch', {}) or {}
+        self.batching = batch_config.get('enabled', False)
+        self.batch_max_records = batch_config.get('max_records', 500)
+        self.batch_max_bytes = batch_config.get('max_bytes', 1024 * 1024)
+        self.batch_max_linger = batch_config.get('max_linger', 1.0)
+        self.batch_format = batch_config.get('format', 'json').lower()
+        self.batch_gzip = batch_config.get('gzip', False)
+        
+        self._buffer: List[bytes] = []
+        # Enregistrements du lot courant, signalés livrés à l'envoi du lot
+        self._buffer_records: List[Dict[str, Any]] = []
+        self._buffer_bytes = 0
+        self._buffer_started = 0.0
+        self._flush_lock = asyncio.Lock()
+        self._linger_task = None
+        
+        # Métriques d'envoi
+        self.stats = {
+            'requests': 0,
+            'records_sent': 0,
+            'records_failed': 0,
+            'records_rejected': 0,
+            'batches_sent': 0,
+            'batches_failed': 0,
+            'bytes_sent': 0,
+            'bytes_uncompressed': 0,
+            'last_status': None
+        }
+        # Latence des requêtes POST (secondes)
+        self.request_latency = Histogram()
+        
+        # Disjoncteur : échec immédiat tant que la destination est indisponible
+        breaker_config = config.get('circuit_breaker', {}) or {}
+        self.breaker = CircuitBreaker('http', breaker_config) if breaker_config.get('enabled', True) else None
+        # Délai d'attente adaptatif, borné par "timeout"
+        adaptive_config = config.get('adaptive_timeout', {}) or {}
+        self.adaptive_timeout = (AdaptiveTimeout(self.timeout, adaptive_config)
+                                 if adaptive_config.get('enabled', True) else None)
+        
+        # Enregistrements non délivrés conservés sur disque puis renvoyés
+        outbox_config = config.get('outbox', {}) or {}
+        if outbox_config.get('enabled', False):
+            self.outbox = Outbox('http', outbox_config, binary=self.serializer.binary)
     
     async def initialize(self):
         """Initialiser la session HTTP"""
@@ -25,32 +87,296 @@ class HTTPOutput(BaseOutput):
                 timeout=aiohttp.ClientTimeout(total=self.timeout),
                 headers=self.headers
             )
-            self.logger.info(f"Module HTTP initialisé - URL: {self.url}")
+            self.logger.info(f"Module HTTP initialisé - URL: {self.url} (encodage {self.serializer.name})")
             print(f"🌐 HTTP Output activé - {self.url}")
+            
+            if self.batching:
+                self._linger_task = asyncio.create_task(self._linger_loop())
+                self.logger.info(
+                    f"Envoi groupé activé ({self.batch_max_records} enregistrements, "
+                    f"{self.batch_max_bytes} octets, {self.batch_max_linger}s, "
+                    f"{self.batch_format}{', gzip' if self.batch_gzip else ''})"
+                )
+            
+            if self.outbox:
+                self.outbox.open()
+                self.outbox.start(self._resend)
     
     async def send_data(self, data: Dict[str, Any]):
         """Envoyer les données via HTTP POST"""
         if not self.enabled or not self.session:
             return
         
+        if self.batching:
+            await self._enqueue(data)
+            return
+        
+        body = self.serializer.encode(data)
+        delivered = False
         try:
-            async with self.session.post(self.url, json=data) as response:
-                if response.status == 200:
-                    self.logger.debug(f"Données envoyées avec succès à {self.url}")
-                    print(f"✅ HTTP: Données envoyées ({response.status})")
-                else:
-                    self.logger.warning(f"Échec HTTP: statut {response.status}")
-                    print(f"⚠️  HTTP: Échec ({response.status})")
+            status = await self._request(body, {'Content-Type': self.serializer.content_type})
+            if 200 <= status < 300:
+                delivered = True
+                self.stats['records_sent'] += 1
+                self.stats['bytes_sent'] += len(body)
+                self.logger.debug(f"Données envoyées avec succès à {self.url}")
+                if self.verbose:
+                    print(f"✅ HTTP: Données envoyées ({status})")
+            else:
+                self.stats['records_failed'] += 1
+                self.logger.warning(f"Échec HTTP: statut {status}")
+                if self.verbose:
+                    print(f"⚠️  HTTP: Échec ({status})")
+                self._store_unless_rejected(status, [body])
                     
+        except CircuitOpenError:
+            # Échec immédiat, sans attendre le délai de la requête
+            self.stats['records_failed'] += 1
+            self._store([body])
         except aiohttp.ClientError as e:
+            self.stats['records_failed'] += 1
             self.logger.error(f"Erreur client HTTP: {e}")
-            print(f"❌ HTTP: Erreur de connexion")
+            if self.verbose:
+                print(f"❌ HTTP: Erreur de connexion")
+            self._store([body])
         except Exception as e:
+            self.stats['records_failed'] += 1
             self.logger.error(f"Erreur HTTP: {e}")
-            print(f"❌ HTTP: Erreur - {e}")
+            if self.verbose:
+                print(f"❌ HTTP: Erreur - {e}")
+            self._store([body])
+        finally:
+            self._delivered([data], delivered)
+    
+    @property
+    def tracks_delivery(self) -> bool:
+        # Livraison signalée à la réponse HTTP (à l'envoi du lot en mode groupé)
+        return True
+    
+    def _store_unless_rejected(self, status: int, records: List[bytes]):
+        """Conserver les enregistrements sauf refus définitif (4xx) : ils ne seraient jamais acceptés"""
+        if is_retryable(status):
+            self._store(records)
+        else:
+            self.stats['records_rejected'] += len(records)
+    
+    def _store(self, records: List[bytes]):
+        """Conserver dans l'outbox les enregistrements non délivrés"""
+        if self.outbox:
+            try:
+                self.outbox.append(records)
+            except OSError as e:
+                self.logger.error(f"Erreur écriture outbox: {e}")
+    
+    async def _resend(self, records: List[bytes]) -> int:
+        """Renvoyer un lot de l'outbox ; retourne le nombre d'enregistrements traités
+
+        En mode groupé, le lot est découpé selon max_records et max_bytes.
+        """
+        if not self.session:
+            return 0
+        
+        if not self.batching:
+            # Le point d'accès attend un enregistrement par requête
+            for handled, body in enumerate(records):
+                if not await self._post(body, {'Content-Type': self.serializer.content_type}, 1):
+                    return handled
+            return len(records)
+        
+        handled = 0
+        for chunk in self._chunks(records):
+            body, headers, _ = self._build_body(chunk)
+            if not await self._post(body, headers, len(chunk)):
+                break
+            handled += len(chunk)
+        return handled
+    
+    def _chunks(self, records: List[bytes]):
+        """Découper des enregistrements encodés en lots respectant max_records et max_bytes"""
+        chunk, size = [], 0
+        for record in records:
+            if chunk and (len(chunk) >= self.batch_max_records
+                          or size + len(record) + 1 > self.batch_max_bytes):
+                yield chunk
+                chunk, size = [], 0
+            chunk.append(record)
+            size += len(record) + 1
+        if chunk:
+            yield chunk
+    
+    async def _post(self, body: bytes, headers: Dict[str, str], count: int) -> bool:
+        """POST d'un corps déjà construit (renvoi depuis l'outbox)
+
+        Retourne True si le corps est traité : accepté, ou refusé définitivement
+        (4xx non réessayable, enregistrements abandonnés) ; False pour réessayer plus tard.
+        """
+        try:
+            status = await self._request(body, headers)
+        except (CircuitOpenError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.logger.debug(f"Renvoi outbox impossible: {e}")
+            return False
+        if 200 <= status < 300:
+            self.stats['bytes_sent'] += len(body)
+            return True
+        if not is_retryable(status):
+            self.stats['records_rejected'] += count
+            self.logger.warning(f"Renvoi outbox refusé définitivement (statut {status}): "
+                                f"{count} enregistrements abandonnés")
+            return True
+        self.logger.debug(f"Renvoi outbox refusé: statut {status}")
+        return False
+    
+    async def _request(self, body: bytes, headers: Dict[str, str]) -> int:
+        """POST protégé par le disjoncteur, avec délai d'attente adaptatif ; retourne le statut
+
+        Lève CircuitOpenError sans envoyer si le disjoncteur est ouvert.
+        """
+        if self.breaker:
+            self.breaker.check()
+        
+        options = {}
+        if self.adaptive_timeout:
+            options['timeout'] = aiohttp.ClientTimeout(total=self.adaptive_timeout.timeout_for(self.breaker))
+        
+        self.stats['requests'] += 1
+        started = time.perf_counter()
+        try:
+            async with self.session.post(self.url, data=body, headers=headers, **options) as response:
+                status = response.status
+        except Exception as e:
+            if isinstance(e, asyncio.TimeoutError) and self.adaptive_timeout:
+                self.adaptive_timeout.record_timeout()
+            if self.breaker:
+                self.breaker.record_failure()
+            raise
+        
+        latency = time.perf_counter() - started
+        self.request_latency.observe(latency)
+        self.stats['last_status'] = status
+        # 5xx : destination en difficulté ; 2xx/4xx : destination joignable
+        if status >= 500:
+            if self.breaker:
+                self.breaker.record_failure()
+        else:
+            if self.breaker:
+                self.breaker.record_success()
+            if self.adaptive_timeout:
+                self.adaptive_timeout.observe(latency)
+        return status
+    
+    async def _enqueue(self, data: Dict[str, Any]):
+        """Ajouter un enregistrement au lot courant et l'envoyer si un seuil est atteint"""
+        encoded = self.serializer.encode(data)
+        
+        if not self._buffer:
+            self._buffer_started = time.monotonic()
+        self._buffer.append(encoded)
+        self._buffer_records.append(data)
+        self._buffer_bytes += len(encoded) + 1
+        
+        if (len(self._buffer) >= self.batch_max_records
+                or self._buffer_bytes >= self.batch_max_bytes):
+            await self._flush()
+    
+    async def _linger_loop(self):
+        """Envoyer le lot courant lorsque son ancienneté dépasse max_linger"""
+        while True:
+            await asyncio.sleep(max(self.batch_max_linger / 4, 0.01))
+            if (self._buffer
+                    and time.monotonic() - self._buffer_started >= self.batch_max_linger):
+                await self._flush()
+    
+    def _build_body(self, records: List[bytes]):
+        """Construire le corps de la requête groupée (tableau JSON, NDJSON ou lot binaire)"""
+        if self.serializer.binary:
+            # Tableau msgpack/cbor, ou charges packed préfixées par leur longueur
+            body = self.serializer.encode_batch(records)
+            content_type = self.serializer.content_type
+        elif self.batch_format == 'ndjson':
+            body = b'\n'.join(records) + b'\n'
+            content_type = 'application/x-ndjson'
+        else:
+            body = self.serializer.encode_batch(records)
+            content_type = self.serializer.content_type
+        
+        headers = {'Content-Type': content_type}
+        uncompressed_size = len(body)
+        if self.batch_gzip:
+            body = gzip.compress(body, compresslevel=6)
+            headers['Content-Encoding'] = 'gzip'
+        
+        return body, headers, uncompressed_size
+    
+    async def _flush(self):
+        """Envoyer le lot courant en une seule requête POST"""
+        async with self._flush_lock:
+            if not self._buffer:
+                return
+            
+            records, data = self._buffer, self._buffer_records
+            self._buffer, self._buffer_records = [], []
+            self._buffer_bytes = 0
+            
+            body, headers, uncompressed_size = self._build_body(records)
+            count = len(records)
+            
+            delivered = False
+            try:
+                status = await self._request(body, headers)
+                if 200 <= status < 300:
+                    delivered = True
+                    self.stats['batches_sent'] += 1
+                    self.stats['records_sent'] += count
+                    self.stats['bytes_sent'] += len(body)
+                    self.stats['bytes_uncompressed'] += uncompressed_size
+                    self.logger.debug(f"Lot de {count} enregistrements envoyé à {self.url}")
+                    if self.verbose:
+                        print(f"✅ HTTP: Lot envoyé ({count} enregistrements, {status})")
+                else:
+                    self.stats['batches_failed'] += 1
+                    self.stats['records_failed'] += count
+                    self.logger.warning(f"Échec HTTP du lot ({count} enregistrements): statut {status}")
+                    if self.verbose:
+                        print(f"⚠️  HTTP: Échec du lot ({status})")
+                    self._store_unless_rejected(status, records)
+            
+            except CircuitOpenError:
+                self.stats['batches_failed'] += 1
+                self.stats['records_failed'] += count
+                self._store(records)
+            except aiohttp.ClientError as e:
+                self.stats['batches_failed'] += 1
+                self.stats['records_failed'] += count
+                self.logger.error(f"Erreur client HTTP (lot de {count}): {e}")
+                if self.verbose:
+                    print(f"❌ HTTP: Erreur de connexion")
+                self._store(records)
+            except Exception as e:
+                self.stats['batches_failed'] += 1
+                self.stats['records_failed'] += count
+                self.logger.error(f"Erreur HTTP (lot de {count}): {e}")
+                if self.verbose:
+                    print(f"❌ HTTP: Erreur - {e}")
+                self._store(records)
+            finally:
+                self._delivered(data, delivered)
     
     async def cleanup(self):
         """Fermer la session HTTP"""
+        if self._linger_task:
+            self._linger_task.cancel()
+            try:
+                await self._linger_task
+            except asyncio.CancelledError:
+                pass
+            self._linger_task = None
+        
+        if self.session and self._buffer:
+            await self._flush()
+        
+        if self.outbox:
+            await self.outbox.stop()
+        
         if self.session:
             await self.session.close()
             print("🌐 HTTP Output fermé")
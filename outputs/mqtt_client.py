@@ -0,0 +1,337 @@
+"""
+Client MQTT 3.1.1 asyncio (publication QoS 0 et 1, abonnement)
+Les publications QoS 1 sont envoyées à la suite, sans attendre chaque
+accusé PUBACK, dans la limite d'une fenêtre de messages en vol
+"""
+
+import asyncio
+import os
+import struct
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Types de paquets MQTT (4 bits de poids fort du premier octet)
+CONNECT = 1
+CONNACK = 2
+PUBLISH = 3
+PUBACK = 4
+SUBSCRIBE = 8
+SUBACK = 9
+PINGREQ = 12
+PINGRESP = 13
+DISCONNECT = 14
+
+PROTOCOL_LEVEL = 4  # MQTT 3.1.1
+
+# Tampon d'émission au-delà duquel publish() attend le vidage (contre-pression)
+DRAIN_THRESHOLD = 256 * 1024
+
+CONNACK_ERRORS = {
+    1: "version de protocole refusée",
+    2: "identifiant client refusé",
+    3: "serveur indisponible",
+    4: "identifiants invalides",
+    5: "non autorisé"
+}
+
+
+def _encode_length(length: int) -> bytes:
+    """Longueur restante (entier variable de 1 à 4 octets)"""
+    encoded = bytearray()
+    while True:
+        byte, length = length % 128, length // 128
+        encoded.append(byte | 0x80 if length else byte)
+        if not length:
+            return bytes(encoded)
+
+
+def _encode_string(value) -> bytes:
+    if isinstance(value, str):
+        value = value.encode('utf-8')
+    return struct.pack('!H', len(value)) + value
+
+
+def encode_packet(packet_type: int, flags: int, body: bytes) -> bytes:
+    """Paquet complet : en-tête fixe + corps"""
+    return bytes([packet_type << 4 | flags]) + _encode_length(len(body)) + body
+
+
+def encode_publish(topic: str, payload: bytes, qos: int = 0, packet_id: int = 0,
+                   dup: bool = False, retain: bool = False) -> bytes:
+    """Paquet PUBLISH"""
+    flags = (dup << 3) | (qos << 1) | retain
+    body = _encode_string(topic)
+    if qos:
+        body += struct.pack('!H', packet_id)
+    return encode_packet(PUBLISH, flags, body + payload)
+
+
+def decode_publish(flags: int, body: bytes) -> Tuple[str, bytes, int, int]:
+    """Décoder un PUBLISH : (topic, payload, qos, packet_id)"""
+    qos = (flags >> 1) & 0x03
+    topic_length = struct.unpack_from('!H', body)[0]
+    topic = body[2:2 + topic_length].decode('utf-8')
+    position = 2 + topic_length
+    packet_id = 0
+    if qos:
+        packet_id = struct.unpack_from('!H', body, position)[0]
+        position += 2
+    return topic, body[position:], qos, packet_id
+
+
+async def read_packet(reader: asyncio.StreamReader) -> Tuple[int, int, bytes]:
+    """Lire un paquet : (type, drapeaux, corps) ; IncompleteReadError en fin de flux"""
+    header = (await reader.readexactly(1))[0]
+    length, multiplier = 0, 1
+    while True:
+        byte = (await reader.readexactly(1))[0]
+        length += (byte & 0x7F) * multiplier
+        if not byte & 0x80:
+            break
+        multiplier *= 128
+        if multiplier > 128 ** 3:
+            raise ValueError("Longueur de paquet MQTT invalide")
+    body = await reader.readexactly(length) if length else b''
+    return header >> 4, header & 0x0F, body
+
+
+class MQTTClient:
+    """Client MQTT asyncio : connexion, publication QoS 0/1, keepalive
+
+    Même interface que MockMQTTClient. Les messages QoS 1 non acquittés à la
+    perte de connexion sont retransmis (drapeau DUP) à la reconnexion.
+    """
+
+    def __init__(self, broker_host: str, broker_port: int, username=None, password=None,
+                 client_id: Optional[str] = None, keepalive: int = 60, max_inflight: int = 100,
+                 clean_session: bool = True, connect_timeout: float = 10.0):
+        self.broker_host = broker_host
+        self.broker_port = broker_port
+        self.username = username
+        self.password = password
+        self.client_id = client_id or f"usine-{os.getpid()}"
+        self.keepalive = keepalive
+        self.max_inflight = max_inflight
+        self.clean_session = clean_session
+        self.connect_timeout = connect_timeout
+        self.connected = False
+
+        self._reader = None
+        self._writer = None
+        self._reader_task = None
+        self._ping_task = None
+        self._connack = None
+        self._last_write = 0.0
+
+        # Fenêtre de messages QoS 1 en vol : identifiant -> paquet PUBLISH
+        self._window = asyncio.Semaphore(max_inflight)
+        self._inflight: Dict[int, bytes] = {}
+        # Instant d'émission et contexte de l'appelant des messages en vol :
+        # on_ack(aller-retour jusqu'au PUBACK, contexte)
+        self._sent_at: Dict[int, Tuple[float, Any]] = {}
+        self.on_ack: Optional[Callable[[float, Any], None]] = None
+        self._next_id = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+        # Abonnements (monitoring) : accusés SUBACK attendus, messages reçus (topic, payload)
+        self._subacks: Dict[int, asyncio.Future] = {}
+        self.messages: asyncio.Queue = asyncio.Queue()
+
+        self.stats = {
+            'published': 0,
+            'acked': 0,
+            'retransmitted': 0
+        }
+
+    async def connect(self):
+        """Ouvrir la connexion TCP et négocier la session (CONNECT / CONNACK)"""
+        # Reconnexion : libérer les tâches et le flux de la connexion perdue
+        await self._close()
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.broker_host, self.broker_port), self.connect_timeout)
+
+        flags = 0x02 if self.clean_session else 0
+        payload = _encode_string(self.client_id)
+        if self.username:
+            flags |= 0x80
+            payload += _encode_string(self.username)
+        if self.password:
+            flags |= 0x40
+            payload += _encode_string(self.password)
+        body = _encode_string('MQTT') + struct.pack('!BBH', PROTOCOL_LEVEL, flags, self.keepalive) + payload
+
+        self._connack = asyncio.get_running_loop().create_future()
+        self._reader_task = asyncio.create_task(self._read_loop())
+        self._write(encode_packet(CONNECT, 0, body))
+        try:
+            return_code = await asyncio.wait_for(self._connack, self.connect_timeout)
+        except BaseException:
+            await self._close()
+            raise
+        if return_code:
+            await self._close()
+            raise ConnectionError(f"Connexion MQTT refusée: {CONNACK_ERRORS.get(return_code, return_code)}")
+
+        self.connected = True
+        if self.keepalive:
+            self._ping_task = asyncio.create_task(self._ping_loop())
+
+        # Messages non acquittés par la connexion précédente
+        for packet_id, packet in list(self._inflight.items()):
+            self._write(bytes([packet[0] | 0x08]) + packet[1:])
+            self._sent_at[packet_id] = (time.monotonic(), self._sent_at.get(packet_id, (0, None))[1])
+            self.stats['retransmitted'] += 1
+        return True
+
+    def _write(self, packet: bytes):
+        self._writer.write(packet)
+        self._last_write = time.monotonic()
+
+    def _allocate_id(self) -> int:
+        while True:
+            self._next_id = self._next_id % 65535 + 1
+            if self._next_id not in self._inflight:
+                return self._next_id
+
+    async def publish(self, topic: str, payload: bytes, qos: int = 0, timeout: Optional[float] = None,
+                      context: Any = None):
+        """Publier un message
+
+        QoS 0 : retourne dès l'écriture. QoS 1 : retourne dès l'écriture si la
+        fenêtre de messages en vol le permet, l'accusé est attendu en arrière-plan.
+        Sans attente (fenêtre et tampon disponibles), aucun passage par la boucle
+        asyncio ; sinon l'attente est bornée par timeout (asyncio.TimeoutError).
+        context (QoS 1) est transmis à on_ack à la réception du PUBACK.
+        """
+        if not self.connected:
+            raise ConnectionError("Non connecté au broker MQTT")
+
+        if qos == 0:
+            self._write(encode_publish(topic, payload))
+        else:
+            if self._window.locked():
+                await asyncio.wait_for(self._window.acquire(), timeout)
+            else:
+                await self._window.acquire()
+            if not self.connected:
+                self._window.release()
+                raise ConnectionError("Connexion MQTT perdue")
+            packet_id = self._allocate_id()
+            packet = encode_publish(topic, payload, 1, packet_id)
+            self._inflight[packet_id] = packet
+            self._idle.clear()
+            self._write(packet)
+            self._sent_at[packet_id] = (self._last_write, context)
+
+        self.stats['published'] += 1
+        # Contre-pression : attend seulement si le tampon d'émission est plein
+        if self._writer.transport.get_write_buffer_size() > DRAIN_THRESHOLD:
+            await asyncio.wait_for(self._writer.drain(), timeout)
+        return True
+
+    async def subscribe(self, topic: str, timeout: Optional[float] = None):
+        """S'abonner à un filtre de topics (QoS 0) ; les messages arrivent dans self.messages"""
+        if not self.connected:
+            raise ConnectionError("Non connecté au broker MQTT")
+        packet_id = self._allocate_id()
+        suback = asyncio.get_running_loop().create_future()
+        self._subacks[packet_id] = suback
+        self._write(encode_packet(SUBSCRIBE, 0x02, struct.pack('!H', packet_id) + _encode_string(topic) + b'\x00'))
+        try:
+            granted = await asyncio.wait_for(suback, timeout)
+        finally:
+            self._subacks.pop(packet_id, None)
+        if granted == 0x80:
+            raise ConnectionError(f"Abonnement MQTT refusé: {topic}")
+
+    @property
+    def inflight(self) -> int:
+        """Messages QoS 1 en attente d'accusé"""
+        return len(self._inflight)
+
+    async def wait_for_acks(self, timeout: Optional[float] = None) -> bool:
+        """Attendre l'accusé de tous les messages en vol"""
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def _read_loop(self):
+        """Lire les paquets du broker (CONNACK, PUBACK, SUBACK, PUBLISH, PINGRESP)"""
+        try:
+            while True:
+                packet_type, flags, body = await read_packet(self._reader)
+                if packet_type == PUBACK:
+                    packet_id = struct.unpack('!H', body[:2])[0]
+                    if self._inflight.pop(packet_id, None) is not None:
+                        self.stats['acked'] += 1
+                        sent = self._sent_at.pop(packet_id, None)
+                        if self.on_ack is not None and sent is not None:
+                            self.on_ack(time.monotonic() - sent[0], sent[1])
+                        self._window.release()
+                        if not self._inflight:
+                            self._idle.set()
+                elif packet_type == CONNACK:
+                    if not self._connack.done():
+                        self._connack.set_result(body[1])
+                elif packet_type == PUBLISH:
+                    topic, payload, qos, packet_id = decode_publish(flags, body)
+                    if qos:
+                        self._write(encode_packet(PUBACK, 0, struct.pack('!H', packet_id)))
+                    self.messages.put_nowait((topic, payload))
+                elif packet_type == SUBACK:
+                    suback = self._subacks.get(struct.unpack('!H', body[:2])[0])
+                    if suback is not None and not suback.done():
+                        suback.set_result(body[2])
+        except (asyncio.IncompleteReadError, ConnectionError, OSError, ValueError) as e:
+            if self.connected:
+                logger.warning(f"Connexion MQTT perdue: {e or 'fermée par le broker'}")
+            if self._connack is not None and not self._connack.done():
+                self._connack.set_exception(ConnectionError("Connexion MQTT fermée"))
+        finally:
+            self.connected = False
+
+    async def _ping_loop(self):
+        """PINGREQ lorsque rien n'a été écrit depuis la moitié du keepalive"""
+        while self.connected:
+            await asyncio.sleep(self.keepalive / 2)
+            if self.connected and time.monotonic() - self._last_write >= self.keepalive / 2:
+                try:
+                    self._write(encode_packet(PINGREQ, 0, b''))
+                except (ConnectionError, OSError):
+                    return
+
+    async def _close(self):
+        for task in (self._ping_task, self._reader_task):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._ping_task = self._reader_task = None
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+            self._writer = None
+        self.connected = False
+
+    async def disconnect(self, timeout: float = 5.0):
+        """Attendre les accusés en cours puis fermer proprement (DISCONNECT)"""
+        if self.connected:
+            if not await self.wait_for_acks(timeout):
+                logger.warning(f"MQTT: {self.inflight} messages non acquittés à la fermeture")
+            try:
+                self._write(encode_packet(DISCONNECT, 0, b''))
+                await self._writer.drain()
+            except (ConnectionError, OSError):
+                pass
+        await self._close()
@@ -3,13 +3,18 @@ Module de publication MQTT
 Cahier des charges Usine 4.0
 """
 
-import json
 import asyncio
-from typing import Dict, Any
+import time
+from typing import Dict, Any, List
 from .base_output import BaseOutput
+from .outbox import Outbox
+from .mqtt_client import MQTTClient
+from .resilience import AdaptiveTimeout, Backoff, CircuitBreaker, CircuitOpenError
+from metrics import Histogram
+from sensor_schema import SensorSchema
+from serializers import create_serializer
 
-# Simulation MQTT pour le développement
-# En production, utilisez paho-mqtt
+# Simulation MQTT pour le développement (client: "mock")
 class MockMQTTClient:
     """Client MQTT simulé pour développement"""
     
@@ -26,7 +31,7 @@ class MockMQTTClient:
         self.connected = True
         return True
     
-    async def publish(self, topic: str, payload: str, qos: int = 0):
+    async def publish(self, topic: str, payload: bytes, qos: int = 0, timeout=None, context=None):
         """Simuler la publication MQTT"""
         if not self.connected:
             raise Exception("Non connecté au broker MQTT")
@@ -50,45 +55,220 @@ class MQTTOutput(BaseOutput):
         self.qos = config.get('qos', 0)
         self.username = config.get('username')
         self.password = config.get('password')
+        self.timeout = config.get('timeout', 10)
+        # Encodage des charges utiles : json, msgpack, cbor ou packed
+        self.serializer = create_serializer(config.get('encoding', 'json'),
+                                            SensorSchema.from_config(config.get('sensors')))
+        
+        # Client asyncio réel ("asyncio") ou simulé ("mock")
+        self.client_type = config.get('client', 'asyncio')
+        self.client_id = config.get('client_id')
+        self.keepalive = config.get('keepalive', 60)
+        self.max_inflight = config.get('max_inflight', 100)
+        self.clean_session = config.get('clean_session', True)
+        
+        # Disjoncteur et délai d'attente adaptatif des publications
+        breaker_config = config.get('circuit_breaker', {}) or {}
+        self.breaker = CircuitBreaker('mqtt', breaker_config) if breaker_config.get('enabled', True) else None
+        adaptive_config = config.get('adaptive_timeout', {}) or {}
+        self.adaptive_timeout = (AdaptiveTimeout(self.timeout, adaptive_config)
+                                 if adaptive_config.get('enabled', True) else None)
+        # Reconnexion automatique : attente exponentielle avec gigue
+        self.backoff = Backoff(config.get('reconnect', {}) or {})
+        self._reconnect_task = None
+        
+        self.stats['reconnects'] = 0
+        # Latence des publications (secondes)
+        self.request_latency = Histogram()
+        
+        # Enregistrements non délivrés conservés sur disque puis renvoyés
+        outbox_config = config.get('outbox', {}) or {}
+        if outbox_config.get('enabled', False):
+            self.outbox = Outbox('mqtt', outbox_config, binary=self.serializer.binary)
+    
+    def _create_client(self):
+        """Créer le client MQTT"""
+        if self.client_type == 'asyncio':
+            client = MQTTClient(
+                self.broker_host,
+                self.broker_port,
+                self.username,
+                self.password,
+                client_id=self.client_id,
+                keepalive=self.keepalive,
+                max_inflight=self.max_inflight,
+                clean_session=self.clean_session,
+                connect_timeout=self.timeout
+            )
+            if self.qos:
+                # QoS 1 : latence mesurée jusqu'au PUBACK, publish() n'écrit que dans le tampon
+                client.on_ack = self._observe_ack
+            return client
+        return MockMQTTClient(
+            self.broker_host,
+            self.broker_port,
+            self.username,
+            self.password
+        )
     
     async def initialize(self):
         """Initialiser le client MQTT"""
         if self.enabled:
+            self.client = self._create_client()
             try:
-                self.client = MockMQTTClient(
-                    self.broker_host,
-                    self.broker_port,
-                    self.username,
-                    self.password
-                )
-                
-                await self.client.connect()
-                self.logger.info(f"MQTT connecté à {self.broker_host}:{self.broker_port}")
+                await asyncio.wait_for(self.client.connect(), self.timeout)
+                self.logger.info(f"MQTT connecté à {self.broker_host}:{self.broker_port} "
+                                 f"(encodage {self.serializer.name})")
                 print(f"📡 MQTT Output activé - {self.broker_host}:{self.broker_port}")
                 
             except Exception as e:
+                # Le broker peut revenir : reconnexion en tâche de fond
                 self.logger.error(f"Échec connexion MQTT: {e}")
-                print(f"❌ MQTT: Connexion échouée")
-                self.enabled = False
+                print(f"❌ MQTT: Connexion échouée, reconnexion automatique")
+                self._schedule_reconnect()
+            
+            if self.outbox:
+                self.outbox.open()
+                self.outbox.start(self._resend)
+    
+    def _schedule_reconnect(self):
+        """Lancer la tâche de reconnexion si elle ne tourne pas déjà"""
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = asyncio.create_task(self._reconnect_loop())
+    
+    async def _reconnect_loop(self):
+        """Se reconnecter au broker avec attente exponentielle et gigue"""
+        while not self.client.connected:
+            delay = self.backoff.next_delay()
+            self.logger.info(f"Reconnexion MQTT dans {delay:.2f}s (tentative {self.backoff.attempts})")
+            await asyncio.sleep(delay)
+            try:
+                await asyncio.wait_for(self.client.connect(), self.timeout)
+            except Exception as e:
+                self.logger.warning(f"Reconnexion MQTT échouée: {e}")
+        
+        self.backoff.reset()
+        self.stats['reconnects'] += 1
+        if self.breaker:
+            self.breaker.record_success()
+        self.logger.info(f"MQTT reconnecté à {self.broker_host}:{self.broker_port}")
+    
+    @property
+    def _acked(self) -> bool:
+        """Latence des publications mesurée par les accusés PUBACK"""
+        return getattr(self.client, 'on_ack', None) is not None
+    
+    @property
+    def tracks_delivery(self) -> bool:
+        # QoS 1 : livraison signalée au PUBACK ; QoS 0 : à l'écriture
+        return True
+    
+    def _observe_ack(self, latency: float, data: Dict[str, Any] = None):
+        """Aller-retour d'une publication QoS 1 jusqu'à son PUBACK"""
+        self.request_latency.observe(latency)
+        if self.adaptive_timeout:
+            self.adaptive_timeout.observe(latency)
+        if data is not None:
+            self._delivered([data], True)
+    
+    async def _publish(self, payload: bytes, data: Dict[str, Any] = None):
+        """Publication protégée par le disjoncteur, avec délai d'attente adaptatif
+
+        Lève CircuitOpenError sans publier si le client est déconnecté
+        ou si le disjoncteur est ouvert.
+        """
+        if not self.client.connected:
+            self._schedule_reconnect()
+            raise CircuitOpenError("Non connecté au broker MQTT")
+        if self.breaker:
+            self.breaker.check()
+        
+        timeout = self.adaptive_timeout.timeout_for(self.breaker) if self.adaptive_timeout else self.timeout
+        started = time.perf_counter()
+        try:
+            await self.client.publish(self.topic, payload, self.qos, timeout=timeout, context=data)
+        except Exception as e:
+            if isinstance(e, asyncio.TimeoutError) and self.adaptive_timeout:
+                self.adaptive_timeout.record_timeout()
+            if self.breaker:
+                self.breaker.record_failure()
+            if not self.client.connected:
+                self._schedule_reconnect()
+            raise
+        
+        if self.breaker:
+            self.breaker.record_success()
+        if not self._acked:
+            latency = time.perf_counter() - started
+            self.request_latency.observe(latency)
+            if self.adaptive_timeout:
+                self.adaptive_timeout.observe(latency)
+    
+    def _store(self, payload: bytes):
+        """Conserver dans l'outbox un enregistrement non délivré"""
+        if self.outbox:
+            try:
+                self.outbox.append([payload])
+            except OSError as e:
+                self.logger.error(f"Erreur écriture outbox: {e}")
     
     async def send_data(self, data: Dict[str, Any]):
         """Publier les données sur le topic MQTT"""
         if not self.enabled or not self.client:
             return
         
+        payload = self.serializer.encode(data)
         try:
-            payload = json.dumps(data, ensure_ascii=False)
-            await self.client.publish(self.topic, payload, self.qos)
+            await self._publish(payload, data)
+            if not self._acked:
+                self._delivered([data], True)
+            self.stats['records_sent'] += 1
+            self.stats['bytes_sent'] += len(payload)
             self.logger.debug(f"Données publiées sur {self.topic}")
-            print(f"✅ MQTT: Publié sur {self.topic}")
-            
+            if self.verbose:
+                print(f"✅ MQTT: Publié sur {self.topic}")
+        
+        except CircuitOpenError:
+            # Échec immédiat, sans attendre le délai de publication
+            self.stats['records_failed'] += 1
+            self._delivered([data], False)
+            self._store(payload)
         except Exception as e:
+            self.stats['records_failed'] += 1
+            self._delivered([data], False)
             self.logger.error(f"Erreur publication MQTT: {e}")
-            print(f"❌ MQTT: Erreur - {e}")
+            if self.verbose:
+                print(f"❌ MQTT: Erreur - {e}")
+            self._store(payload)
+    
+    async def _resend(self, records: List[bytes]) -> int:
+        """Republier un lot de l'outbox ; retourne le nombre d'enregistrements délivrés"""
+        if not self.client:
+            return 0
+        
+        for delivered, payload in enumerate(records):
+            try:
+                await self._publish(payload)
+            except Exception as e:
+                self.logger.debug(f"Republication outbox impossible: {e}")
+                return delivered
+            self.stats['bytes_sent'] += len(payload)
+        return len(records)
     
     async def cleanup(self):
         """Fermer la connexion MQTT"""
+        if self._reconnect_task:
+            self._reconnect_task.cancel()
+            try:
+                await self._reconnect_task
+            except asyncio.CancelledError:
+                pass
+            self._reconnect_task = None
+        
+        if self.outbox:
+            await self.outbox.stop()
+        
         if self.client:
             await self.client.disconnect()
             print("📡 MQTT Output fermé")
-            self.logger.info("Connexion MQTT fermée")
\ No newline at end of file
+            self.logger.info("Connexion MQTT fermée")
@@ -0,0 +1,275 @@
+"""
+File d'envoi persistante (store-and-forward) des outputs réseau
+Les enregistrements non délivrés sont écrits dans des segments JSON Lines
+sur disque, puis renvoyés par lots dès que la destination répond
+(charges utiles binaires : une ligne base64 par enregistrement)
+"""
+
+import asyncio
+import base64
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Any, Awaitable, Callable, List, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+CURSOR_FILE = 'cursor.json'
+# Lecture des segments par blocs à l'ouverture (mémoire bornée)
+SCAN_CHUNK = MB
+
+
+class Outbox:
+    """Segments d'enregistrements en attente d'envoi, avec curseur de lecture persistant
+
+    Livraison au moins une fois : un arrêt entre l'envoi d'un lot et
+    l'enregistrement du curseur provoque le renvoi de ce lot au redémarrage.
+    """
+
+    def __init__(self, name: str, config: Dict[str, Any] = None, binary: bool = False):
+        config = config or {}
+        self.name = name
+        # Charges utiles binaires (msgpack, cbor, packed) : encodées en base64
+        self.binary = binary
+        self.directory = Path(config.get('dir', 'data/outbox')) / name
+        self.segment_bytes = int(config.get('segment_mb', 4) * MB)
+        self.max_bytes = int(config.get('max_mb', 256) * MB)
+        self.drain_batch = config.get('drain_batch', 500)
+        self.retry_interval = config.get('retry_interval', 5.0)
+
+        # Numéro de segment -> [taille en octets, nombre d'enregistrements]
+        self._segments: Dict[int, List[int]] = {}
+        # Curseur de lecture : segment, offset, enregistrements déjà lus du segment
+        self._cursor = (0, 0, 0)
+        self._handle = None
+        self._task = None
+        self._wakeup = None
+
+        # Métriques de la file d'envoi
+        self.stats = {
+            'appended': 0,
+            'drained': 0,
+            'dropped': 0,
+            'backlog_records': 0,
+            'backlog_bytes': 0,
+            'drain_rate': 0.0
+        }
+
+    def _segment_path(self, number: int) -> Path:
+        return self.directory / f"{number:010d}.jsonl"
+
+    def open(self):
+        """Recharger les segments et le curseur laissés par une exécution précédente"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for path in sorted(self.directory.glob('*.jsonl')):
+            self._segments[int(path.stem)] = self._scan_segment(path)
+
+        cursor_path = self.directory / CURSOR_FILE
+        if cursor_path.exists():
+            try:
+                self._cursor = tuple(json.loads(cursor_path.read_text(encoding='utf-8')))
+            except (json.JSONDecodeError, ValueError):
+                logger.warning(f"Outbox {self.name}: curseur illisible, relecture complète")
+        if self._segments and self._cursor[0] not in self._segments:
+            self._cursor = (min(self._segments), 0, 0)
+
+        self._update_backlog()
+        if self.stats['backlog_records']:
+            logger.info(f"Outbox {self.name}: {self.stats['backlog_records']} enregistrements en attente")
+
+    @staticmethod
+    def _scan_segment(path: Path) -> List[int]:
+        """Taille et nombre d'enregistrements d'un segment, lu par blocs
+
+        Un dernier enregistrement incomplet (arrêt brutal pendant l'ajout) est tronqué.
+        """
+        size, end, count = 0, 0, 0
+        with open(path, 'r+b') as f:
+            while True:
+                chunk = f.read(SCAN_CHUNK)
+                if not chunk:
+                    break
+                newlines = chunk.count(b'\n')
+                if newlines:
+                    count += newlines
+                    end = size + chunk.rfind(b'\n') + 1
+                size += len(chunk)
+            if end < size:
+                f.truncate(end)
+        return [end, count]
+
+    def _update_backlog(self):
+        number, offset, consumed = self._cursor
+        segments = [(n, size, count) for n, (size, count) in self._segments.items() if n >= number]
+        self.stats['backlog_bytes'] = sum(size for _, size, _ in segments) - (offset if segments else 0)
+        self.stats['backlog_records'] = sum(count for _, _, count in segments) - (consumed if segments else 0)
+
+    @property
+    def backlog(self) -> int:
+        """Nombre d'enregistrements en attente"""
+        return self.stats['backlog_records']
+
+    def append(self, records: List[bytes]):
+        """Conserver des enregistrements encodés (JSON compact ou binaire) non délivrés"""
+        if not records:
+            return
+
+        if self.binary:
+            records = [base64.b64encode(record) for record in records]
+        payload = b''.join(record + b'\n' for record in records)
+        tail = max(self._segments) if self._segments else 0
+        if tail not in self._segments or self._segments[tail][0] + len(payload) > self.segment_bytes:
+            if tail in self._segments:
+                tail += 1
+            self._close_handle()
+            self._segments[tail] = [0, 0]
+            if len(self._segments) == 1:
+                self._cursor = (tail, 0, 0)
+
+        if self._handle is None:
+            self._handle = open(self._segment_path(tail), 'ab')
+        self._handle.write(payload)
+        self._handle.flush()
+        self._segments[tail][0] += len(payload)
+        self._segments[tail][1] += len(records)
+        self.stats['appended'] += len(records)
+
+        self._enforce_limit()
+        self._update_backlog()
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _enforce_limit(self):
+        """Borner l'espace disque : abandonner les segments les plus anciens"""
+        while sum(size for size, _ in self._segments.values()) > self.max_bytes and len(self._segments) > 1:
+            oldest = min(self._segments)
+            size, count = self._segments.pop(oldest)
+            number, _, consumed = self._cursor
+            dropped = count - consumed if number == oldest else count
+            self.stats['dropped'] += dropped
+            self._segment_path(oldest).unlink(missing_ok=True)
+            if number <= oldest:
+                self._cursor = (min(self._segments), 0, 0)
+            logger.warning(f"Outbox {self.name}: limite disque atteinte, {dropped} enregistrements abandonnés")
+
+    def read_batch(self, max_records: int) -> Tuple[List[bytes], List[tuple]]:
+        """Lire jusqu'à max_records enregistrements depuis le curseur
+
+        Retourne les enregistrements et la position du curseur après chacun.
+        """
+        records, positions = [], []
+        number, offset, consumed = self._cursor
+
+        while len(records) < max_records and number in self._segments:
+            size, count = self._segments[number]
+            if offset < size:
+                with open(self._segment_path(number), 'rb') as f:
+                    f.seek(offset)
+                    while len(records) < max_records and offset < size:
+                        line = f.readline()
+                        offset += len(line)
+                        consumed += 1
+                        records.append(self._decode_line(line.rstrip(b'\n')))
+                        positions.append((number, offset, consumed))
+            if offset < size or number == max(self._segments):
+                break
+            # Segment entièrement lu : passer au suivant
+            following = [n for n in self._segments if n > number]
+            number, offset, consumed = min(following), 0, 0
+        return records, positions
+
+    @staticmethod
+    def _decode_line(line: bytes) -> bytes:
+        """Ligne de segment -> charge utile (un objet JSON commence par '{', absent du base64)"""
+        if line[:1] == b'{':
+            return line
+        return base64.b64decode(line)
+
+    def commit(self, position: tuple, count: int):
+        """Avancer le curseur après un envoi réussi et supprimer les segments lus
+
+        Si la limite disque a abandonné des segments pendant l'envoi, le curseur
+        a déjà été avancé par _enforce_limit : il ne recule jamais.
+        """
+        position = tuple(position)
+        if position[0] in self._segments and position[:2] > self._cursor[:2]:
+            self._cursor = position
+        for number in [n for n in self._segments if n < self._cursor[0]]:
+            del self._segments[number]
+            self._segment_path(number).unlink(missing_ok=True)
+
+        # Segment courant entièrement lu (et pas en cours d'écriture) : supprimé
+        number, offset, _ = self._cursor
+        if number in self._segments and offset >= self._segments[number][0] and number != max(self._segments):
+            del self._segments[number]
+            self._segment_path(number).unlink(missing_ok=True)
+
+        self._save_cursor()
+        self.stats['drained'] += count
+        self._update_backlog()
+
+    def _save_cursor(self):
+        cursor_path = self.directory / CURSOR_FILE
+        temp_path = cursor_path.with_suffix('.tmp')
+        temp_path.write_text(json.dumps(list(self._cursor)), encoding='utf-8')
+        os.replace(temp_path, cursor_path)
+
+    def start(self, send: Callable[[List[bytes]], Awaitable[int]]):
+        """Démarrer le renvoi en tâche de fond
+
+        send(records) retourne le nombre d'enregistrements délivrés, dans l'ordre.
+        """
+        self._wakeup = asyncio.Event()
+        if self.backlog:
+            self._wakeup.set()
+        self._task = asyncio.create_task(self._drain_loop(send))
+
+    async def _drain_loop(self, send: Callable[[List[bytes]], Awaitable[int]]):
+        """Renvoyer les lots en attente ; attendre retry_interval après un échec"""
+        while True:
+            if not self.backlog:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            records, positions = self.read_batch(self.drain_batch)
+            if not records:
+                self._update_backlog()
+                await asyncio.sleep(self.retry_interval)
+                continue
+
+            started = time.monotonic()
+            try:
+                delivered = await send(records)
+            except Exception as e:
+                logger.error(f"Outbox {self.name}: erreur de renvoi: {e}")
+                delivered = 0
+
+            if delivered:
+                self.commit(positions[delivered - 1], delivered)
+                elapsed = time.monotonic() - started
+                self.stats['drain_rate'] = delivered / elapsed if elapsed > 0 else 0.0
+            if delivered < len(records):
+                self.stats['drain_rate'] = 0.0
+                await asyncio.sleep(self.retry_interval)
+
+    def _close_handle(self):
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+    async def stop(self):
+        """Arrêter le renvoi ; les enregistrements restants sont conservés sur disque"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._close_handle()
+        if self.backlog:
+            logger.info(f"Outbox {self.name}: {self.backlog} enregistrements conservés pour le prochain démarrage")
@@ -0,0 +1,196 @@
+"""
+File d'attente bornée par module de sortie
+Découple la cadence de génération de la latence des sorties
+"""
+
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import Dict, Any
+import logging
+
+from metrics import Histogram
+from record import encode_json
+
+logger = logging.getLogger(__name__)
+
+# Politiques de débordement supportées
+OVERFLOW_POLICIES = ('block', 'drop_oldest', 'drop_newest', 'spill')
+
+
+class OutputQueue:
+    """File asynchrone bornée alimentant un module de sortie via une tâche dédiée"""
+
+    def __init__(self, output, config: Dict[str, Any] = None):
+        config = config or {}
+        self.output = output
+        self.name = output.__class__.__name__
+        self.maxsize = config.get('maxsize', 1000)
+        self.overflow = config.get('overflow', 'block')
+        if self.overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Politique de débordement inconnue: {self.overflow}")
+
+        spill_dir = Path(config.get('spill_dir', 'data/spill'))
+        self.spill_path = spill_dir / f"{self.name.lower()}.jsonl"
+
+        self.queue = None
+        self._consumer = None
+        self._spill_lock = None
+        # Écritures de débordement et bascule du fichier vers la relecture
+        self._spill_write_lock = None
+
+        # Compteurs de la file
+        self.stats = {
+            'published': 0,
+            'delivered': 0,
+            'dropped': 0,
+            'spilled': 0,
+            'spill_corrupt': 0,
+            'errors': 0,
+            'max_depth': 0,
+            'last_lag': 0.0,
+            'max_lag': 0.0
+        }
+        # Durée d'envoi vers le module de sortie (secondes)
+        self.latency = Histogram()
+
+    @property
+    def depth(self) -> int:
+        """Nombre d'éléments en attente"""
+        return self.queue.qsize() if self.queue else 0
+
+    async def start(self):
+        """Démarrer la tâche consommatrice"""
+        self.queue = asyncio.Queue(maxsize=self.maxsize)
+        self._spill_lock = asyncio.Lock()
+        self._spill_write_lock = asyncio.Lock()
+        self._consumer = asyncio.create_task(self._consume())
+
+    async def publish(self, data: Dict[str, Any]):
+        """Publier un enregistrement dans la file"""
+        await self._put(('record', data))
+
+    async def publish_batch(self, batch):
+        """Publier un lot columnaire (FleetBatch) dans la file"""
+        await self._put(('batch', batch))
+
+    async def _put(self, payload):
+        item = (time.monotonic(), payload)
+        self.stats['published'] += 1
+
+        if self.overflow == 'block':
+            await self.queue.put(item)
+        elif self.queue.full():
+            if self.overflow == 'drop_oldest':
+                self.queue.get_nowait()
+                self.queue.task_done()
+                self.stats['dropped'] += 1
+                self.queue.put_nowait(item)
+            elif self.overflow == 'drop_newest':
+                self.stats['dropped'] += 1
+            else:
+                await self._spill(payload)
+        else:
+            self.queue.put_nowait(item)
+
+        self.stats['max_depth'] = max(self.stats['max_depth'], self.queue.qsize())
+
+    async def _spill(self, payload):
+        """Déborder sur disque (JSON Lines) lorsque la file est pleine
+
+        Encodage et écriture dans un thread : la boucle d'événements continue
+        de servir la génération et les sorties pendant les E/S disque.
+        """
+        async with self._spill_write_lock:
+            await asyncio.to_thread(self._write_spill, payload)
+        self.stats['spilled'] += 1
+
+    def _write_spill(self, payload):
+        kind, data = payload
+        records = data.to_records() if kind == 'batch' else [data]
+        lines = b''.join(encode_json(record) + b'\n' for record in records)
+
+        self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.spill_path, 'ab') as f:
+            f.write(lines)
+
+    async def _deliver(self, payload):
+        kind, data = payload
+        started = time.perf_counter()
+        try:
+            if kind == 'batch':
+                await self.output.send_batch(data)
+            else:
+                await self.output.send_data(data)
+            self.latency.observe(time.perf_counter() - started)
+            self.stats['delivered'] += 1
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.error(f"Erreur envoi {self.name}: {e}")
+
+    async def _drain_spill(self):
+        """Rejouer les enregistrements débordés sur disque"""
+        async with self._spill_lock:
+            draining_path = self.spill_path.with_suffix('.draining')
+            # Reprendre un fichier laissé par un arrêt précédent
+            if not draining_path.exists():
+                # Pas de bascule pendant une écriture en cours
+                async with self._spill_write_lock:
+                    if not self.spill_path.exists():
+                        return
+                    self.spill_path.rename(draining_path)
+
+            with open(draining_path, 'rb') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Ligne incomplète (arrêt brutal pendant le débordement)
+                        self.stats['spill_corrupt'] += 1
+                        logger.warning(f"File {self.name}: ligne débordée illisible ignorée")
+                        continue
+                    await self._deliver(('record', record))
+            draining_path.unlink()
+
+    async def _consume(self):
+        """Tâche consommatrice : envoyer les éléments vers le module de sortie"""
+        while True:
+            if self.overflow == 'spill' and self.queue.empty():
+                try:
+                    await self._drain_spill()
+                except Exception as e:
+                    # La tâche consommatrice ne doit pas s'arrêter : nouvel essai au prochain passage
+                    self.stats['errors'] += 1
+                    logger.error(f"Erreur relecture débordement {self.name}: {e}")
+
+            enqueued_at, payload = await self.queue.get()
+            lag = time.monotonic() - enqueued_at
+            self.stats['last_lag'] = lag
+            self.stats['max_lag'] = max(self.stats['max_lag'], lag)
+
+            await self._deliver(payload)
+            self.queue.task_done()
+
+    async def stop(self, timeout: float = 5.0):
+        """Vider la file (dans la limite du délai) puis arrêter la tâche consommatrice"""
+        if not self._consumer:
+            return
+
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+            if self.overflow == 'spill':
+                await asyncio.wait_for(self._drain_spill(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"File {self.name}: {self.depth} éléments non envoyés à l'arrêt")
+        except OSError as e:
+            logger.error(f"Erreur relecture débordement {self.name}: {e}")
+
+        self._consumer.cancel()
+        try:
+            await self._consumer
+        except asyncio.CancelledError:
+            pass
+        self._consumer = None
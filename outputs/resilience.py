@@ -0,0 +1,167 @@
+"""
+Résilience des outputs réseau
+Disjoncteur (fermé / ouvert / semi-ouvert), délai d'attente adaptatif
+et attente exponentielle avec gigue pour les reconnexions
+"""
+
+import random
+import time
+from collections import deque
+from typing import Dict, Any
+import logging
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Valeur numérique de l'état exposée par les métriques
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """Envoi refusé sans tentative : le disjoncteur est ouvert"""
+
+
+class CircuitBreaker:
+    """Disjoncteur d'un output réseau
+
+    Fermé : les envois passent. Après failure_threshold échecs consécutifs il
+    s'ouvre et refuse immédiatement les envois pendant reset_timeout secondes,
+    puis passe semi-ouvert : un seul envoi d'essai, qui le referme s'il réussit
+    et le rouvre sinon.
+    """
+
+    def __init__(self, name: str, config: Dict[str, Any] = None):
+        config = config or {}
+        self.name = name
+        self.failure_threshold = config.get('failure_threshold', 5)
+        self.reset_timeout = config.get('reset_timeout', 5.0)
+
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+        self.stats = {
+            'opened': 0,
+            'rejected': 0
+        }
+
+    def allow(self) -> bool:
+        """Un envoi peut-il être tenté maintenant ?"""
+        if self.state == CLOSED:
+            return True
+
+        if self.state == OPEN:
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                self.stats['rejected'] += 1
+                return False
+            self.state = HALF_OPEN
+            self._probing = False
+
+        # Semi-ouvert : un seul envoi d'essai à la fois
+        if self._probing:
+            self.stats['rejected'] += 1
+            return False
+        self._probing = True
+        return True
+
+    @property
+    def probing(self) -> bool:
+        """Envoi d'essai en cours (semi-ouvert)"""
+        return self.state == HALF_OPEN
+
+    def check(self):
+        """Comme allow(), mais lève CircuitOpenError si l'envoi est refusé"""
+        if not self.allow():
+            raise CircuitOpenError(f"Disjoncteur {self.name} ouvert")
+
+    def record_success(self):
+        """Envoi réussi : referme le disjoncteur"""
+        if self.state != CLOSED:
+            logger.info(f"Disjoncteur {self.name} refermé")
+        self.state = CLOSED
+        self._failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        """Envoi échoué : ouvre le disjoncteur au-delà du seuil (ou après un essai raté)"""
+        self._failures += 1
+        if self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.stats['opened'] += 1
+                logger.warning(f"Disjoncteur {self.name} ouvert après {self._failures} échecs")
+            self.state = OPEN
+            self._opened_at = time.monotonic()
+            self._probing = False
+
+
+class AdaptiveTimeout:
+    """Délai d'attente déduit d'un centile des latences récentes
+
+    timeout = multiplier x centile, borné par [minimum, maximum]. Le maximum
+    (délai configuré de l'output) s'applique tant que l'échantillon est trop petit.
+    Un envoi expiré double le délai : une destination devenue durablement plus
+    lente que le délai appris n'échoue pas indéfiniment.
+    """
+
+    def __init__(self, maximum: float, config: Dict[str, Any] = None):
+        config = config or {}
+        self.maximum = maximum
+        self.minimum = min(config.get('min', 1.0), maximum)
+        self.percentile = config.get('percentile', 0.99)
+        self.multiplier = config.get('multiplier', 3.0)
+        self.min_samples = config.get('min_samples', 20)
+        self.recompute_every = config.get('recompute_every', 20)
+
+        self._window = deque(maxlen=config.get('window', 200))
+        self._since_recompute = 0
+        self.current = maximum
+
+    def timeout_for(self, breaker: CircuitBreaker = None) -> float:
+        """Délai de l'envoi suivant (maximum pour l'envoi d'essai du disjoncteur)"""
+        if breaker is not None and breaker.probing:
+            return self.maximum
+        return self.current
+
+    def record_timeout(self):
+        """Envoi expiré : doubler le délai (borné par maximum) et oublier les latences
+
+        Le délai élargi est conservé jusqu'à min_samples nouveaux envois réussis.
+        """
+        self.current = min(self.maximum, self.current * 2)
+        self._window.clear()
+        self._since_recompute = 0
+
+    def observe(self, latency: float):
+        """Ajouter la latence d'un envoi réussi"""
+        self._window.append(latency)
+        self._since_recompute += 1
+        # Recalcul périodique : le tri de la fenêtre n'est pas fait à chaque envoi
+        if self._since_recompute >= self.recompute_every and len(self._window) >= self.min_samples:
+            self._since_recompute = 0
+            ordered = sorted(self._window)
+            value = ordered[min(int(self.percentile * len(ordered)), len(ordered) - 1)]
+            self.current = max(self.minimum, min(self.maximum, value * self.multiplier))
+
+
+class Backoff:
+    """Attente exponentielle avec gigue (« full jitter ») entre deux tentatives"""
+
+    def __init__(self, config: Dict[str, Any] = None):
+        config = config or {}
+        self.initial_delay = config.get('initial_delay', 0.5)
+        self.max_delay = config.get('max_delay', 30.0)
+        self.attempts = 0
+
+    def next_delay(self) -> float:
+        """Délai avant la prochaine tentative"""
+        cap = min(self.max_delay, self.initial_delay * 2 ** self.attempts)
+        self.attempts += 1
+        return random.uniform(0, cap)
+
+    def reset(self):
+        """Tentative réussie : repartir du délai initial"""
+        self.attempts = 0
@@ -0,0 +1,106 @@
+"""
+Enregistrement partagé entre les modules de sortie
+Les formes encodées (JSON compact, ligne CSV, charges utiles binaires) sont calculées une seule fois
+par enregistrement puis réutilisées par toutes les sorties
+"""
+
+import csv
+import io
+import json
+from typing import Dict, Any, Callable, Iterable, Tuple
+
+
+class Record(dict):
+    """Enregistrement au format du cahier des charges avec encodages en cache
+
+    Se comporte comme un dict ; toute modification (affectation, suppression,
+    update, pop, popitem, setdefault, clear, |=) invalide le cache.
+    """
+
+    # Valeurs de classe : pas de __init__ Python, la construction reste celle du dict
+    _json = None
+    _csv = None
+    # Encodages des sérialiseurs (serializers.py), par clé
+    _payloads = None
+
+    def _invalidate(self):
+        self._json = None
+        self._csv = None
+        self._payloads = None
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._invalidate()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._invalidate()
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self._invalidate()
+
+    def __ior__(self, other):
+        super().__ior__(other)
+        self._invalidate()
+        return self
+
+    def pop(self, *args):
+        value = super().pop(*args)
+        self._invalidate()
+        return value
+
+    def popitem(self):
+        item = super().popitem()
+        self._invalidate()
+        return item
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self._invalidate()
+        return super().setdefault(key, default)
+
+    def clear(self):
+        super().clear()
+        self._invalidate()
+
+    @property
+    def json_bytes(self) -> bytes:
+        """JSON compact encodé en UTF-8"""
+        if self._json is None:
+            self._json = json.dumps(self, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        return self._json
+
+    def encoded(self, key: str, encode: Callable[['Record'], bytes]) -> bytes:
+        """Charge utile d'un sérialiseur, calculée une fois pour toutes les sorties"""
+        if self._payloads is None:
+            self._payloads = {}
+        payload = self._payloads.get(key)
+        if payload is None:
+            payload = self._payloads[key] = encode(self)
+        return payload
+
+    def csv_line(self, fieldnames: Tuple[str, ...]) -> str:
+        """Ligne CSV (terminée par \\r\\n) pour l'ordre de colonnes donné"""
+        if self._csv is None or self._csv[0] != fieldnames:
+            buffer = io.StringIO()
+            csv.writer(buffer).writerow([self.get(name, '') for name in fieldnames])
+            self._csv = (fieldnames, buffer.getvalue())
+        return self._csv[1]
+
+
+def encode_json(data: Dict[str, Any]) -> bytes:
+    """JSON compact UTF-8 d'un enregistrement (cache partagé si Record)"""
+    if isinstance(data, Record):
+        return data.json_bytes
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def encode_csv(data: Dict[str, Any], fieldnames: Iterable[str]) -> str:
+    """Ligne CSV d'un enregistrement (cache partagé si Record)"""
+    fieldnames = tuple(fieldnames)
+    if isinstance(data, Record):
+        return data.csv_line(fieldnames)
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow([data.get(name, '') for name in fieldnames])
+    return buffer.getvalue()
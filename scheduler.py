@@ -0,0 +1,106 @@
+"""
+Ordonnanceur de ticks sans dérive pour le Simulateur Usine 4.0
+Échéances absolues sur horloge monotone, intervalles jusqu'à 1 ms
+"""
+
+import asyncio
+import math
+import time
+from typing import Dict, Any, AsyncIterator
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Intervalle minimal supporté (secondes)
+MIN_INTERVAL = 0.001
+
+
+class TickScheduler:
+    """Cadence les ticks sur des échéances absolues et mesure la gigue"""
+
+    def __init__(self, interval: float, duration: float = 0,
+                 spin_threshold: float = 0.002, late_tolerance: float = None):
+        if interval < MIN_INTERVAL:
+            raise ValueError(f"Intervalle trop court: {interval}s (minimum {MIN_INTERVAL}s)")
+
+        self.interval = interval
+        self.duration = duration
+        # En dessous de ce délai, attente active pour limiter la gigue
+        self.spin_threshold = spin_threshold
+        # Retard au-delà duquel un tick est compté comme en retard
+        self.late_tolerance = late_tolerance if late_tolerance is not None else interval * 0.1
+
+        self.start_time = None
+        self.stats = {
+            'ticks': 0,
+            'late': 0,
+            'missed': 0,
+            'jitter_mean': 0.0,
+            'jitter_std': 0.0,
+            'jitter_max': 0.0
+        }
+        self._jitter_m2 = 0.0
+
+    @classmethod
+    def from_config(cls, simulation_config: Dict[str, Any]) -> 'TickScheduler':
+        """Créer l'ordonnanceur depuis la section simulation de config.yaml"""
+        return cls(
+            interval=float(simulation_config.get('interval', 5)),
+            duration=float(simulation_config.get('duration', 0) or 0),
+            spin_threshold=float(simulation_config.get('spin_threshold', 0.002)),
+            late_tolerance=simulation_config.get('late_tolerance')
+        )
+
+    def _record_jitter(self, lateness: float):
+        """Mettre à jour les statistiques de gigue (algorithme de Welford)"""
+        stats = self.stats
+        stats['ticks'] += 1
+        delta = lateness - stats['jitter_mean']
+        stats['jitter_mean'] += delta / stats['ticks']
+        self._jitter_m2 += delta * (lateness - stats['jitter_mean'])
+        stats['jitter_std'] = math.sqrt(self._jitter_m2 / stats['ticks'])
+        stats['jitter_max'] = max(stats['jitter_max'], lateness)
+        if lateness > self.late_tolerance:
+            stats['late'] += 1
+
+    async def _wait_until(self, deadline: float):
+        """Attendre l'échéance : sommeil puis attente active courte"""
+        remaining = deadline - time.monotonic()
+        if remaining > self.spin_threshold:
+            await asyncio.sleep(remaining - self.spin_threshold)
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0)
+
+    async def ticks(self) -> AsyncIterator[int]:
+        """Générer les numéros de tick aux échéances start + n * interval"""
+        self.start_time = time.monotonic()
+        end_time = self.start_time + self.duration if self.duration > 0 else None
+        tick = 0
+
+        while True:
+            deadline = self.start_time + tick * self.interval
+            if end_time is not None and deadline >= end_time:
+                return
+
+            await self._wait_until(deadline)
+            now = time.monotonic()
+            lateness = now - deadline
+            self._record_jitter(lateness)
+
+            yield tick
+
+            # Échéances entièrement manquées : les sauter sans perdre la phase
+            now = time.monotonic()
+            next_tick = tick + 1
+            behind = int((now - (self.start_time + next_tick * self.interval)) // self.interval)
+            if behind > 0:
+                self.stats['missed'] += behind
+                next_tick += behind
+            tick = next_tick
+
+    def report(self) -> str:
+        """Résumé lisible des statistiques de cadencement"""
+        stats = self.stats
+        return (f"{stats['ticks']} ticks, {stats['late']} en retard, {stats['missed']} manqués, "
+                f"gigue moyenne {stats['jitter_mean'] * 1000:.3f}ms "
+                f"(écart-type {stats['jitter_std'] * 1000:.3f}ms, max {stats['jitter_max'] * 1000:.3f}ms)")
@@ -0,0 +1,287 @@
+"""
+Index temporel creux des segments de données (fichiers .idx associés)
+Permet de lire une plage horaire d'une machine sans analyser tous les segments
+"""
+
+import argparse
+import bisect
+import csv
+import io
+import json
+import os
+from pathlib import Path
+from typing import Dict, Any, Iterator, List, Optional, Union
+
+from columnar_storage import ColumnarReader
+from compression import compression_of, open_segment, rotated_segments
+from data_reader import detect_format, convert_value
+from timeseries_storage import TimeSeriesReader
+
+INDEX_VERSION = 1
+
+
+def index_path(segment_path: Union[str, Path]) -> Path:
+    """Chemin du fichier d'index associé à un segment"""
+    segment_path = Path(segment_path)
+    return segment_path.with_name(segment_path.name + '.idx')
+
+
+def normalize_timestamp(value: Optional[str]) -> Optional[str]:
+    """Normaliser un horodatage au format du cahier des charges (suffixe Z)"""
+    if value is None:
+        return None
+    value = value.replace(' ', 'T')
+    return value if value.endswith('Z') else value + 'Z'
+
+
+class SegmentIndex:
+    """Index creux d'un segment : bornes temporelles et offsets à pas fixe
+
+    Les offsets sont des positions en octets (jsonl, csv) ou des numéros
+    d'enregistrement (columnar). Une entrée globale ('*') est conservée tous
+    les `stride` enregistrements, et une entrée par machine tous les
+    `machine_stride` enregistrements de cette machine.
+    """
+
+    def __init__(self, file_format: str, stride: int = 1000, machine_stride: int = 100):
+        self.format = file_format
+        self.stride = stride
+        self.machine_stride = machine_stride
+        self.first = None
+        self.last = None
+        self.count = 0
+        # Fin du dernier enregistrement indexé (octets ou nombre d'enregistrements)
+        self.size = 0
+        self.entries: Dict[str, List[list]] = {'*': []}
+        self._machine_counts: Dict[str, int] = {}
+
+    def add(self, timestamp: str, machine_id: str, offset: int, end: Optional[int] = None):
+        """Indexer un enregistrement écrit entre offset et end"""
+        self.size = end if end is not None else offset + 1
+        if self.first is None:
+            self.first = timestamp
+        self.last = timestamp
+
+        if self.count % self.stride == 0:
+            self.entries['*'].append([timestamp, offset])
+        self.count += 1
+
+        machine_count = self._machine_counts.get(machine_id, 0)
+        if machine_count % self.machine_stride == 0:
+            self.entries.setdefault(machine_id, []).append([timestamp, offset])
+        self._machine_counts[machine_id] = machine_count + 1
+
+    def add_batch(self, timestamp: str, machine_ids: List[str], offset: int):
+        """Indexer un lot d'enregistrements consécutifs (offsets = numéros d'enregistrement)"""
+        for i, machine_id in enumerate(machine_ids):
+            self.add(timestamp, machine_id, offset + i)
+
+    def start_offset(self, start: Optional[str], machine_id: Optional[str] = None) -> int:
+        """Offset à partir duquel lire pour ne manquer aucun enregistrement >= start"""
+        if start is None:
+            return 0
+
+        best = 0
+        for key in ('*', machine_id):
+            entries = self.entries.get(key) if key else None
+            if not entries:
+                continue
+            # Dernière entrée strictement antérieure à start
+            position = bisect.bisect_left([entry[0] for entry in entries], start) - 1
+            if position >= 0:
+                best = max(best, entries[position][1])
+        return best
+
+    def overlaps(self, start: Optional[str], end: Optional[str]) -> bool:
+        """Le segment peut-il contenir des enregistrements de la plage ?"""
+        if self.first is None:
+            return True
+        if start is not None and self.last < start:
+            return False
+        if end is not None and self.first > end:
+            return False
+        return True
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'version': INDEX_VERSION,
+            'format': self.format,
+            'stride': self.stride,
+            'machine_stride': self.machine_stride,
+            'first': self.first,
+            'last': self.last,
+            'count': self.count,
+            'size': self.size,
+            'machine_counts': self._machine_counts,
+            'entries': self.entries
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'SegmentIndex':
+        index = cls(data['format'], data['stride'], data['machine_stride'])
+        index.first = data['first']
+        index.last = data['last']
+        index.count = data['count']
+        index.size = data.get('size', 0)
+        index._machine_counts = data.get('machine_counts', {})
+        index.entries = data['entries']
+        return index
+
+    def save(self, segment_path: Union[str, Path]):
+        """Écrire l'index de façon atomique à côté du segment"""
+        path = index_path(segment_path)
+        temp_path = path.with_name(path.name + '.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, separators=(',', ':'))
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, segment_path: Union[str, Path]) -> Optional['SegmentIndex']:
+        """Charger l'index d'un segment s'il existe"""
+        path = index_path(segment_path)
+        if not path.exists():
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return cls.from_dict(json.load(f))
+        except (json.JSONDecodeError, KeyError):
+            return None
+
+
+def _iter_with_offsets(segment_path: Path, file_format: str, start_offset: int = 0):
+    """Parcourir un segment à partir d'un offset en produisant (offset, fin, enregistrement)"""
+    if file_format == 'columnar':
+        reader = ColumnarReader(segment_path)
+        chunk = 65536
+        for begin in range(start_offset, len(reader), chunk):
+            for i, record in enumerate(reader.records(begin, begin + chunk)):
+                yield begin + i, begin + i + 1, record
+        return
+
+    with open_segment(segment_path) as f:
+        header = None
+        if file_format == 'csv':
+            header = next(csv.reader([f.readline().decode('utf-8')]))
+            start_offset = max(start_offset, f.tell())
+        f.seek(start_offset)
+
+        offset = start_offset
+        for line in f:
+            line_offset = offset
+            offset += len(line)
+            if not line.endswith(b'\n'):
+                # Dernière ligne incomplète (écriture en cours)
+                break
+            text = line.decode('utf-8').strip()
+            if not text:
+                continue
+            if header is not None:
+                row = next(csv.reader(io.StringIO(text)))
+                yield line_offset, offset, {key: convert_value(value) for key, value in zip(header, row)}
+            else:
+                try:
+                    yield line_offset, offset, json.loads(text)
+                except json.JSONDecodeError:
+                    continue
+
+
+def _segment_size(segment_path: Path, file_format: str) -> int:
+    """Taille d'un segment dans l'unité de ses offsets"""
+    if file_format == 'columnar':
+        return len(ColumnarReader(segment_path))
+    return segment_path.stat().st_size
+
+
+def build_index(segment_path: Union[str, Path], stride: int = 1000,
+                machine_stride: int = 100) -> SegmentIndex:
+    """Construire l'index d'un segment existant par lecture complète"""
+    segment_path = Path(segment_path)
+    file_format = detect_format(segment_path)
+    if file_format == 'json':
+        raise ValueError("Le format json (tableau) ne peut pas être indexé")
+
+    index = SegmentIndex(file_format, stride, machine_stride)
+    for offset, end, record in _iter_with_offsets(segment_path, file_format):
+        index.add(record['timestamp'], record['machine_id'], offset, end)
+    return index
+
+
+def find_segments(base_path: Union[str, Path]) -> List[Path]:
+    """Segments d'une série : fichiers pivotés (compressés ou non) puis fichier courant"""
+    base_path = Path(base_path)
+    segments = rotated_segments(base_path)
+    if base_path.exists():
+        segments.append(base_path)
+    return segments
+
+
+def query(base_path: Union[str, Path], machine_id: Optional[str] = None,
+          start: Optional[str] = None, end: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Enregistrements d'une machine (ou de toutes) dans [start, end], bornes incluses"""
+    start = normalize_timestamp(start)
+    end = normalize_timestamp(end)
+
+    for segment in find_segments(base_path):
+        if segment.stat().st_size == 0:
+            continue
+        file_format = detect_format(segment)
+        if file_format == 'json':
+            continue
+        if file_format == 'timeseries':
+            # Blocs écartés d'après leur machine et leurs horodatages extrêmes (en-têtes)
+            yield from TimeSeriesReader(segment).records(machine_id, start, end)
+            continue
+
+        # Sans index, le segment est lu en entier ; un index partiel (segment
+        # en cours d'écriture) donne l'offset de départ mais pas la borne de fin
+        index = SegmentIndex.load(segment)
+        if index is not None:
+            # Un segment compressé est pivoté, donc complet
+            complete = compression_of(segment) is not None or index.size == _segment_size(segment, file_format)
+            if complete and not index.overlaps(start, end):
+                continue
+            offset = index.start_offset(start, machine_id)
+        else:
+            offset = 0
+
+        for _, _, record in _iter_with_offsets(segment, file_format, offset):
+            timestamp = record['timestamp']
+            if end is not None and timestamp > end:
+                break
+            if start is not None and timestamp < start:
+                continue
+            if machine_id is not None and record['machine_id'] != machine_id:
+                continue
+            yield record
+
+
+def main():
+    """Point d'entrée en ligne de commande"""
+    parser = argparse.ArgumentParser(description="Index temporel des segments de données")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help="Construire l'index de segments existants")
+    build_parser.add_argument('segments', nargs='+')
+    build_parser.add_argument('--stride', type=int, default=1000)
+    build_parser.add_argument('--machine-stride', type=int, default=100)
+
+    query_parser = subparsers.add_parser('query', help="Extraire une plage temporelle")
+    query_parser.add_argument('path', help="Fichier de données courant (ex: data/machine_data.jsonl)")
+    query_parser.add_argument('--machine', help="Identifiant machine (ex: AUTO-07)")
+    query_parser.add_argument('--start', help="Début inclus (ex: 2025-06-28T10:00:00Z)")
+    query_parser.add_argument('--end', help="Fin incluse (ex: 2025-06-28T10:05:00Z)")
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        for segment in args.segments:
+            index = build_index(segment, args.stride, args.machine_stride)
+            index.save(segment)
+            print(f"✅ {segment}: {index.count} enregistrements indexés ({index.first} → {index.last})")
+    else:
+        for record in query(args.path, args.machine, args.start, args.end):
+            print(json.dumps(record, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
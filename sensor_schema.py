@@ -0,0 +1,202 @@
+"""
+Schéma des capteurs du Simulateur Usine 4.0
+La section sensors de config.yaml est compilée au démarrage en tableaux
+(valeurs initiales, bornes, variations, arrondis) : tous les canaux d'une ou
+plusieurs machines sont avancés en une seule opération vectorisée
+"""
+
+from typing import Dict, Any, List, Optional
+import logging
+
+import numpy as np
+
+from random_streams import STATUS_DRAWS
+from record import Record
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_TYPES = ('float', 'int')
+
+# Champs fixes de chaque enregistrement (hors canaux)
+RESERVED_FIELDS = ('timestamp', 'machine_id', 'uptime', 'status')
+
+# Capteurs du cahier des charges, présents sauf "enabled: false"
+DEFAULT_SENSORS = {
+    'temperature': {'initial': 25.0, 'min': 15.0, 'max': 85.0, 'variation': 2.0,
+                    'label': 'Temp', 'unit': '°C'},
+    'humidity': {'initial': 50.0, 'min': 30.0, 'max': 90.0, 'variation': 5.0,
+                 'label': 'Humidité', 'unit': '%'},
+    'rpm': {'initial': 1450, 'min': 0, 'max': 3000, 'variation': 50,
+            'type': 'int', 'label': 'RPM'},
+    'vibration': {'initial': 1.0, 'min': 0.5, 'max': 5.0, 'variation': 0.2,
+                  'label': 'Vibration', 'unit': 'mm/s'},
+    'energy': {'initial': 2.5, 'min': 0.5, 'max': 15.0, 'variation': 0.5,
+               'output': 'energy_kwh', 'label': 'Énergie', 'unit': 'kWh'},
+}
+
+
+class Channel:
+    """Canal simulé : marche aléatoire bornée, arrondie à la publication"""
+
+    def __init__(self, name: str, config: Dict[str, Any]):
+        self.name = name
+        self.output = config.get('output', name)
+        self.type = config.get('type', 'float')
+        if self.type not in CHANNEL_TYPES:
+            raise ValueError(f"Type de canal inconnu pour {name}: {self.type}")
+        self.initial = float(config.get('initial', 0.0))
+        # Sans bornes, la marche aléatoire n'est pas limitée
+        self.min = float(config.get('min', float('-inf')))
+        self.max = float(config.get('max', float('inf')))
+        if self.min > self.max:
+            raise ValueError(f"Bornes invalides pour {name}: min {self.min} > max {self.max}")
+        self.variation = float(config.get('variation', 0.0))
+        # Décimales publiées (canaux float) ; les canaux int sont tronqués
+        self.decimals = int(config.get('decimals', 1))
+        self.label = config.get('label', self.output)
+        self.unit = config.get('unit', '')
+
+    def format(self, value) -> str:
+        """Valeur avec ses décimales (affichage)"""
+        return f"{value:.{self.decimals}f}" if self.type == 'float' else str(value)
+
+
+def _expand(name: str, config: Dict[str, Any]) -> List[Channel]:
+    """Un canal, ou count canaux numérotés (name_001, name_002, ...)"""
+    count = config.get('count')
+    if count is None:
+        return [Channel(name, config)]
+    width = max(3, len(str(count)))
+    channels = []
+    for i in range(1, int(count) + 1):
+        suffix = f"_{i:0{width}d}"
+        channel_config = dict(config, output=config.get('output', name) + suffix)
+        channel_config.setdefault('label', channel_config['output'])
+        channels.append(Channel(name + suffix, channel_config))
+    return channels
+
+
+class SensorSchema:
+    """Schéma compilé : un tableau par paramètre, une valeur par canal
+
+    L'état d'une flotte est rangé canal par canal, (canaux, machines) : chaque
+    canal est contigu et les paramètres se diffusent sur de longues lignes.
+    """
+
+    def __init__(self, channels: List[Channel]):
+        if not channels:
+            raise ValueError("Aucun canal de capteur configuré")
+        outputs = [channel.output for channel in channels]
+        duplicates = {output for output in outputs if outputs.count(output) > 1}
+        reserved = set(outputs) & set(RESERVED_FIELDS)
+        if duplicates or reserved:
+            raise ValueError(f"Noms de sortie invalides: {sorted(duplicates | reserved)}")
+
+        self.channels = channels
+        self.outputs = tuple(outputs)
+        # Ordre des champs des enregistrements (en-têtes CSV, affichage)
+        self.fields = ('timestamp', 'machine_id') + self.outputs + ('uptime', 'status')
+
+        # Paramètres en colonne (canaux, 1), diffusés sur l'état (canaux, machines)
+        self.initial = np.array([[channel.initial] for channel in channels])
+        self.minimums = np.array([[channel.min] for channel in channels])
+        self.maximums = np.array([[channel.max] for channel in channels])
+        self.variations = np.array([[channel.variation] for channel in channels])
+        # Arrondi de tous les canaux en une opération : rint(x * 10^d) / 10^d,
+        # identique à np.round(x, d) ; les canaux int sont ensuite tronqués
+        self._scales = np.array([[10.0 ** channel.decimals] for channel in channels])
+        self._int_channels = [i for i, channel in enumerate(channels) if channel.type == 'int']
+
+        # Tirages par pas et par machine : un par canal, puis les tirages du statut
+        self.draws_per_step = len(channels) + STATUS_DRAWS
+        self.status_change = len(channels)
+        self.status_offset = len(channels) + 1
+
+        self._build_records = self._compile_records()
+
+    @classmethod
+    def from_config(cls, sensors_config: Optional[Dict[str, Any]]) -> 'SensorSchema':
+        """Compiler la section sensors (capteurs par défaut complétés ou désactivés)"""
+        sensors_config = sensors_config or {}
+        channels = []
+        for name in list(DEFAULT_SENSORS) + [name for name in sensors_config if name not in DEFAULT_SENSORS]:
+            config = dict(DEFAULT_SENSORS.get(name, {}))
+            config.update(sensors_config.get(name) or {})
+            if config.get('enabled', True):
+                channels.extend(_expand(name, config))
+        schema = cls(channels)
+        logger.debug(f"Schéma capteurs compilé: {len(channels)} canaux")
+        return schema
+
+    def __len__(self) -> int:
+        return len(self.channels)
+
+    def channel(self, output: str) -> Channel:
+        """Canal d'un champ de sortie"""
+        return self.channels[self.outputs.index(output)]
+
+    def initial_state(self, machines: int) -> np.ndarray:
+        """État initial d'une flotte : (canaux, machines)"""
+        return np.repeat(self.initial, machines, axis=1)
+
+    def single_state(self) -> np.ndarray:
+        """État initial d'une machine : (canaux, 1)"""
+        return self.initial.copy()
+
+    def advance(self, current: np.ndarray, draws: np.ndarray):
+        """Marche aléatoire bornée de tous les canaux, en place
+
+        current : (canaux, machines) ; draws : (machines, tirages), au moins un
+        tirage uniforme [0, 1) par canal (tirages de la machine contigus).
+        """
+        variation = np.multiply(draws[:, :len(self.channels)].T, 2.0, order='C')
+        variation -= 1.0
+        variation *= self.variations
+        variation += current
+        np.minimum(variation, self.maximums, out=current)
+        np.maximum(current, self.minimums, out=current)
+
+    def _round(self, current: np.ndarray) -> np.ndarray:
+        scaled = current * self._scales
+        np.rint(scaled, out=scaled)
+        scaled /= self._scales
+        return scaled
+
+    def columns(self, current: np.ndarray) -> Dict[str, np.ndarray]:
+        """Colonnes typées d'un état (canaux, machines), par champ de sortie"""
+        rounded = self._round(current)
+        columns = dict(zip(self.outputs, rounded))
+        for i in self._int_channels:
+            columns[self.outputs[i]] = current[i].astype(np.int64)
+        return columns
+
+    def values(self, current: np.ndarray) -> List[Any]:
+        """Valeurs publiées d'une machine (état (canaux, 1)), dans l'ordre des canaux"""
+        values = self._round(current).ravel().tolist()
+        for i in self._int_channels:
+            values[i] = int(current[i, 0])
+        return values
+
+    def _compile_records(self):
+        """Générer la construction des enregistrements (dict littéral, sans zip par ligne)"""
+        count = len(self.channels)
+        names = ', '.join(f"v{i}" for i in range(count))
+        items = ', '.join(f"{output!r}: v{i}" for i, output in enumerate(self.outputs))
+        source = (
+            f"def build(timestamp, machine_ids, columns, uptimes, statuses):\n"
+            f"    return [Record({{'timestamp': timestamp, 'machine_id': machine_id, {items}, "
+            f"'uptime': uptime, 'status': status}})\n"
+            f"            for machine_id, {names}, uptime, status in zip(machine_ids, *columns, uptimes, statuses)]\n"
+        )
+        namespace = {}
+        exec(compile(source, f"<schéma capteurs {count} canaux>", 'exec'), {'Record': Record}, namespace)
+        return namespace['build']
+
+    def records(self, timestamp: str, machine_ids: List[str], columns: List[List[Any]],
+                uptimes: List[int], statuses: List[str]) -> List[Record]:
+        """Enregistrements au format de generate_data() (une liste de valeurs par canal)"""
+        return self._build_records(timestamp, machine_ids, columns, uptimes, statuses)
+
+    def record(self, timestamp: str, machine_id: str, values: List[Any], uptime: int, status: str) -> Record:
+        """Enregistrement d'une machine (values dans l'ordre des canaux)"""
+        return Record(zip(self.fields, (timestamp, machine_id, *values, uptime, status)))
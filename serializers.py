@@ -0,0 +1,284 @@
+"""
+Encodages des charges utiles des sorties réseau (HTTP, MQTT)
+JSON, MessagePack et CBOR (si les paquets msgpack / cbor2 sont installés),
+et un format binaire compact à disposition fixe dérivée du schéma des capteurs
+"""
+
+import json
+import struct
+import zlib
+from typing import Dict, Any, Iterable, List, Optional
+import logging
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+from columnar_storage import decode_timestamp, encode_timestamp
+from fleet_simulator import STATUSES
+from record import Record, encode_json
+from sensor_schema import SensorSchema
+
+logger = logging.getLogger(__name__)
+
+# Format packed : signature, version, identifiant du schéma (CRC32 de la disposition)
+PACKED_MAGIC = b'U4'
+PACKED_VERSION = 1
+PACKED_HEADER = struct.Struct('<2sBI')
+# Lots binaires : chaque charge utile précédée de sa longueur
+FRAME_LENGTH = struct.Struct('<I')
+
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+
+
+class Serializer:
+    """Encodage d'un enregistrement en charge utile (et décodage inverse)"""
+
+    name = None
+    content_type = 'application/octet-stream'
+    # Charge utile binaire (pouvant contenir des fins de ligne)
+    binary = True
+
+    @property
+    def cache_key(self) -> str:
+        """Clé du cache d'encodage partagé par les sorties (Record)"""
+        return self.name
+
+    def encode(self, data: Dict[str, Any]) -> bytes:
+        """Encoder un enregistrement (calculé une seule fois par Record)"""
+        if isinstance(data, Record):
+            return data.encoded(self.cache_key, self._encode)
+        return self._encode(data)
+
+    def _encode(self, data: Dict[str, Any]) -> bytes:
+        raise NotImplementedError
+
+    def decode(self, payload: bytes) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def encode_batch(self, payloads: List[bytes]) -> bytes:
+        """Corps d'un lot : charges utiles préfixées par leur longueur"""
+        return b''.join(FRAME_LENGTH.pack(len(payload)) + payload for payload in payloads)
+
+    def decode_batch(self, body: bytes) -> List[Dict[str, Any]]:
+        records = []
+        position = 0
+        while position < len(body):
+            length = FRAME_LENGTH.unpack_from(body, position)[0]
+            position += FRAME_LENGTH.size
+            records.append(self.decode(body[position:position + length]))
+            position += length
+        return records
+
+
+class JsonSerializer(Serializer):
+    """JSON compact UTF-8 (format historique)"""
+
+    name = 'json'
+    content_type = 'application/json'
+    binary = False
+
+    def encode(self, data: Dict[str, Any]) -> bytes:
+        return encode_json(data)
+
+    def decode(self, payload: bytes) -> Dict[str, Any]:
+        return json.loads(payload)
+
+    def encode_batch(self, payloads: List[bytes]) -> bytes:
+        return b'[' + b','.join(payloads) + b']'
+
+    def decode_batch(self, body: bytes) -> List[Dict[str, Any]]:
+        return json.loads(body)
+
+
+class MsgpackSerializer(Serializer):
+    """MessagePack (paquet msgpack)"""
+
+    name = 'msgpack'
+    content_type = 'application/msgpack'
+
+    def _encode(self, data: Dict[str, Any]) -> bytes:
+        return msgpack.packb(data)
+
+    def decode(self, payload: bytes) -> Dict[str, Any]:
+        return msgpack.unpackb(payload)
+
+    def encode_batch(self, payloads: List[bytes]) -> bytes:
+        # Tableau MessagePack (array 32) des enregistrements déjà encodés
+        return b'\xdd' + struct.pack('>I', len(payloads)) + b''.join(payloads)
+
+    def decode_batch(self, body: bytes) -> List[Dict[str, Any]]:
+        return msgpack.unpackb(body)
+
+
+class CborSerializer(Serializer):
+    """CBOR (paquet cbor2)"""
+
+    name = 'cbor'
+    content_type = 'application/cbor'
+
+    def _encode(self, data: Dict[str, Any]) -> bytes:
+        return cbor2.dumps(dict(data))
+
+    def decode(self, payload: bytes) -> Dict[str, Any]:
+        return cbor2.loads(payload)
+
+    def encode_batch(self, payloads: List[bytes]) -> bytes:
+        # Tableau CBOR de longueur indéfinie des enregistrements déjà encodés
+        return b'\x9f' + b''.join(payloads) + b'\xff'
+
+    def decode_batch(self, body: bytes) -> List[Dict[str, Any]]:
+        return cbor2.loads(body)
+
+
+def _channel_format(channel) -> str:
+    """Format struct d'un canal : int32 si la valeur mise à l'échelle y tient toujours"""
+    if channel.type == 'float':
+        limit = max(abs(channel.min), abs(channel.max)) * 10.0 ** channel.decimals
+        if limit < 2 ** 31:
+            return 'i'
+    return 'q'
+
+
+class PackedSerializer(Serializer):
+    """Binaire compact à disposition fixe, sans noms de champs
+
+    En-tête (signature, version, identifiant du schéma) puis horodatage
+    (secondes epoch, 32 bits), identifiant machine (longueur sur un octet),
+    canaux dans l'ordre du schéma (float : entier mis à l'échelle de ses
+    décimales, donc exact, sur 32 bits si ses bornes le permettent ; int :
+    64 bits), uptime et code de statut.
+    Le décodeur doit connaître le même schéma de capteurs.
+    """
+
+    name = 'packed'
+
+    def __init__(self, schema: Optional[SensorSchema] = None):
+        self.schema = schema or SensorSchema.from_config(None)
+        layout = [(channel.output, channel.type, channel.decimals) for channel in self.schema.channels]
+        self.schema_id = zlib.crc32(json.dumps([PACKED_VERSION, layout]).encode('utf-8'))
+        self._header = PACKED_HEADER.pack(PACKED_MAGIC, PACKED_VERSION, self.schema_id)
+        self._prefix = struct.Struct('<IB')
+        self._values = struct.Struct('<' + ''.join(map(_channel_format, self.schema.channels)) + 'IB')
+        # (champ, facteur d'échelle) ; facteur None pour les canaux int
+        self._channels = [(channel.output, None if channel.type == 'int' else 10.0 ** channel.decimals)
+                          for channel in self.schema.channels]
+        # Horodatage identique pour toutes les machines d'un tick : dernière conversion gardée
+        self._timestamp = (None, 0)
+        self._epoch = (None, '')
+
+    @property
+    def cache_key(self) -> str:
+        return f"packed:{self.schema_id}"
+
+    def _encode(self, data: Dict[str, Any]) -> bytes:
+        timestamp = data['timestamp']
+        if self._timestamp[0] != timestamp:
+            self._timestamp = (timestamp, encode_timestamp(timestamp))
+        machine_id = data['machine_id'].encode('utf-8')
+        values = [data[output] if scale is None else round(data[output] * scale)
+                  for output, scale in self._channels]
+        return b''.join((
+            self._header,
+            self._prefix.pack(self._timestamp[1], len(machine_id)),
+            machine_id,
+            self._values.pack(*values, int(data['uptime']), STATUS_CODES[data['status']])
+        ))
+
+    def decode(self, payload: bytes) -> Dict[str, Any]:
+        magic, version, schema_id = PACKED_HEADER.unpack_from(payload)
+        if magic != PACKED_MAGIC or version != PACKED_VERSION:
+            raise ValueError("Charge utile packed invalide (signature ou version)")
+        if schema_id != self.schema_id:
+            raise ValueError(f"Schéma packed inconnu: {schema_id:08x} (attendu {self.schema_id:08x})")
+
+        position = PACKED_HEADER.size
+        seconds, length = self._prefix.unpack_from(payload, position)
+        position += self._prefix.size
+        machine_id = payload[position:position + length].decode('utf-8')
+        *values, uptime, status = self._values.unpack_from(payload, position + length)
+
+        if self._epoch[0] != seconds:
+            self._epoch = (seconds, decode_timestamp(seconds))
+        channels = [value if scale is None else value / scale
+                    for value, (_, scale) in zip(values, self._channels)]
+        return self.schema.record(self._epoch[1], machine_id, channels, uptime, STATUSES[status])
+
+
+SERIALIZERS = {
+    'json': JsonSerializer,
+    'msgpack': MsgpackSerializer,
+    'cbor': CborSerializer,
+    'packed': PackedSerializer,
+}
+
+
+def available_serializers() -> List[str]:
+    """Encodages utilisables dans cet environnement"""
+    missing = {'msgpack': msgpack is None, 'cbor': cbor2 is None}
+    return [name for name in SERIALIZERS if not missing.get(name)]
+
+
+def create_serializer(name: str = 'json', schema: Optional[SensorSchema] = None) -> Serializer:
+    """Encodage d'une sortie (section encoding) ; json si le paquet requis est absent"""
+    name = (name or 'json').lower()
+    if name not in SERIALIZERS:
+        raise ValueError(f"Encodage inconnu: {name}")
+    if name not in available_serializers():
+        logger.warning(f"Paquet requis pour l'encodage {name} non installé, encodage json utilisé")
+        name = 'json'
+    if name == 'packed':
+        return PackedSerializer(schema)
+    return SERIALIZERS[name]()
+
+
+def detect_encoding(payload: bytes) -> str:
+    """Encodage d'une charge utile d'après ses premiers octets"""
+    if payload[:2] == PACKED_MAGIC:
+        return 'packed'
+    first = payload[0] if payload else 0
+    # Tableau/objet MessagePack (fixmap, map 16/32, fixarray, array 16/32)
+    if 0x80 <= first <= 0x9f or first in (0xdc, 0xdd, 0xde, 0xdf):
+        return 'msgpack'
+    # Objet ou tableau CBOR (longueur définie ou indéfinie)
+    if 0xa0 <= first <= 0xbb or first == 0xbf or first == 0x9f:
+        return 'cbor'
+    return 'json'
+
+
+class PayloadDecoder:
+    """Décodage de charges utiles d'encodage quelconque (monitoring, tests)
+
+    Les charges packed sont décodées avec le schéma correspondant à leur
+    identifiant parmi les schémas connus.
+    """
+
+    def __init__(self, schemas: Iterable[SensorSchema] = ()):
+        self._serializers: Dict[str, Serializer] = {}
+        self._packed: Dict[int, PackedSerializer] = {}
+        for schema in schemas:
+            self.add_schema(schema)
+
+    def add_schema(self, schema: SensorSchema):
+        serializer = PackedSerializer(schema)
+        self._packed[serializer.schema_id] = serializer
+
+    def decode(self, payload: bytes) -> Dict[str, Any]:
+        """Décoder un enregistrement (ValueError si encodage ou schéma inconnu)"""
+        encoding = detect_encoding(payload)
+        if encoding == 'packed':
+            schema_id = PACKED_HEADER.unpack_from(payload)[2]
+            if schema_id not in self._packed:
+                raise ValueError(f"Schéma packed inconnu: {schema_id:08x}")
+            return self._packed[schema_id].decode(payload)
+        if encoding not in available_serializers():
+            raise ValueError(f"Paquet requis pour décoder {encoding} non installé")
+        if encoding not in self._serializers:
+            self._serializers[encoding] = SERIALIZERS[encoding]()
+        return self._serializers[encoding].decode(payload)
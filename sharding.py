@@ -0,0 +1,199 @@
+"""
+Exécution multi-processus du Simulateur Usine 4.0
+La flotte est répartie en shards, un processus (générateur + sorties) par shard
+"""
+
+import asyncio
+import copy
+import multiprocessing
+import queue
+import signal
+import time
+from pathlib import Path
+from typing import Dict, Any, List
+import logging
+
+from fleet_simulator import build_machine_ids
+from random_streams import resolve_seed
+
+logger = logging.getLogger(__name__)
+
+
+def partition(machine_ids: List[str], shards: int) -> List[List[str]]:
+    """Découper la flotte en shards contigus de tailles équilibrées"""
+    count = len(machine_ids)
+    return [
+        machine_ids[i * count // shards:(i + 1) * count // shards]
+        for i in range(shards)
+    ]
+
+
+def shard_config(config: Dict[str, Any], index: int) -> Dict[str, Any]:
+    """Adapter la configuration à un shard (fichiers et débordements distincts)"""
+    config = copy.deepcopy(config)
+    simulation = config.setdefault('simulation', {})
+    simulation['processes'] = 1
+
+    file_config = config.get('outputs', {}).get('file')
+    if file_config:
+        path = Path(file_config.get('path', 'data/machine_data.json'))
+        file_config['path'] = str(path.with_name(f"{path.stem}_shard{index:02d}{path.suffix}"))
+
+    queue_configs = [simulation.get('queue') or {}]
+    queue_configs += [(output or {}).get('queue') or {} for output in config.get('outputs', {}).values()]
+    for queue_config in queue_configs:
+        if 'spill_dir' in queue_config:
+            queue_config['spill_dir'] = str(Path(queue_config['spill_dir']) / f"shard{index:02d}")
+    simulation.setdefault('queue', {}).setdefault('spill_dir', f"data/spill/shard{index:02d}")
+
+    # Une outbox par processus (curseur et segments non partagés)
+    for output in config.get('outputs', {}).values():
+        outbox_config = (output or {}).get('outbox')
+        if outbox_config and outbox_config.get('enabled'):
+            outbox_config['dir'] = str(Path(outbox_config.get('dir', 'data/outbox')) / f"shard{index:02d}")
+
+    # Identifiant MQTT unique par processus (un broker déconnecte les doublons)
+    mqtt_config = config.get('outputs', {}).get('mqtt')
+    if mqtt_config and mqtt_config.get('client_id'):
+        mqtt_config['client_id'] = f"{mqtt_config['client_id']}-shard{index:02d}"
+
+    # Un point d'accès métriques par processus, sur des ports consécutifs
+    metrics_config = config.get('metrics')
+    if metrics_config and metrics_config.get('enabled') and metrics_config.get('port'):
+        metrics_config['port'] = metrics_config['port'] + index
+
+    return config
+
+
+def _run_shard(config: Dict[str, Any], index: int, machine_ids: List[str], stop_event, results):
+    """Point d'entrée d'un processus de shard"""
+    from simulateur import SimulateurUsine
+
+    simulateur = SimulateurUsine(config=config, machine_ids=machine_ids)
+    # Le processus parent coordonne l'arrêt via stop_event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    async def watch_stop():
+        while True:
+            if stop_event.is_set():
+                simulateur.running = False
+            await asyncio.sleep(0.1)
+
+    async def run():
+        watcher = asyncio.create_task(watch_stop())
+        try:
+            await simulateur.run()
+        finally:
+            watcher.cancel()
+
+    start = time.monotonic()
+    asyncio.run(run())
+
+    results.put({
+        'shard': index,
+        'machines': len(machine_ids),
+        'ticks': simulateur.stats['ticks'],
+        'records': simulateur.stats['records'],
+        'elapsed': time.monotonic() - start,
+        'outputs': {q.name: dict(q.stats) for q in simulateur.queues}
+    })
+
+
+class ShardedRunner:
+    """Répartit une flotte entre plusieurs processus et agrège leurs statistiques"""
+
+    def __init__(self, config: Dict[str, Any], processes: int):
+        # Graine commune à tous les shards (tirée une seule fois si absente)
+        config = copy.deepcopy(config)
+        simulation = config.setdefault('simulation', {})
+        simulation['seed'] = resolve_seed(simulation)
+        self.config = config
+        self.processes = processes
+        self.shutdown_timeout = config.get('simulation', {}).get('shutdown_timeout', 30)
+        self.machine_ids = build_machine_ids(config.get('fleet', {}) or {})
+        self.stats = {}
+
+    def _aggregate(self, shard_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Agréger les statistiques des shards"""
+        stats = {
+            'shards': len(shard_results),
+            'machines': sum(r['machines'] for r in shard_results),
+            'ticks': max((r['ticks'] for r in shard_results), default=0),
+            'records': sum(r['records'] for r in shard_results),
+            'elapsed': max((r['elapsed'] for r in shard_results), default=0.0),
+            'outputs': {}
+        }
+
+        for result in shard_results:
+            for name, output_stats in result['outputs'].items():
+                total = stats['outputs'].setdefault(name, {})
+                for key, value in output_stats.items():
+                    if key.startswith('max_'):
+                        total[key] = max(total.get(key, 0), value)
+                    elif not key.startswith('last_'):
+                        total[key] = total.get(key, 0) + value
+
+        if stats['elapsed'] > 0:
+            stats['records_per_second'] = stats['records'] / stats['elapsed']
+        return stats
+
+    def run(self) -> Dict[str, Any]:
+        """Lancer les shards, attendre leur fin et retourner les statistiques agrégées"""
+        shards = partition(self.machine_ids, min(self.processes, len(self.machine_ids)))
+        context = multiprocessing.get_context('spawn')
+        stop_event = context.Event()
+        results = context.Queue()
+
+        def request_stop(signum, frame):
+            logger.info(f"Signal {signum} reçu, arrêt des {len(shards)} shards...")
+            stop_event.set()
+
+        previous_handlers = {
+            signum: signal.signal(signum, request_stop)
+            for signum in (signal.SIGINT, signal.SIGTERM)
+        }
+
+        logger.info(f"🏭 Démarrage de {len(shards)} shards ({len(self.machine_ids)} machines)")
+        workers = []
+        for index, machine_ids in enumerate(shards):
+            worker = context.Process(
+                target=_run_shard,
+                args=(shard_config(self.config, index), index, machine_ids, stop_event, results),
+                name=f"shard-{index:02d}"
+            )
+            worker.start()
+            workers.append(worker)
+
+        shard_results = []
+        deadline = None
+        try:
+            while len(shard_results) < len(workers):
+                try:
+                    shard_results.append(results.get(timeout=0.5))
+                except queue.Empty:
+                    if stop_event.is_set() and deadline is None:
+                        deadline = time.monotonic() + self.shutdown_timeout
+                    if not any(worker.is_alive() for worker in workers):
+                        break
+                    if deadline is not None and time.monotonic() > deadline:
+                        logger.warning("Délai d'arrêt dépassé, shards restants interrompus")
+                        break
+        finally:
+            for worker in workers:
+                worker.join(timeout=1)
+                if worker.is_alive():
+                    worker.terminate()
+                    worker.join()
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
+
+        self.stats = self._aggregate(shard_results)
+        logger.info(
+            f"Shards terminés: {self.stats['shards']}/{len(workers)}, "
+            f"{self.stats['records']} enregistrements "
+            f"({self.stats.get('records_per_second', 0):.0f}/s)"
+        )
+        for name, output_stats in self.stats['outputs'].items():
+            logger.info(f"File {name} (agrégée): {output_stats}")
+
+        return self.stats
@@ -9,15 +9,22 @@ import yaml
 import logging
 import signal
 import sys
+import time
 from datetime import datetime
 from pathlib import Path
 
 
 from data_simulator import DataSimulator
+from fleet_simulator import FleetSimulator, machine_id_width
+from random_streams import resolve_seed
+from scheduler import TickScheduler
+from metrics import MetricsRegistry, MetricsServer
 from outputs.console_output import ConsoleOutput
 from outputs.http_output import HTTPOutput
 from outputs.mqtt_output import MQTTOutput
 from outputs.file_output import FileOutput
+from outputs.output_queue import OutputQueue
+from outputs.resilience import STATE_VALUES
 
 # Configuration du logging
 logging.basicConfig(
@@ -29,13 +36,39 @@ logger = logging.getLogger(__name__)
 class SimulateurUsine:
     """Simulateur principal pour Usine 4.0"""
     
-    def __init__(self, config_path: str = "config.yaml"):
+    def __init__(self, config_path: str = "config.yaml", config: dict = None, machine_ids: list = None):
         self.config_path = config_path
-        self.config = self._load_config()
-        self.data_simulator = DataSimulator(self.config)
+        self.config = config if config is not None else self._load_config()
+        self.data_simulator = None
+        self.fleet_simulator = None
+        
+        # Processus parent multi-processus : la génération a lieu dans les shards
+        simulation = self.config.get('simulation', {}) or {}
+        self.sharded = (machine_ids is None and simulation.get('processes', 1) > 1
+                        and not (self.config.get('loadgen', {}) or {}).get('enabled', False))
+        if not self.sharded:
+            # Graine tirée (et journalisée) une seule fois pour le simulateur utilisé
+            seed = resolve_seed(simulation)
+            # Mode flotte : moteur vectorisé pour plusieurs machines
+            # (machine_ids restreint la flotte à un shard en mode multi-processus)
+            if machine_ids is not None or self.config.get('fleet', {}).get('machines', 0) > 0:
+                self.fleet_simulator = FleetSimulator(self.config, machine_ids, seed=seed)
+            else:
+                self.data_simulator = DataSimulator(self.config, seed=seed)
+        
+        # Compteurs d'exécution
+        self.stats = {'ticks': 0, 'records': 0}
         self.outputs = []
+        self.queues = []
+        self.scheduler = None
+        self.metrics_server = None
         self.running = False
         
+        # Métriques (exposition Prometheus et ligne de statistiques périodique)
+        self.metrics = MetricsRegistry()
+        self._declare_metrics()
+        self.metrics.add_collector(self._collect_metrics)
+        
         # Initialiser les modules de sortie
         self._initialize_outputs()
         
@@ -57,28 +90,165 @@ class SimulateurUsine:
             logger.error(f"Erreur dans le fichier YAML: {e}")
             sys.exit(1)
     
+    def _output_config(self, name: str) -> dict:
+        """Configuration d'un output avec le réglage global d'affichage et le schéma des capteurs"""
+        outputs_config = self.config.get('outputs', {})
+        console_config = outputs_config.get('console', {})
+        dashboard = console_config.get('enabled', False) and console_config.get('format') == 'dashboard'
+        
+        # simulation.verbose (par défaut désactivé avec le tableau de bord console)
+        # s'applique aux outputs qui ne fixent pas leur propre "verbose"
+        config = dict(outputs_config[name])
+        config.setdefault('verbose', self.config.get('simulation', {}).get('verbose', not dashboard))
+        # Colonnes (CSV, columnaire, console) dérivées de la section sensors
+        config.setdefault('sensors', self.config.get('sensors'))
+        # Largeur de la colonne machine_id des segments columnaires
+        config.setdefault('machine_id_width', machine_id_width(self.config))
+        return config
+    
     def _initialize_outputs(self):
         """Initialiser les modules de sortie selon la configuration"""
         outputs_config = self.config.get('outputs', {})
         
         # Console output
         if outputs_config.get('console', {}).get('enabled', False):
-            self.outputs.append(ConsoleOutput(outputs_config['console']))
+            self.outputs.append(ConsoleOutput(self._output_config('console')))
         
         # HTTP output
         if outputs_config.get('http', {}).get('enabled', False):
-            self.outputs.append(HTTPOutput(outputs_config['http']))
+            self.outputs.append(HTTPOutput(self._output_config('http')))
         
         # MQTT output
         if outputs_config.get('mqtt', {}).get('enabled', False):
-            self.outputs.append(MQTTOutput(outputs_config['mqtt']))
+            self.outputs.append(MQTTOutput(self._output_config('mqtt')))
         
         # File output
         if outputs_config.get('file', {}).get('enabled', False):
-            self.outputs.append(FileOutput(outputs_config['file']))
+            self.outputs.append(FileOutput(self._output_config('file')))
         
         logger.info(f"Initialisé {len(self.outputs)} modules de sortie")
     
+    async def _start_queues(self):
+        """Créer et démarrer les files des outputs"""
+        default_queue_config = self.config.get('simulation', {}).get('queue', {}) or {}
+        
+        self.queues = []
+        for output in self.outputs:
+            # Configuration par défaut surchargée par la section "queue" de l'output
+            queue_config = dict(default_queue_config)
+            queue_config.update(output.config.get('queue', {}) or {})
+            
+            queue = OutputQueue(output, queue_config)
+            await queue.start()
+            self.queues.append(queue)
+    
+    def _declare_metrics(self):
+        """Déclarer les métriques du simulateur"""
+        metrics = self.metrics
+        metrics.counter('ticks_total', "Ticks exécutés")
+        metrics.counter('records_total', "Enregistrements générés")
+        metrics.counter('ticks_late_total', "Ticks au-delà de la tolérance de retard")
+        metrics.counter('ticks_missed_total', "Ticks sautés (retard supérieur à un intervalle)")
+        metrics.gauge('tick_jitter_seconds', "Gigue moyenne des ticks")
+        metrics.histogram('tick_seconds', "Durée d'un tick (génération et publication)")
+        metrics.histogram('generation_seconds', "Durée de génération d'un tick")
+        metrics.histogram('output_send_seconds', "Durée d'envoi d'un élément de file vers l'output")
+        metrics.histogram('output_request_seconds', "Durée des requêtes réseau de l'output")
+        metrics.counter('output_records_sent_total', "Enregistrements envoyés par l'output")
+        metrics.counter('output_records_failed_total', "Enregistrements en échec dans l'output")
+        metrics.counter('output_bytes_sent_total', "Octets envoyés ou écrits par l'output")
+        metrics.gauge('output_circuit_state', "État du disjoncteur (0 fermé, 1 semi-ouvert, 2 ouvert)")
+        metrics.counter('output_circuit_opened_total', "Ouvertures du disjoncteur de l'output")
+        metrics.counter('output_rejected_total', "Envois refusés immédiatement par le disjoncteur")
+        metrics.gauge('output_timeout_seconds', "Délai d'attente adaptatif courant de l'output")
+        metrics.counter('output_reconnects_total', "Reconnexions réussies de l'output")
+        metrics.gauge('outbox_backlog_records', "Enregistrements en attente dans l'outbox")
+        metrics.gauge('outbox_backlog_bytes', "Octets en attente dans l'outbox")
+        metrics.gauge('outbox_drain_rate', "Débit du dernier renvoi de l'outbox (enregistrements/s)")
+        metrics.counter('outbox_appended_total', "Enregistrements conservés dans l'outbox")
+        metrics.counter('outbox_drained_total', "Enregistrements renvoyés depuis l'outbox")
+        metrics.counter('outbox_dropped_total', "Enregistrements abandonnés (limite disque de l'outbox)")
+        metrics.gauge('queue_depth', "Éléments en attente dans la file de l'output")
+        metrics.gauge('queue_lag_seconds', "Attente en file du dernier élément envoyé")
+        for key in ('published', 'delivered', 'dropped', 'spilled', 'spill_corrupt', 'errors'):
+            metrics.counter(f'queue_{key}_total', f"Éléments de file ({key})")
+    
+    def _collect_metrics(self):
+        """Rafraîchir les métriques à partir des compteurs des composants"""
+        metrics = self.metrics
+        metrics.set('ticks_total', self.stats['ticks'])
+        metrics.set('records_total', self.stats['records'])
+        
+        if self.scheduler is not None:
+            metrics.set('ticks_late_total', self.scheduler.stats['late'])
+            metrics.set('ticks_missed_total', self.scheduler.stats['missed'])
+            metrics.set('tick_jitter_seconds', self.scheduler.stats['jitter_mean'])
+        
+        for queue in self.queues:
+            metrics.attach('output_send_seconds', queue.latency, output=queue.name)
+            metrics.set('queue_depth', queue.depth, output=queue.name)
+            metrics.set('queue_lag_seconds', queue.stats['last_lag'], output=queue.name)
+            for key in ('published', 'delivered', 'dropped', 'spilled', 'spill_corrupt', 'errors'):
+                metrics.set(f'queue_{key}_total', queue.stats[key], output=queue.name)
+        
+        for output in self.outputs:
+            name = output.__class__.__name__
+            metrics.set('output_records_sent_total', output.stats['records_sent'], output=name)
+            metrics.set('output_records_failed_total', output.stats['records_failed'], output=name)
+            metrics.set('output_bytes_sent_total', output.stats['bytes_sent'], output=name)
+            request_latency = getattr(output, 'request_latency', None)
+            if request_latency is not None:
+                metrics.attach('output_request_seconds', request_latency, output=name)
+            breaker = getattr(output, 'breaker', None)
+            if breaker is not None:
+                metrics.set('output_circuit_state', STATE_VALUES[breaker.state], output=name)
+                metrics.set('output_circuit_opened_total', breaker.stats['opened'], output=name)
+                metrics.set('output_rejected_total', breaker.stats['rejected'], output=name)
+            adaptive_timeout = getattr(output, 'adaptive_timeout', None)
+            if adaptive_timeout is not None:
+                metrics.set('output_timeout_seconds', adaptive_timeout.current, output=name)
+            if 'reconnects' in output.stats:
+                metrics.set('output_reconnects_total', output.stats['reconnects'], output=name)
+            if output.outbox is not None:
+                for key in ('backlog_records', 'backlog_bytes', 'drain_rate'):
+                    metrics.set(f'outbox_{key}', output.outbox.stats[key], output=name)
+                for key in ('appended', 'drained', 'dropped'):
+                    metrics.set(f'outbox_{key}_total', output.outbox.stats[key], output=name)
+    
+    def stats_line(self) -> str:
+        """Résumé des métriques sur une ligne (journal périodique)"""
+        self.metrics.collect()
+        metrics = self.metrics
+        
+        def ms(histogram, p):
+            return histogram.quantile(p) * 1000 if histogram is not None and histogram.count else 0.0
+        
+        generation = metrics.get('generation_seconds')
+        tick = metrics.get('tick_seconds')
+        parts = [
+            f"{self.stats['ticks']} ticks, {self.stats['records']} enregistrements, "
+            f"génération p99 {ms(generation, 0.99):.2f}ms, tick p99 {ms(tick, 0.99):.2f}ms"
+        ]
+        for queue in self.queues:
+            output_stats = queue.output.stats
+            parts.append(
+                f"{queue.name}: {output_stats['records_sent']} envoyés, "
+                f"{output_stats['records_failed']} échecs, {queue.stats['dropped']} rejetés, "
+                f"file {queue.depth}, envoi p50 {ms(queue.latency, 0.5):.2f}ms "
+                f"p99 {ms(queue.latency, 0.99):.2f}ms, {output_stats['bytes_sent'] / 1024:.1f} Ko"
+            )
+            outbox = queue.output.outbox
+            if outbox is not None:
+                parts[-1] += (f", outbox {outbox.stats['backlog_records']} en attente "
+                              f"({outbox.stats['drain_rate']:.0f}/s)")
+        return " | ".join(parts)
+    
+    async def _log_stats_loop(self, interval: float):
+        """Journaliser périodiquement la ligne de statistiques"""
+        while True:
+            await asyncio.sleep(interval)
+            logger.info(f"Stats: {self.stats_line()}")
+    
     def _signal_handler(self, signum, frame):
         """Gestionnaire d'arrêt propre"""
         logger.info(f"Signal {signum} reçu, arrêt en cours...")
@@ -89,36 +259,78 @@ class SimulateurUsine:
         logger.info("🏭 Démarrage du Simulateur Usine 4.0")
         self.running = True
         
+        # Ordonnanceur sur échéances absolues (durée 0 = infini)
+        scheduler = self.scheduler = TickScheduler.from_config(self.config.get('simulation', {}))
+        metrics_config = self.config.get('metrics', {}) or {}
+        
         # Initialiser tous les outputs
         for output in self.outputs:
             await output.initialize()
         
+        # Une file bornée et une tâche consommatrice par output
+        await self._start_queues()
+        
+        stats_task = None
+        metrics = self.metrics
+        
         try:
-            interval = self.config.get('simulation', {}).get('interval', 5)
+            if metrics_config.get('enabled', False):
+                self.metrics_server = MetricsServer(metrics, metrics_config.get('host', '127.0.0.1'),
+                                                    metrics_config.get('port', 9108))
+                await self.metrics_server.start()
+            if metrics_config.get('log_interval', 0) > 0:
+                stats_task = asyncio.create_task(self._log_stats_loop(metrics_config['log_interval']))
             
-            while self.running:
-                # Générer les données
-                data = self.data_simulator.generate_data()
-                
-                # Envoyer vers tous les outputs
-                tasks = []
-                for output in self.outputs:
-                    tasks.append(output.send_data(data))
+            async for _ in scheduler.ticks():
+                if not self.running:
+                    break
                 
-                # Attendre que tous les envois se terminent
-                await asyncio.gather(*tasks, return_exceptions=True)
-                
-                # Attendre l'intervalle configuré
-                await asyncio.sleep(interval)
+                # Générer les données et les publier dans les files des outputs
+                tick_started = time.perf_counter()
+                if self.fleet_simulator:
+                    batch = self.fleet_simulator.step()
+                    metrics.observe('generation_seconds', time.perf_counter() - tick_started)
+                    for queue in self.queues:
+                        await queue.publish_batch(batch)
+                    self.stats['records'] += len(batch)
+                else:
+                    data = self.data_simulator.generate_data()
+                    metrics.observe('generation_seconds', time.perf_counter() - tick_started)
+                    for queue in self.queues:
+                        await queue.publish(data)
+                    self.stats['records'] += 1
+                self.stats['ticks'] += 1
+                metrics.observe('tick_seconds', time.perf_counter() - tick_started)
                 
         except Exception as e:
             logger.error(f"Erreur dans la boucle principale: {e}")
         finally:
-            # Nettoyage
+            logger.info(f"Cadencement: {scheduler.report()}")
+            
+            if stats_task is not None:
+                stats_task.cancel()
+            
+            # Vider les files puis nettoyer
+            for queue in self.queues:
+                await queue.stop()
+                logger.info(f"File {queue.name}: {queue.stats}")
+            
             for output in self.outputs:
                 await output.cleanup()
             
+            logger.info(f"Stats: {self.stats_line()}")
+            if self.metrics_server is not None:
+                await self.metrics_server.stop()
+                self.metrics_server = None
+            
             logger.info("Simulateur arrêté proprement")
+    
+    def run_sharded(self):
+        """Répartir la flotte entre plusieurs processus (simulation.processes)"""
+        from sharding import ShardedRunner
+        
+        processes = self.config.get('simulation', {}).get('processes', 1)
+        return ShardedRunner(self.config, processes).run()
 
 async def main():
     """Point d'entrée principal"""
@@ -128,7 +340,13 @@ async def main():
         
         # Créer et lancer le simulateur
         simulateur = SimulateurUsine(config_file)
-        await simulateur.run()
+        if (simulateur.config.get('loadgen', {}) or {}).get('enabled', False):
+            from loadgen import run_loadgen
+            await run_loadgen(simulateur)
+        elif simulateur.sharded:
+            simulateur.run_sharded()
+        else:
+            await simulateur.run()
         
     except KeyboardInterrupt:
         logger.info("Arrêt demandé par l'utilisateur")
@@ -0,0 +1,379 @@
+"""
+Format de stockage compressé de séries temporelles (inspiré de Gorilla)
+Segment en ajout : en-tête puis blocs par machine. Dans un bloc, chaque
+colonne est encodée par différences (delta ou delta-of-delta, horodatages
+réguliers : 0 bit), ou par XOR avec la valeur précédente pour les flottants
+quelconques, puis tassée sur une largeur de bits fixe : le décodage d'un
+bloc est entièrement vectorisé (NumPy)
+"""
+
+import json
+import os
+from itertools import repeat
+import struct
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Any, Iterator, List, Optional, Tuple, Union
+import logging
+
+import numpy as np
+
+from columnar_storage import STATUS_CODES, decode_timestamp, encode_timestamp
+from compression import open_segment
+from fleet_simulator import STATUSES
+from sensor_schema import SensorSchema
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'USTSG1\x00\x00'
+# magic (8) + taille de l'en-tête JSON (4)
+PREFIX = struct.Struct('<8sI')
+# Taille du corps, enregistrements, premier et dernier horodatage, taille de machine_id
+BLOCK_HEADER = struct.Struct('<IIqqH')
+BLOCK_CRC = struct.Struct('<I')
+# Codec, ordre des différences (ou décalage XOR), largeur en bits
+COLUMN_HEADER = struct.Struct('<BBB')
+
+CODEC_INT = 0     # entiers : différences d'ordre 0, 1 ou 2, zigzag, largeur fixe
+CODEC_SCALED = 1  # flottants arrondis : entiers mis à l'échelle des décimales, puis CODEC_INT
+CODEC_XOR = 2     # flottants quelconques : XOR avec la valeur précédente
+
+DEFAULT_BLOCK_RECORDS = 256
+
+
+def timeseries_columns(schema: Optional[SensorSchema] = None) -> List[Dict[str, Any]]:
+    """Colonnes d'un segment : nom, type et décimales, une par canal du schéma"""
+    schema = schema or SensorSchema.from_config(None)
+    channels = [{'name': channel.output, 'type': channel.type, 'decimals': channel.decimals}
+                for channel in schema.channels]
+    return ([{'name': 'timestamp', 'type': 'int'}] + channels
+            + [{'name': 'uptime', 'type': 'int'}, {'name': 'status', 'type': 'int'}])
+
+
+def _zigzag(values: np.ndarray) -> np.ndarray:
+    return ((values << 1) ^ (values >> 63)).view(np.uint64)
+
+
+def _unzigzag(values: np.ndarray) -> np.ndarray:
+    return (values >> np.uint64(1)).view(np.int64) ^ -(values & np.uint64(1)).view(np.int64)
+
+
+def _pack_bits(values: np.ndarray, width: int) -> bytes:
+    """Entiers non signés sur width bits chacun, concaténés (poids fort d'abord)"""
+    if width == 0 or not len(values):
+        return b''
+    bits = np.unpackbits(values.astype('>u8').view(np.uint8).reshape(-1, 8), axis=1)
+    return np.packbits(bits[:, 64 - width:]).tobytes()
+
+
+def _unpack_bits(buffer, count: int, width: int) -> np.ndarray:
+    if width == 0 or not count:
+        return np.zeros(count, dtype=np.uint64)
+    bits = np.unpackbits(np.frombuffer(buffer, dtype=np.uint8), count=count * width)
+    padded = np.zeros((count, 64), dtype=np.uint8)
+    padded[:, 64 - width:] = bits.reshape(count, width)
+    return np.packbits(padded, axis=1).view('>u8').ravel().astype(np.uint64)
+
+
+def _packed_size(count: int, width: int) -> int:
+    return (count * width + 7) // 8
+
+
+def _encode_ints(values: np.ndarray, codec: int = CODEC_INT) -> bytes:
+    """Différences d'ordre 0, 1 (delta) ou 2 (delta-of-delta), la plus compacte"""
+    best = None
+    residual, bases = values, []
+    for order in range(3):
+        if order:
+            if not len(residual):
+                break
+            bases.append(int(residual[0]))
+            residual = np.diff(residual)
+        encoded = _zigzag(residual)
+        width = int(np.bitwise_or.reduce(encoded)).bit_length() if len(encoded) else 0
+        size = width * len(encoded) + 64 * order
+        if best is None or size < best[0]:
+            best = (size, order, width, list(bases), encoded)
+
+    _, order, width, bases, encoded = best
+    return (COLUMN_HEADER.pack(codec, order, width) + struct.pack(f'<{order}q', *bases)
+            + _pack_bits(encoded, width))
+
+
+def _encode_xor(values: np.ndarray) -> bytes:
+    """XOR de chaque valeur avec la précédente ; fenêtre de bits significatifs commune au bloc"""
+    bits = values.view(np.uint64)
+    xored = bits[1:] ^ bits[:-1]
+    combined = int(np.bitwise_or.reduce(xored)) if len(xored) else 0
+    shift = (combined & -combined).bit_length() - 1 if combined else 0
+    width = combined.bit_length() - shift
+    return (COLUMN_HEADER.pack(CODEC_XOR, shift, width) + struct.pack('<Q', int(bits[0]))
+            + _pack_bits(xored >> np.uint64(shift), width))
+
+
+def _encode_column(values: List[Any], column: Dict[str, Any]) -> bytes:
+    if column['type'] == 'int':
+        return _encode_ints(np.array(values, dtype=np.int64))
+
+    values = np.array(values, dtype=np.float64)
+    # Valeurs publiées arrondies à leurs décimales : entiers exacts après mise à l'échelle
+    scale = 10.0 ** column.get('decimals', 1)
+    scaled = np.rint(values * scale)
+    if (np.isfinite(scaled).all() and np.abs(scaled).max() < 2 ** 53
+            and np.array_equal(scaled / scale, values)):
+        return _encode_ints(scaled.astype(np.int64), CODEC_SCALED)
+    return _encode_xor(values)
+
+
+def _decode_column(buffer, position: int, count: int, column: Dict[str, Any]) -> Tuple[np.ndarray, int]:
+    """Décoder une colonne d'un bloc ; retourne (valeurs, position suivante)"""
+    codec, order, width = COLUMN_HEADER.unpack_from(buffer, position)
+    position += COLUMN_HEADER.size
+
+    if codec == CODEC_XOR:
+        first = struct.unpack_from('<Q', buffer, position)[0]
+        position += 8
+        size = _packed_size(count - 1, width)
+        xored = _unpack_bits(buffer[position:position + size], count - 1, width) << np.uint64(order)
+        bits = np.bitwise_xor.accumulate(np.concatenate(([np.uint64(first)], xored)))
+        return bits.view(np.float64), position + size
+
+    bases = struct.unpack_from(f'<{order}q', buffer, position)
+    position += 8 * order
+    size = _packed_size(count - order, width)
+    values = _unzigzag(_unpack_bits(buffer[position:position + size], count - order, width))
+    # Intégrations successives : delta-of-delta -> delta -> valeurs
+    for base in reversed(bases):
+        values = np.cumsum(np.concatenate(([base], values)))
+    if codec == CODEC_SCALED:
+        values = values / 10.0 ** column.get('decimals', 1)
+    return values, position + size
+
+
+def _read_header(f) -> Tuple[Dict[str, Any], int]:
+    """En-tête d'un segment ; retourne (en-tête, position du premier bloc)"""
+    prefix = f.read(PREFIX.size)
+    if len(prefix) < PREFIX.size:
+        raise ValueError("Segment de séries temporelles incomplet")
+    magic, header_size = PREFIX.unpack(prefix)
+    if magic != MAGIC:
+        raise ValueError("Segment de séries temporelles invalide (signature inconnue)")
+    return json.loads(f.read(header_size)), PREFIX.size + header_size
+
+
+def _read_blocks(buffer, position: int = 0) -> Iterator[Tuple[int, int, str, int, int, int, memoryview]]:
+    """Blocs complets et valides du tampon à partir de position :
+    (début, fin, machine_id, enregistrements, premier et dernier horodatage, corps)
+
+    La lecture s'arrête au premier bloc incomplet (écriture en cours, arrêt brutal).
+    """
+    view = memoryview(buffer)
+    while position + BLOCK_HEADER.size <= len(buffer):
+        body_size, count, first, last, id_size = BLOCK_HEADER.unpack_from(buffer, position)
+        body_start = position + BLOCK_HEADER.size + id_size
+        end = body_start + body_size + BLOCK_CRC.size
+        if end > len(buffer):
+            return
+        crc = BLOCK_CRC.unpack_from(buffer, end - BLOCK_CRC.size)[0]
+        if zlib.crc32(view[position:end - BLOCK_CRC.size]) != crc:
+            return
+        machine_id = bytes(view[position + BLOCK_HEADER.size:body_start]).decode('utf-8')
+        yield position, end, machine_id, count, first, last, view[body_start:end - BLOCK_CRC.size]
+        position = end
+
+
+def is_timeseries(path: Union[str, Path]) -> bool:
+    """Vérifier si un fichier (éventuellement compressé) est un segment de séries temporelles"""
+    with open_segment(path) as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+class TimeSeriesWriter:
+    """Écriture en continu d'un segment : un bloc ouvert par machine
+
+    Les enregistrements d'une machine sont conservés en mémoire jusqu'à
+    block_records, puis le bloc est encodé et ajouté au fichier. Les blocs
+    ouverts sont écrits à la fermeture (rotation, arrêt) ou par seal_blocks()
+    lorsqu'ils sont trop anciens.
+    """
+
+    def __init__(self, path: Union[str, Path], columns: Optional[List[Dict[str, Any]]] = None,
+                 block_records: int = DEFAULT_BLOCK_RECORDS):
+        self.path = Path(path)
+        self.block_records = max(1, int(block_records))
+
+        if self.path.exists() and self.path.stat().st_size > 0:
+            # Reprendre un segment existant (colonnes de son en-tête), fin incomplète tronquée
+            with open(self.path, 'r+b') as f:
+                header, start = _read_header(f)
+                buffer = f.read()
+                end = 0
+                for _, end, *_ in _read_blocks(buffer):
+                    pass
+                if end < len(buffer):
+                    f.truncate(start + end)
+                    logger.warning(f"Bloc incomplet tronqué en fin de {self.path} ({len(buffer) - end} octets)")
+            self.columns = header['columns']
+        else:
+            self.columns = columns or timeseries_columns()
+            encoded = json.dumps({'version': 1, 'columns': self.columns}).encode('utf-8')
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'wb') as f:
+                f.write(PREFIX.pack(MAGIC, len(encoded)) + encoded)
+
+        self._handle = open(self.path, 'ab')
+        self.size = self._handle.tell()
+        # Colonnes de valeurs (canaux et uptime), lues telles quelles dans les enregistrements
+        self._values = [column['name'] for column in self.columns[1:-1]]
+        # Bloc ouvert par machine : lignes (horodatage epoch, canaux..., uptime, code de statut)
+        self._blocks: Dict[str, List[tuple]] = {}
+        # Instant d'ouverture (monotone) de chaque bloc ouvert
+        self._opened: Dict[str, float] = {}
+        self._timestamp = (None, 0)
+        self.count = 0
+
+    @property
+    def pending(self) -> int:
+        """Enregistrements des blocs ouverts, pas encore écrits"""
+        return sum(len(rows) for rows in self._blocks.values())
+
+    def _seconds(self, timestamp: str) -> int:
+        # Horodatage identique pour toutes les machines d'un tick : dernière conversion gardée
+        if self._timestamp[0] != timestamp:
+            self._timestamp = (timestamp, encode_timestamp(timestamp))
+        return self._timestamp[1]
+
+    def _add(self, machine_id: str, row: tuple) -> int:
+        rows = self._blocks.get(machine_id)
+        if rows is None:
+            rows = self._blocks[machine_id] = []
+            self._opened[machine_id] = time.monotonic()
+        rows.append(row)
+        if len(rows) >= self.block_records:
+            return self._seal(machine_id)
+        return 0
+
+    def _seal(self, machine_id: str) -> int:
+        del self._opened[machine_id]
+        return self._write_block(machine_id, self._blocks.pop(machine_id))
+
+    def append(self, data: Dict[str, Any]) -> int:
+        """Ajouter un enregistrement ; retourne les octets écrits (bloc complété)"""
+        row = (self._seconds(data['timestamp']), *[data[name] for name in self._values],
+               STATUS_CODES[data['status']])
+        return self._add(data['machine_id'], row)
+
+    def append_batch(self, batch) -> int:
+        """Ajouter les lignes d'un FleetBatch ; retourne les octets écrits"""
+        count = len(batch)
+        columns = [[self._seconds(batch.timestamp)] * count]
+        columns += [batch.columns[name].tolist() for name in self._values]
+        columns.append(batch.columns['status'].tolist())
+        written = 0
+        for machine_id, row in zip(batch.machine_ids, zip(*columns)):
+            written += self._add(machine_id, row)
+        return written
+
+    def _write_block(self, machine_id: str, rows: List[tuple]) -> int:
+        """Encoder un bloc colonne par colonne et l'ajouter au fichier"""
+        body = b''.join(_encode_column(values, column) for values, column in zip(zip(*rows), self.columns))
+        encoded_id = machine_id.encode('utf-8')
+        block = BLOCK_HEADER.pack(len(body), len(rows), rows[0][0], rows[-1][0], len(encoded_id)) + encoded_id + body
+        block += BLOCK_CRC.pack(zlib.crc32(block))
+        self._handle.write(block)
+        self.size += len(block)
+        self.count += len(rows)
+        return len(block)
+
+    def write_blocks(self) -> int:
+        """Écrire tous les blocs ouverts (même incomplets) ; retourne les octets écrits"""
+        written = 0
+        for machine_id in list(self._blocks):
+            written += self._seal(machine_id)
+        return written
+
+    def seal_blocks(self, max_age: float) -> int:
+        """Écrire les blocs ouverts depuis au moins max_age secondes ; retourne les octets écrits"""
+        limit = time.monotonic() - max_age
+        written = 0
+        for machine_id, opened in list(self._opened.items()):
+            if opened <= limit:
+                written += self._seal(machine_id)
+        return written
+
+    def flush(self, sync: bool = False):
+        """Vider le tampon d'écriture des blocs complets (fsync si sync)"""
+        self._handle.flush()
+        if sync:
+            os.fsync(self._handle.fileno())
+
+    def close(self):
+        """Écrire les blocs ouverts puis fermer le segment"""
+        if self._handle is not None:
+            self.write_blocks()
+            self._handle.close()
+            self._handle = None
+
+
+class TimeSeriesReader:
+    """Lecture d'un segment par blocs, décodés colonne par colonne (vectorisé)
+
+    offset : position en octets du premier bloc à lire (suivi d'un segment en
+    cours d'écriture). Un segment pivoté compressé est décompressé en mémoire.
+    """
+
+    def __init__(self, path: Union[str, Path], offset: int = 0):
+        self.path = Path(path)
+        with open_segment(self.path) as f:
+            header, start = _read_header(f)
+            if offset > start:
+                f.seek(offset)
+                start = offset
+            self._buffer = f.read()
+        self.columns = header['columns']
+        self._names = [column['name'] for column in self.columns]
+        # Position en octets du début du tampon dans le fichier
+        self._base = start
+        # Position après le dernier bloc complet lu
+        self.end = start
+
+    def blocks(self, machine_id: Optional[str] = None, start: Optional[str] = None,
+               end: Optional[str] = None) -> Iterator[Tuple[str, Dict[str, np.ndarray]]]:
+        """Blocs décodés (machine_id, colonnes NumPy) ; les blocs hors de [start, end]
+        ou d'une autre machine sont écartés d'après leur en-tête, sans décodage"""
+        for _, block_end, block_machine, count, first, last, body in _read_blocks(self._buffer):
+            self.end = self._base + block_end
+            if machine_id is not None and block_machine != machine_id:
+                continue
+            if (start is not None and decode_timestamp(last) < start) or (end is not None and decode_timestamp(first) > end):
+                continue
+            columns, position = {}, 0
+            for column in self.columns:
+                columns[column['name']], position = _decode_column(body, position, count, column)
+            yield block_machine, columns
+
+    def records(self, machine_id: Optional[str] = None, start: Optional[str] = None,
+                end: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Reconstituer les enregistrements au format de generate_data(), bloc par bloc
+
+        Les enregistrements sont groupés par machine (ordre des blocs), et
+        filtrés sur [start, end] (horodatages du cahier des charges) si donnés.
+        """
+        names = self._names[1:]
+        fields = ['timestamp', 'machine_id'] + names
+        for block_machine, columns in self.blocks(machine_id, start, end):
+            # Horodatages du bloc formatés en une opération (UTC, suffixe Z)
+            seconds = columns['timestamp'].astype('datetime64[s]')
+            timestamps = [text + 'Z' for text in np.datetime_as_string(seconds, unit='s').tolist()]
+            values = [columns[name].tolist() for name in names]
+            values[-1] = [STATUSES[code] for code in values[-1]]
+            # Champs dans l'ordre de generate_data()
+            rows = zip(timestamps, repeat(block_machine), *values)
+            records = map(dict, map(zip, repeat(fields), rows))
+            if start is None and end is None:
+                yield from records
+            else:
+                yield from (record for record in records
+                            if (start is None or record['timestamp'] >= start)
+                            and (end is None or record['timestamp'] <= end))